@@ -1,17 +1,35 @@
+import time
+import array
+import heapq
+import math
+
+_STARTUP_T0 = time.perf_counter()
+
 import sys
 import customtkinter as ctk
-from tkinter import filedialog
-from CTkMessagebox import CTkMessagebox
 from CTkListbox import CTkListbox
-from ctkcomponents.ctk_components import CTkProgressPopup
+from tkinter import filedialog, ttk
 import os
-import pyperclip
 from pathlib import Path
 import logging
 import fnmatch
 import queue
 import concurrent.futures
-import configparser
+import multiprocessing
+import threading
+import difflib
+import importlib.util
+import json
+import ast
+import io
+import re
+import tokenize
+import subprocess
+import contextlib
+import functools
+import hashlib
+from collections import Counter, OrderedDict
+from xml.sax.saxutils import escape as escape_xml, quoteattr
 
 logging.basicConfig(
     level=logging.INFO,
@@ -20,6 +38,31 @@ logging.basicConfig(
 )
 
 
+STARTUP_FIRST_PAINT_TARGET_MS = 1500
+GIT_COMMAND_TIMEOUT_S = 30
+GIT_DIFF_DEFAULT_CONTEXT_LINES = 3
+
+
+def CTkMessagebox(*args, **kwargs):
+    from CTkMessagebox import CTkMessagebox as _CTkMessagebox
+
+    return _CTkMessagebox(*args, **kwargs)
+
+
+_gitignore_parser_available = None
+
+
+def gitignore_parser_available() -> bool:
+    global _gitignore_parser_available
+    if _gitignore_parser_available is None:
+        _gitignore_parser_available = (
+            importlib.util.find_spec("gitignore_parser") is not None
+        )
+        if not _gitignore_parser_available:
+            logging.warning("gitignore_parser not found. .gitignore disabled.")
+    return _gitignore_parser_available
+
+
 def resource_path(relative_path):
     try:
         base_path = Path(sys._MEIPASS)
@@ -63,6 +106,271 @@ FALLBACK_IGNORE_FILES = {
     "*.orig",
 }
 MAX_FILE_SIZE_BYTES = 1 * 1024 * 1024
+PROMPT_VIEWER_MAX_CHARS = 2_000_000
+CLIPBOARD_SYNC_MAX_CHARS = 256 * 1024
+CLIPBOARD_PART_DEFAULT_CHARS = 100_000
+DEFAULT_PROMPT_FORMAT = "plain"
+PROMPT_CHUNK_UNITS = ("tokens", "bytes")
+PROMPT_CHUNK_DEFAULT_LIMIT = 100_000
+PROMPT_CHUNK_MIN_LIMIT = 4_000
+PROMPT_CHUNK_MANIFEST_NAMES = 5
+PROMPT_CHUNK_MANIFEST_LINES = 20
+IMPORT_EXPAND_DEFAULT_DEPTH = 1
+RELEVANCE_DEFAULT_TOP_N = 5
+RELEVANCE_DEBOUNCE_MS = 150
+RELEVANCE_PATH_TOKEN_WEIGHT = 3
+RELEVANCE_BM25_K1 = 1.2
+RELEVANCE_BM25_B = 0.75
+RELEVANCE_STOP_WORDS = frozenset(
+    "a an and are as at be by can do for from has have how i if in into is it "
+    "its me my no not of on or our so that the their then there these this to "
+    "up us use we what when where which why will with would you your".split()
+)
+FILE_CACHE_MAX_CHARS = 64 * 1024 * 1024
+ENCODING_SNIFF_BYTES = 4096
+TRANSFORM_CACHE_MAX_CHARS = 32 * 1024 * 1024
+CHARS_PER_TOKEN_ESTIMATE = 4
+PROCESS_POOL_MIN_CHARS = 512 * 1024
+PROCESS_POOL_MIN_BATCH_CHARS = 64 * 1024
+LANGUAGE_BY_EXTENSION = {
+    ".py": "python",
+    ".pyw": "python",
+    ".js": "javascript",
+    ".jsx": "jsx",
+    ".mjs": "javascript",
+    ".ts": "typescript",
+    ".tsx": "tsx",
+    ".java": "java",
+    ".kt": "kotlin",
+    ".c": "c",
+    ".h": "c",
+    ".cpp": "cpp",
+    ".cc": "cpp",
+    ".hpp": "cpp",
+    ".cs": "csharp",
+    ".go": "go",
+    ".rs": "rust",
+    ".swift": "swift",
+    ".php": "php",
+    ".css": "css",
+    ".scss": "scss",
+    ".rb": "ruby",
+    ".sh": "bash",
+    ".bash": "bash",
+    ".yaml": "yaml",
+    ".yml": "yaml",
+    ".toml": "toml",
+    ".ini": "ini",
+    ".cfg": "ini",
+    ".sql": "sql",
+    ".html": "html",
+    ".htm": "html",
+    ".xml": "xml",
+    ".svg": "xml",
+    ".vue": "vue",
+    ".md": "markdown",
+    ".json": "json",
+}
+C_STYLE_COMMENT_LANGUAGES = {
+    "javascript",
+    "jsx",
+    "typescript",
+    "tsx",
+    "java",
+    "kotlin",
+    "c",
+    "cpp",
+    "csharp",
+    "go",
+    "rust",
+    "swift",
+    "php",
+}
+REGEX_LITERAL_LANGUAGES = {"javascript", "jsx", "typescript", "tsx"}
+BLOCK_COMMENT_LANGUAGES = {"css", "scss"}
+HASH_COMMENT_LANGUAGES = {"ruby", "bash", "yaml", "toml", "ini"}
+MARKUP_COMMENT_LANGUAGES = {"html", "xml", "vue"}
+CONFIG_STORE_FILENAME = "configs.sqlite3"
+CONFIG_MISSING_FILES_SHOWN = 15
+FOLDER_SCAN_PROGRESS_INTERVAL = 250
+WALK_BUDGET_SECONDS = 3.0
+WALK_BUDGET_MAX_ENTRIES = 100_000
+WALK_UNVISITED_MARKER = "[not scanned yet: walk budget reached]"
+SYMLINKS_NEVER = "never"
+SYMLINKS_INSIDE_ROOT = "inside_root"
+SYMLINKS_ALWAYS = "always"
+SYMLINK_POLICY_LABELS = {
+    SYMLINKS_NEVER: "Don't follow symlinks",
+    SYMLINKS_INSIDE_ROOT: "Follow symlinks inside project",
+    SYMLINKS_ALWAYS: "Follow all symlinks",
+}
+FILE_TREE_CHECKED = "☑"
+FILE_TREE_UNCHECKED = "☐"
+FILE_TREE_PLACEHOLDER_SUFFIX = "::placeholder"
+FILE_TREE_LOADING_TEXT = "Loading..."
+
+
+class PerfStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.spans: dict[str, dict[str, float]] = {}
+            self.counters: dict[str, int] = {}
+            self.gauges: dict[str, float] = {}
+            self.started_at = time.time()
+
+    @contextlib.contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_span(name, (time.perf_counter() - start) * 1000)
+
+    def record_span(self, name: str, duration_ms: float):
+        if TRACER.enabled:
+            end_us = TRACER.now_us()
+            TRACER.add_complete(name, "stage", end_us - duration_ms * 1000, end_us)
+        with self._lock:
+            span = self.spans.get(name)
+            if span is None:
+                span = self.spans[name] = {
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "last_ms": 0.0,
+                }
+            span["count"] += 1
+            span["total_ms"] += duration_ms
+            span["max_ms"] = max(span["max_ms"], duration_ms)
+            span["last_ms"] = duration_ms
+        logging.debug(f"Span {name}: {duration_ms:.1f} ms")
+
+    def add_counts(self, counts: dict[str, int]):
+        with self._lock:
+            for name, amount in counts.items():
+                if amount:
+                    self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_gauges(self, gauges: dict[str, float]):
+        with self._lock:
+            self.gauges.update(gauges)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "captured_at": time.time(),
+                "spans": {name: dict(span) for name, span in self.spans.items()},
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2, sort_keys=True)
+
+    def format_report(self) -> str:
+        data = self.snapshot()
+        lines = [
+            f"{'Span':<32}{'count':>8}{'last ms':>12}{'max ms':>12}{'total ms':>12}"
+        ]
+        for name, span in sorted(data["spans"].items()):
+            lines.append(
+                f"{name:<32}{span['count']:>8}{span['last_ms']:>12.1f}"
+                f"{span['max_ms']:>12.1f}{span['total_ms']:>12.1f}"
+            )
+        lines.append("")
+        lines.append(f"{'Counter':<32}{'value':>12}")
+        for name, value in sorted(data["counters"].items()):
+            lines.append(f"{name:<32}{value:>12}")
+        lines.append("")
+        lines.append(f"{'Gauge':<32}{'value':>12}")
+        for name, value in sorted(data["gauges"].items()):
+            lines.append(f"{name:<32}{value:>12}")
+        return "\n".join(lines)
+
+
+PERF_STATS = PerfStats()
+
+
+class TraceRecorder:
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._events: list[dict] = []
+        self._thread_names: dict[int, str] = {}
+        self._origin = time.perf_counter()
+
+    def now_us(self) -> float:
+        return (time.perf_counter() - self._origin) * 1e6
+
+    def start(self):
+        with self._lock:
+            self._events = []
+            self._thread_names = {}
+        self.enabled = True
+        logging.info("Trace recording started.")
+
+    def stop(self):
+        self.enabled = False
+        logging.info(f"Trace recording stopped ({len(self._events)} events).")
+
+    def add_complete(self, name, category, start_us, end_us, args=None):
+        if not self.enabled:
+            return
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round(start_us, 1),
+            "dur": round(max(0.0, end_us - start_us), 1),
+            "pid": os.getpid(),
+            "tid": thread.ident,
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._events.append(event)
+            self._thread_names.setdefault(thread.ident, thread.name)
+
+    @contextlib.contextmanager
+    def span(self, name, args=None):
+        if not self.enabled:
+            yield
+            return
+        start_us = self.now_us()
+        try:
+            yield
+        finally:
+            self.add_complete(name, "span", start_us, self.now_us(), args)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            metadata = [
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": os.getpid(),
+                    "tid": tid,
+                    "args": {"name": thread_name},
+                }
+                for tid, thread_name in self._thread_names.items()
+            ]
+            return {
+                "traceEvents": metadata + list(self._events),
+                "displayTimeUnit": "ms",
+            }
+
+    def write(self, file_path):
+        Path(file_path).write_text(json.dumps(self.to_dict()), encoding="utf-8")
+        logging.info(f"Trace written to {file_path}")
+
+
+TRACER = TraceRecorder()
 
 
 def _is_custom_ignored(
@@ -106,84 +414,641 @@ def _is_custom_ignored(
     return False
 
 
-def build_file_tree_string(
+def _is_default_ignored(item_name, is_dir):
+    if is_dir:
+        return bool(
+            item_name in FALLBACK_IGNORE_DIRS
+            or any(
+                fnmatch.fnmatch(item_name, pat)
+                for pat in FALLBACK_IGNORE_DIRS
+                if "*" in pat
+            )
+            or (item_name.startswith(".") and item_name not in {".well-known"})
+        )
+    return bool(
+        item_name in FALLBACK_IGNORE_FILES
+        or any(
+            fnmatch.fnmatch(item_name, pat)
+            for pat in FALLBACK_IGNORE_FILES
+            if "*" in pat
+        )
+        or (
+            item_name.startswith(".")
+            and item_name not in {".gitignore", ".gitattributes", ".gitmodules"}
+        )
+    )
+
+
+def list_visible_entries(
     folder_path: Path,
-    indent="",
-    tree_lines=None,
     gitignore_matcher=None,
     use_gitignore_flag=True,
     custom_ignore_patterns=None,
     project_root_path_for_custom=None,
-):
-    if tree_lines is None:
-        tree_lines = []
-
+) -> list[tuple[str, Path, bool]]:
     visible_items_data = []
-
-    try:
-        entries = list(folder_path.iterdir())
-    except PermissionError:
-        tree_lines.append(f"{indent}[ACCESS DENIED] {folder_path.name}")
-        return "\n".join(tree_lines) if not indent else None
-    except FileNotFoundError:
-        tree_lines.append(f"{indent}[NOT FOUND] {folder_path.name}")
-        return "\n".join(tree_lines) if not indent else None
-    except OSError as e:
-        tree_lines.append(f"{indent}[ERROR ITERATING] {folder_path.name}: {e}")
-        return "\n".join(tree_lines) if not indent else None
-
-    for item_path_obj in entries:
+    counts = {
+        "entries_visited": 0,
+        "ignored_by_gitignore": 0,
+        "ignored_by_custom": 0,
+        "ignored_by_default": 0,
+        "gitignore_match_us": 0,
+        "custom_match_us": 0,
+    }
+
+    for item_path_obj in folder_path.iterdir():
+        counts["entries_visited"] += 1
         item_name = item_path_obj.name
         try:
             is_dir = item_path_obj.is_dir()
         except OSError:
             continue
 
-        if (
+        match_started = time.perf_counter()
+        ignored_by_gitignore = bool(
             use_gitignore_flag
             and gitignore_matcher
             and gitignore_matcher(item_path_obj)
-        ):
+        )
+        custom_started = time.perf_counter()
+        counts["gitignore_match_us"] += int((custom_started - match_started) * 1e6)
+        if ignored_by_gitignore:
+            counts["ignored_by_gitignore"] += 1
             continue
-        if _is_custom_ignored(
+        ignored_by_custom = _is_custom_ignored(
             item_path_obj, project_root_path_for_custom, custom_ignore_patterns
-        ):
+        )
+        counts["custom_match_us"] += int((time.perf_counter() - custom_started) * 1e6)
+        if ignored_by_custom:
+            counts["ignored_by_custom"] += 1
             continue
 
-        if is_dir:
-            if (
-                item_name in FALLBACK_IGNORE_DIRS
-                or any(
-                    fnmatch.fnmatch(item_name, pat)
-                    for pat in FALLBACK_IGNORE_DIRS
-                    if "*" in pat
-                )
-                or (item_name.startswith(".") and item_name not in {".well-known"})
+        if _is_default_ignored(item_name, is_dir):
+            counts["ignored_by_default"] += 1
+            continue
+
+        visible_items_data.append((item_name, item_path_obj, is_dir))
+
+    visible_items_data.sort(key=lambda x: (not x[2], x[0].lower()))
+    counts["directories_listed"] = 1
+    PERF_STATS.add_counts(counts)
+    return visible_items_data
+
+
+class DirectoryListingCache:
+    def __init__(
+        self,
+        gitignore_matcher=None,
+        use_gitignore_flag=True,
+        custom_ignore_patterns=None,
+        project_root_path=None,
+        follow_symlinks=SYMLINKS_INSIDE_ROOT,
+        one_filesystem=True,
+    ):
+        self.gitignore_matcher = gitignore_matcher
+        self.use_gitignore_flag = use_gitignore_flag
+        self.custom_ignore_patterns = custom_ignore_patterns
+        self.project_root_path = project_root_path
+        self.follow_symlinks = follow_symlinks
+        self.one_filesystem = one_filesystem
+        self._listings: dict[str, tuple[list | None, OSError | None]] = {}
+        self._skip_reasons: dict[str, str | None] = {}
+        self._dir_identities: dict[tuple[int, int], str] = {}
+        self._root_info = None
+        self._lock = threading.Lock()
+
+    def _get_root_info(self):
+        # (resolved root path, root st_dev), computed once per cache.
+        with self._lock:
+            if self._root_info is None:
+                resolved_root, root_dev = None, None
+                if self.project_root_path is not None:
+                    try:
+                        resolved_root = self.project_root_path.resolve()
+                        root_stat = os.stat(resolved_root)
+                        root_dev = root_stat.st_dev
+                        self._dir_identities[(root_dev, root_stat.st_ino)] = ""
+                    except OSError:
+                        pass
+                self._root_info = (resolved_root, root_dev)
+            return self._root_info
+
+    def _project_relative(self, folder_path: Path) -> str | None:
+        if self.project_root_path is None:
+            return None
+        try:
+            relative = folder_path.relative_to(self.project_root_path)
+        except ValueError:
+            resolved_root = self._get_root_info()[0]
+            if resolved_root is None:
+                return None
+            try:
+                relative = folder_path.relative_to(resolved_root)
+            except ValueError:
+                return None
+        return relative.as_posix() if relative.parts else ""
+
+    def skip_reason(self, dir_path: Path) -> str | None:
+        # Why a listed directory must not be descended into, or None. The
+        # (st_dev, st_ino) map stops symlink cycles and repeated subtrees; it
+        # is keyed by project-relative path so both tree views agree.
+        key = str(dir_path)
+        with self._lock:
+            if key in self._skip_reasons:
+                return self._skip_reasons[key]
+
+        resolved_root, root_dev = self._get_root_info()
+        relative = self._project_relative(dir_path)
+        reason = None
+        try:
+            is_link = dir_path.is_symlink()
+            if is_link and self.follow_symlinks == SYMLINKS_NEVER:
+                reason = "symlink not followed"
+            elif (
+                is_link
+                and self.follow_symlinks == SYMLINKS_INSIDE_ROOT
+                and resolved_root is not None
+                and not Path(os.path.realpath(dir_path)).is_relative_to(resolved_root)
             ):
+                reason = "symlink outside project"
+            else:
+                dir_stat = os.stat(dir_path)
+                if (
+                    self.one_filesystem
+                    and root_dev is not None
+                    and dir_stat.st_dev != root_dev
+                ):
+                    reason = "other filesystem"
+                else:
+                    identity_key = relative if relative is not None else key
+                    with self._lock:
+                        first_seen = self._dir_identities.setdefault(
+                            (dir_stat.st_dev, dir_stat.st_ino), identity_key
+                        )
+                    if first_seen != identity_key:
+                        reason = f"same directory as {first_seen or '.'}/"
+        except OSError:
+            pass
+
+        if reason is not None:
+            PERF_STATS.add_counts({"dirs_not_followed": 1})
+        with self._lock:
+            self._skip_reasons[key] = reason
+        return reason
+
+    def has_listing(self, folder_path: Path) -> bool:
+        with self._lock:
+            return str(folder_path) in self._listings
+
+    def walk_files(self, folder_path: Path, cancel_event=None):
+        pending = [folder_path]
+        while pending:
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            try:
+                entries = self.list_dir(pending.pop())
+            except OSError:
                 continue
+            for item_name, item_path_obj, is_dir in entries:
+                if not is_dir:
+                    yield item_path_obj
+                elif not self.skip_reason(item_path_obj):
+                    pending.append(item_path_obj)
+
+    def list_dir(self, folder_path: Path) -> list[tuple[str, Path, bool]]:
+        key = str(folder_path)
+        with self._lock:
+            cached = self._listings.get(key)
+        if cached is None:
+            try:
+                with TRACER.span("walk.list_dir", {"path": key}):
+                    cached = (
+                        list_visible_entries(
+                            folder_path,
+                            self.gitignore_matcher,
+                            self.use_gitignore_flag,
+                            self.custom_ignore_patterns,
+                            self.project_root_path,
+                        ),
+                        None,
+                    )
+            except OSError as e:
+                cached = (None, e)
+            with self._lock:
+                self._listings[key] = cached
+        entries, error = cached
+        if error is not None:
+            raise error
+        return entries
+
+
+def _run_git(folder_path: Path, args, span_name, stdin_bytes=None):
+    try:
+        with PERF_STATS.span(span_name):
+            completed = subprocess.run(
+                ["git", *args],
+                cwd=str(folder_path),
+                input=stdin_bytes,
+                capture_output=True,
+                timeout=GIT_COMMAND_TIMEOUT_S,
+                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+            )
+    except (OSError, subprocess.SubprocessError) as e:
+        logging.info(f"git {args[0]} unavailable for {folder_path}: {e}")
+        return None
+    if completed.returncode != 0:
+        logging.info(
+            f"git {args[0]} failed for {folder_path}: "
+            f"{completed.stderr.decode('utf-8', errors='replace').strip()}"
+        )
+        return None
+    return completed.stdout
+
+
+def git_list_files(folder_path: Path) -> list[str] | None:
+    # Paths relative to folder_path; directories git does not list inside,
+    # untracked nested repositories and submodules, end with "/".
+    output = _run_git(
+        folder_path,
+        ["ls-files", "-co", "-d", "--exclude-standard", "-t", "-s", "-z"],
+        "git.ls_files",
+    )
+    if output is None:
+        return None
+
+    listed, deleted = [], set()
+    for record in output.split(b"\0"):
+        if not record:
+            continue
+        tag, _, rel_path = record.decode("utf-8", errors="surrogateescape").partition(
+            " "
+        )
+        if tag != "?":
+            # Index entries read "<mode> <object> <stage>\t<path>".
+            stage_info, _, rel_path = rel_path.partition("\t")
+            if stage_info.startswith("160000 "):
+                rel_path += "/"
+        if tag == "R":
+            deleted.add(rel_path)
         else:
-            if (
-                item_name in FALLBACK_IGNORE_FILES
-                or any(
-                    fnmatch.fnmatch(item_name, pat)
-                    for pat in FALLBACK_IGNORE_FILES
-                    if "*" in pat
-                )
-                or (
-                    item_name.startswith(".")
-                    and item_name not in {".gitignore", ".gitattributes", ".gitmodules"}
-                )
-            ):
+            listed.append(rel_path)
+    files = list(dict.fromkeys(p for p in listed if p not in deleted))
+    PERF_STATS.add_counts({"git_index_files": len(files)})
+    return files
+
+
+_GIT_QUOTED_PATH_RE = re.compile(r'"(?:\\.|[^"\\])*"')
+_GIT_PATH_ESCAPES = {
+    "a": "\a",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+    "v": "\v",
+}
+
+
+def unquote_git_path(text: str) -> str:
+    # git C-quotes paths with control characters, '"' or '\\' even when
+    # core.quotepath is off; octal escapes are raw UTF-8 bytes.
+    if len(text) < 2 or text[0] != '"' or text[-1] != '"':
+        return text
+    body = text[1:-1]
+    raw = bytearray()
+    i = 0
+    while i < len(body):
+        char = body[i]
+        if char == "\\" and i + 1 < len(body):
+            escaped = body[i + 1]
+            octal = body[i + 1 : i + 4]
+            if len(octal) == 3 and all(c in "01234567" for c in octal):
+                raw.append(int(octal, 8) & 0xFF)
+                i += 4
                 continue
+            raw += _GIT_PATH_ESCAPES.get(escaped, escaped).encode("utf-8")
+            i += 2
+            continue
+        raw += char.encode("utf-8", errors="surrogateescape")
+        i += 1
+    return raw.decode("utf-8", errors="surrogateescape")
+
+
+def _diff_header_new_path(header: str) -> str | None:
+    # "a/<path> b/<path>", either side possibly quoted; renames are resolved
+    # by the "+++" line.
+    if header.endswith('"'):
+        quoted = list(_GIT_QUOTED_PATH_RE.finditer(header))
+        path = unquote_git_path(quoted[-1].group()) if quoted else ""
+    elif header.startswith('"'):
+        quoted = _GIT_QUOTED_PATH_RE.match(header)
+        path = header[quoted.end() + 1 :] if quoted else ""
+    else:
+        half = (len(header) - 1) // 2
+        path = header[half + 1 :] if header[half] == " " else ""
+    return path[2:] if path.startswith("b/") else None
+
+
+def parse_git_diff(diff_text: str) -> dict[str, str]:
+    changes = {}
+    path, hunk_lines, deleted = None, [], False
+
+    def finish_file():
+        if path is not None and not deleted:
+            changes[path] = "\n".join(hunk_lines).rstrip("\n")
+
+    for line in diff_text.split("\n"):
+        if line.startswith("diff --git "):
+            finish_file()
+            hunk_lines, deleted = [], False
+            path = _diff_header_new_path(line[len("diff --git ") :])
+        elif hunk_lines or line.startswith("@@"):
+            hunk_lines.append(line)
+        elif line.startswith("deleted file mode"):
+            deleted = True
+        elif line.startswith("+++ "):
+            target = unquote_git_path(line[len("+++ ") :].rstrip("\t"))
+            if target == "/dev/null":
+                deleted = True
+            else:
+                path = target[2:] if target.startswith("b/") else target
+    finish_file()
+    return changes
+
+
+def git_changed_files(
+    folder_path: Path, base_ref=None, context_lines=GIT_DIFF_DEFAULT_CONTEXT_LINES
+) -> dict[str, str] | None:
+    # Maps paths relative to folder_path to their diff hunks. Untracked files
+    # in working-tree mode, and changes git shows no hunks for (binary or
+    # mode-only), map to "" so their whole content is used.
+    revision = f"{base_ref}...HEAD" if base_ref else "HEAD"
+    if not base_ref and (
+        _run_git(folder_path, ["rev-parse", "--verify", "-q", "HEAD"], "git.rev_parse")
+        is None
+    ):
+        # No commits yet: diff against the empty tree, whose id depends on
+        # the repository's hash algorithm.
+        empty_tree = _run_git(
+            folder_path,
+            ["hash-object", "-t", "tree", "--stdin"],
+            "git.hash_object",
+            stdin_bytes=b"",
+        )
+        if empty_tree is None:
+            return None
+        revision = empty_tree.decode("ascii").strip()
+    output = _run_git(
+        folder_path,
+        [
+            "-c",
+            "core.quotepath=off",
+            "diff",
+            "--no-color",
+            "--no-ext-diff",
+            "--relative",
+            f"-U{context_lines}",
+            revision,
+            "--",
+        ],
+        "git.diff",
+    )
+    if output is None:
+        return None
+    changes = parse_git_diff(output.decode("utf-8", errors="replace"))
 
-        visible_items_data.append((item_name, item_path_obj, is_dir))
+    if not base_ref:
+        untracked = _run_git(
+            folder_path,
+            ["ls-files", "-o", "--exclude-standard", "-z"],
+            "git.ls_files",
+        )
+        for record in (untracked or b"").split(b"\0"):
+            if record:
+                changes.setdefault(record.decode("utf-8", errors="surrogateescape"), "")
+    PERF_STATS.add_counts({"git_changed_files": len(changes)})
+    return changes
+
+
+class GitIndexListingCache(DirectoryListingCache):
+    # Listings come from one `git ls-files` call, so .gitignore rules are
+    # already applied by git; custom and default ignores still run per entry.
+    # Without a usable repository every call falls back to the walker.
+    def __init__(
+        self,
+        gitignore_matcher=None,
+        use_gitignore_flag=True,
+        custom_ignore_patterns=None,
+        project_root_path=None,
+        follow_symlinks=SYMLINKS_INSIDE_ROOT,
+        one_filesystem=True,
+    ):
+        super().__init__(
+            gitignore_matcher,
+            use_gitignore_flag,
+            custom_ignore_patterns,
+            project_root_path,
+            follow_symlinks,
+            one_filesystem,
+        )
+        self._index_lock = threading.Lock()
+        self._index_loaded = False
+        self._subdirs: dict[str, set[str]] | None = None
+        self._files: dict[str, list[str]] = {}
+        self._walked_dirs: set[str] = set()
+
+    def _load_index(self):
+        with self._index_lock:
+            if self._index_loaded:
+                return self._subdirs is not None
+            self._index_loaded = True
+            files = (
+                git_list_files(self.project_root_path)
+                if self.project_root_path
+                else None
+            )
+            if files is None:
+                return False
+
+            subdirs, linked = {"": set()}, set()
+            for rel_path in files:
+                if rel_path.endswith("/"):
+                    # An untracked nested repository; git does not list inside it.
+                    child = rel_path.rstrip("/")
+                    self._walked_dirs.add(child)
+                else:
+                    child, _, name = rel_path.rpartition("/")
+                    self._files.setdefault(child, []).append(name)
+                while child and child not in linked:
+                    linked.add(child)
+                    parent_dir, _, child_name = child.rpartition("/")
+                    subdirs.setdefault(parent_dir, set()).add(child_name)
+                    child = parent_dir
+            self._subdirs = subdirs
+            return True
 
-    visible_items_data.sort(key=lambda x: (not x[2], x[0].lower()))
+    def _relative_key(self, folder_path: Path):
+        key = self._project_relative(folder_path)
+        if key is None:
+            return None
+        if any(key == d or key.startswith(f"{d}/") for d in self._walked_dirs):
+            return None
+        return key
+
+    def skip_reason(self, dir_path: Path) -> str | None:
+        # Git lists symlinks as files, so indexed directories are real ones.
+        if self._load_index() and self._relative_key(dir_path) is not None:
+            return None
+        return super().skip_reason(dir_path)
+
+    def list_dir(self, folder_path: Path) -> list[tuple[str, Path, bool]]:
+        if not self._load_index():
+            return super().list_dir(folder_path)
+        key = self._relative_key(folder_path)
+        if key is None:
+            return super().list_dir(folder_path)
+
+        cache_key = str(folder_path)
+        with self._lock:
+            cached = self._listings.get(cache_key)
+        if cached is not None:
+            return cached[0]
+
+        counts = {
+            "entries_visited": 0,
+            "ignored_by_custom": 0,
+            "ignored_by_default": 0,
+            "custom_match_us": 0,
+            "directories_listed": 1,
+        }
+        entries = []
+        candidates = [(name, True) for name in self._subdirs.get(key, ())]
+        candidates += [(name, False) for name in self._files.get(key, ())]
+        for item_name, is_dir in candidates:
+            counts["entries_visited"] += 1
+            item_path_obj = folder_path / item_name
+            custom_started = time.perf_counter()
+            ignored_by_custom = _is_custom_ignored(
+                item_path_obj, self.project_root_path, self.custom_ignore_patterns
+            )
+            counts["custom_match_us"] += int(
+                (time.perf_counter() - custom_started) * 1e6
+            )
+            if ignored_by_custom:
+                counts["ignored_by_custom"] += 1
+                continue
+            if _is_default_ignored(item_name, is_dir):
+                counts["ignored_by_default"] += 1
+                continue
+            entries.append((item_name, item_path_obj, is_dir))
+
+        entries.sort(key=lambda x: (not x[2], x[0].lower()))
+        PERF_STATS.add_counts(counts)
+        with self._lock:
+            self._listings[cache_key] = (entries, None)
+        return entries
+
+    def visible_files(self, folder_path: Path, recursive, cancel_event=None):
+        if not self._load_index() or self._relative_key(folder_path) is None:
+            return None
+        files = []
+        pending = [folder_path]
+        while pending:
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            for item_name, item_path_obj, is_dir in self.list_dir(pending.pop()):
+                if not is_dir:
+                    files.append(item_path_obj)
+                elif recursive:
+                    pending.append(item_path_obj)
+        return files
+
+
+class WalkBudget:
+    # Bounds the directories a walk lists itself. Listings already in a
+    # DirectoryListingCache are free, so re-running a walk with a fresh
+    # budget resumes where the previous one stopped.
+    def __init__(
+        self,
+        max_seconds=WALK_BUDGET_SECONDS,
+        max_entries=WALK_BUDGET_MAX_ENTRIES,
+        cancel_event: threading.Event | None = None,
+    ):
+        self.max_seconds = max_seconds
+        self.max_entries = max_entries
+        self.cancel_event = cancel_event
+        self.started = time.perf_counter()
+        self.entries = 0
+
+    def charge(self, entries: int):
+        self.entries += entries
+
+    def exhausted(self) -> bool:
+        return bool(
+            (self.cancel_event is not None and self.cancel_event.is_set())
+            or (self.max_entries is not None and self.entries >= self.max_entries)
+            or (
+                self.max_seconds is not None
+                and time.perf_counter() - self.started >= self.max_seconds
+            )
+        )
+
+
+def build_file_tree_string(
+    folder_path: Path,
+    indent="",
+    tree_lines=None,
+    gitignore_matcher=None,
+    use_gitignore_flag=True,
+    custom_ignore_patterns=None,
+    project_root_path_for_custom=None,
+    listing_cache: DirectoryListingCache | None = None,
+    budget: WalkBudget | None = None,
+    unvisited_dirs: list[Path] | None = None,
+):
+    if tree_lines is None:
+        tree_lines = []
+    if listing_cache is None:
+        listing_cache = DirectoryListingCache(
+            gitignore_matcher,
+            use_gitignore_flag,
+            custom_ignore_patterns,
+            project_root_path_for_custom,
+        )
+
+    fresh_listing = budget is not None and not listing_cache.has_listing(folder_path)
+    try:
+        visible_items_data = listing_cache.list_dir(folder_path)
+    except PermissionError:
+        tree_lines.append(f"{indent}[ACCESS DENIED] {folder_path.name}")
+        return "\n".join(tree_lines) if not indent else None
+    except FileNotFoundError:
+        tree_lines.append(f"{indent}[NOT FOUND] {folder_path.name}")
+        return "\n".join(tree_lines) if not indent else None
+    except OSError as e:
+        tree_lines.append(f"{indent}[ERROR ITERATING] {folder_path.name}: {e}")
+        return "\n".join(tree_lines) if not indent else None
+    if fresh_listing:
+        budget.charge(len(visible_items_data) + 1)
 
     for i, (item_name, item_path_obj, is_dir_val) in enumerate(visible_items_data):
         is_last = i == len(visible_items_data) - 1
         connector = "└── " if is_last else "├── "
-        if is_dir_val:
+        skip_reason = listing_cache.skip_reason(item_path_obj) if is_dir_val else None
+        if skip_reason:
+            tree_lines.append(f"{indent}{connector}{item_name}/ [{skip_reason}]")
+        elif (
+            is_dir_val
+            and budget is not None
+            and budget.exhausted()
+            and not listing_cache.has_listing(item_path_obj)
+        ):
+            tree_lines.append(
+                f"{indent}{connector}{item_name}/ {WALK_UNVISITED_MARKER}"
+            )
+            if unvisited_dirs is not None:
+                unvisited_dirs.append(item_path_obj)
+        elif is_dir_val:
             tree_lines.append(f"{indent}{connector}{item_name}/")
             new_indent = indent + ("    " if is_last else "│   ")
             build_file_tree_string(
@@ -194,6 +1059,9 @@ def build_file_tree_string(
                 use_gitignore_flag,
                 custom_ignore_patterns,
                 project_root_path_for_custom,
+                listing_cache,
+                budget,
+                unvisited_dirs,
             )
         else:
             tree_lines.append(f"{indent}{connector}{item_name}")
@@ -203,76 +1071,2026 @@ def build_file_tree_string(
     return None
 
 
-def read_file_content(file_path_str: str) -> str:
+def diff_line_edits(old_lines: list[str], new_lines: list[str]):
+    prefix = 0
+    max_prefix = min(len(old_lines), len(new_lines))
+    while prefix < max_prefix and old_lines[prefix] == new_lines[prefix]:
+        prefix += 1
+
+    suffix = 0
+    max_suffix = max_prefix - prefix
+    while (
+        suffix < max_suffix
+        and old_lines[len(old_lines) - 1 - suffix]
+        == new_lines[len(new_lines) - 1 - suffix]
+    ):
+        suffix += 1
+
+    old_mid = old_lines[prefix : len(old_lines) - suffix]
+    new_mid = new_lines[prefix : len(new_lines) - suffix]
+    if not old_mid and not new_mid:
+        return []
+
+    edits = []
+    matcher = difflib.SequenceMatcher(None, old_mid, new_mid)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            edits.append((prefix + i1, prefix + i2, new_mid[j1:j2]))
+    edits.reverse()
+    return edits
+
+
+_BYTE_ORDER_MARKS = (
+    (b"\x00\x00\xfe\xff", "utf-32"),
+    (b"\xff\xfe\x00\x00", "utf-32"),
+    (b"\xef\xbb\xbf", "utf-8-sig"),
+    (b"\xfe\xff", "utf-16"),
+    (b"\xff\xfe", "utf-16"),
+)
+
+
+def decode_text(raw: bytes) -> tuple[str | None, str, bool]:
+    # Returns (text, encoding, lossy); text is None when encoding is "binary".
+    for bom, encoding in _BYTE_ORDER_MARKS:
+        if raw.startswith(bom):
+            try:
+                return raw.decode(encoding), encoding, False
+            except UnicodeDecodeError:
+                break
+
+    sample = raw[:ENCODING_SNIFF_BYTES]
+    if b"\x00" in sample:
+        half = len(sample) // 2
+        even_zeros, odd_zeros = sample[0::2].count(0), sample[1::2].count(0)
+        encoding = None
+        if half and odd_zeros > half * 0.3 and even_zeros < half * 0.05:
+            encoding = "utf-16-le"
+        elif half and even_zeros > half * 0.3 and odd_zeros < half * 0.05:
+            encoding = "utf-16-be"
+        if encoding:
+            try:
+                return raw.decode(encoding), encoding, False
+            except UnicodeDecodeError:
+                # Odd length or a lone surrogate: keep what decodes unless
+                # most of it does not.
+                text = raw.decode(encoding, errors="replace")
+                if text.count("\ufffd") * 4 < len(text):
+                    return text, encoding, True
+                return None, "binary", False
+
+    try:
+        return raw.decode("utf-8"), "utf-8", False
+    except UnicodeDecodeError:
+        pass
+    if b"\x00" in sample:
+        return None, "binary", False
+
+    # Mostly well-formed UTF-8 with a few bad bytes is a damaged UTF-8 file;
+    # otherwise assume a legacy single-byte encoding.
+    high_bytes = sum(1 for byte in sample if byte >= 0x80)
+    bad_chars = sample.decode("utf-8", errors="replace").count("\ufffd")
+    if high_bytes and bad_chars * 4 < high_bytes:
+        return raw.decode("utf-8", errors="replace"), "utf-8", True
+    try:
+        return raw.decode("cp1252"), "cp1252", False
+    except UnicodeDecodeError:
+        return raw.decode("latin-1"), "latin-1", False
+
+
+def read_file_text(file_path_str: str) -> tuple[str, str | None, bool]:
     file_path = Path(file_path_str)
     try:
-        if file_path.stat().st_size > MAX_FILE_SIZE_BYTES:
-            return f"[File too large (>{MAX_FILE_SIZE_BYTES//1024//1024}MB): {file_path.name}]\n"
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            return f.read()
+        stat_result = file_path.stat()
+        if stat_result.st_size > MAX_FILE_SIZE_BYTES:
+            return (
+                f"[File too large (>{MAX_FILE_SIZE_BYTES//1024//1024}MB): {file_path.name}]\n",
+                None,
+                False,
+            )
+        with open(file_path, "rb") as f:
+            raw = f.read()
     except Exception as e:
-        return f"[Error reading file {file_path.name}: {e}]\n"
+        return f"[Error reading file {file_path.name}: {e}]\n", None, False
+    PERF_STATS.add_counts({"files_read": 1, "bytes_read": len(raw)})
+
+    content, encoding, lossy = decode_text(raw)
+    if content is None:
+        PERF_STATS.add_counts({"files_binary": 1})
+        return f"[Binary file: {file_path.name}]\n", encoding, False
+    if encoding != "utf-8":
+        PERF_STATS.add_counts({"files_non_utf8": 1})
+    if lossy:
+        PERF_STATS.add_counts({"files_decoded_lossy": 1})
+    if "\r" in content:
+        content = content.replace("\r\n", "\n").replace("\r", "\n")
+    return content, encoding, lossy
 
 
-class LLMPromptApp(ctk.CTk):
-    def __init__(self):
-        super().__init__()
-        logging.info("Application starting...")
-        self.title("LLM Prompt Generator")
-        window_width = 1200
-        window_height = 900
+def read_file_content(file_path_str: str) -> str:
+    return read_file_text(file_path_str)[0]
 
-        screen_width = self.winfo_screenwidth()
-        screen_height = self.winfo_screenheight()
-        x = (screen_width - window_width) // 2
-        y = (screen_height - window_height) // 2
-        self.geometry(f"{window_width}x{window_height}+{x}+{y}")
 
-        icon_path_str = resource_path("promptgen/assets/icon.ico")
-        if icon_path_str:
-            self.icon_path = icon_path_str
-            self.iconbitmap(self.icon_path, default=self.icon_path)
-        else:
-            self.icon_path = None
+def describe_decoding(encoding: str | None, lossy: bool) -> str | None:
+    if lossy:
+        return f"lossy {encoding} decode: invalid bytes replaced"
+    if encoding in ("cp1252", "latin-1"):
+        return f"encoding guessed as {encoding}"
+    return None
 
-        ctk.set_appearance_mode("System")
-        ctk.set_default_color_theme("blue")
 
-        self.project_folder_path: Path | None = None
-        self.main_file_paths: list[str] = []
-        self.gitignore_matcher = lambda path_to_check: False
+class FileReadCache:
+    def __init__(self, max_chars=FILE_CACHE_MAX_CHARS):
+        self.max_chars = max_chars
+        self._entries: OrderedDict[str, list] = OrderedDict()
+        self._total_chars = 0
+        self._lock = threading.Lock()
 
-        self.executor = concurrent.futures.ThreadPoolExecutor(
-            max_workers=os.cpu_count() or 1
-        )
-        self.ui_queue = queue.Queue()
-        self.active_background_tasks = 0
-        self._controls_to_disable_while_loading = []
-        self.progress_popup = None
+    def _lookup(self, file_path_str: str):
+        try:
+            stat_result = os.stat(file_path_str)
+            signature = (stat_result.st_mtime_ns, stat_result.st_size)
+        except OSError:
+            signature = None
+
+        with self._lock:
+            entry = self._entries.get(file_path_str)
+            if entry is not None and signature is not None and entry[0] == signature:
+                self._entries.move_to_end(file_path_str)
+                PERF_STATS.add_counts({"read_cache_hits": 1})
+                return entry
+
+        content, encoding, lossy = read_file_text(file_path_str)
+        entry = [
+            signature,
+            content,
+            None,
+            describe_decoding(encoding, lossy),
+            encoding not in (None, "binary"),
+        ]
+        PERF_STATS.add_counts({"read_cache_misses": 1})
+        if signature is None:
+            return entry
+
+        with self._lock:
+            previous = self._entries.pop(file_path_str, None)
+            if previous is not None:
+                self._total_chars -= len(previous[1])
+            self._entries[file_path_str] = entry
+            self._total_chars += len(content)
+            while self._total_chars > self.max_chars and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_chars -= len(evicted[1])
+        return entry
+
+    def read(self, file_path_str: str) -> str:
+        return self._lookup(file_path_str)[1]
+
+    def read_with_digest(self, file_path_str: str) -> tuple[str, str]:
+        content, digest, _, _ = self.read_details(file_path_str, with_digest=True)
+        return content, digest
+
+    def read_details(
+        self, file_path_str: str, with_digest=False
+    ) -> tuple[str, str | None, str | None, bool]:
+        # (content, digest or None, note on how the bytes were decoded,
+        # False when content is a placeholder for a binary or unreadable file)
+        entry = self._lookup(file_path_str)
+        if with_digest and entry[2] is None:
+            entry[2] = hashlib.blake2b(
+                entry[1].encode("utf-8", "surrogatepass"), digest_size=16
+            ).hexdigest()
+        return entry[1], entry[2], entry[3], entry[4]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_chars = 0
+
+
+FILE_CACHE = FileReadCache()
+
+
+def language_for_path(file_path_str: str) -> str | None:
+    return LANGUAGE_BY_EXTENSION.get(os.path.splitext(file_path_str)[1].lower())
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN_ESTIMATE)
+
+
+class ContentTransformCache:
+    # Results of pure content transforms keyed by (transform, language, digest),
+    # so renamed or duplicated files share one entry.
+    def __init__(self, max_chars=TRANSFORM_CACHE_MAX_CHARS):
+        self.max_chars = max_chars
+        self._entries: OrderedDict[tuple, str] = OrderedDict()
+        self._total_chars = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, compute) -> str:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                PERF_STATS.add_counts({"transform_cache_hits": 1})
+                return result
+
+        result = compute()
+        PERF_STATS.add_counts({"transform_cache_misses": 1})
+        self.put(key, result)
+        return result
+
+    def contains(self, key: tuple) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key: tuple, result: str):
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = result
+                self._total_chars += len(result)
+            while self._total_chars > self.max_chars and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_chars -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_chars = 0
+
+
+TRANSFORM_CACHE = ContentTransformCache()
+
+_C_STYLE_STRING_PATTERN = (
+    r"\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`"
+)
+_C_STYLE_COMMENT_RE = re.compile(
+    rf"({_C_STYLE_STRING_PATTERN})|/\*.*?\*/|//[^\n]*",
+    re.S,
+)
+# A slash after an operand is division; anywhere else it opens a regex
+# literal, which is kept whole so a "//" inside it is not read as a comment.
+_REGEX_LITERAL_COMMENT_RE = re.compile(
+    rf"({_C_STYLE_STRING_PATTERN}|[\w$)\]]\s*/(?![/*])"
+    r"|/(?![*/])(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n\[])+/)"
+    r"|/\*.*?\*/|//[^\n]*",
+    re.S,
+)
+_BLOCK_COMMENT_RE = re.compile(rf"({_C_STYLE_STRING_PATTERN})|/\*.*?\*/", re.S)
+_MARKUP_COMMENT_RE = re.compile(r"<!--.*?-->", re.S)
+
+
+def _strip_python_comments_and_docstrings(content: str) -> str:
+    # Split exactly as tokenize does: str.splitlines also breaks on form
+    # feeds and other separators, which would shift every later offset.
+    line_offsets = [0]
+    for line in io.StringIO(content):
+        line_offsets.append(line_offsets[-1] + len(line))
+
+    def offset(position):
+        return line_offsets[position[0] - 1] + position[1]
+
+    tokens = [
+        token
+        for token in tokenize.generate_tokens(io.StringIO(content).readline)
+        if token.type not in (tokenize.NL,)
+    ]
+    removals = []
+    previous_type = None
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token.type == tokenize.COMMENT:
+            removals.append((offset(token.start), offset(token.end), ""))
+            index += 1
+            continue
+        if token.type == tokenize.STRING and previous_type in (
+            None,
+            tokenize.INDENT,
+        ):
+            end = index
+            while end + 1 < len(tokens) and tokens[end + 1].type in (
+                tokenize.STRING,
+                tokenize.COMMENT,
+            ):
+                end += 1
+            following = []
+            lookahead = end + 1
+            while lookahead < len(tokens) and len(following) < 2:
+                if tokens[lookahead].type != tokenize.COMMENT:
+                    following.append(tokens[lookahead].type)
+                lookahead += 1
+            if following[:1] == [tokenize.NEWLINE]:
+                # A block left with only its docstring still needs a body.
+                empty_block = previous_type == tokenize.INDENT and following[1:2] == [
+                    tokenize.DEDENT
+                ]
+                removals.append(
+                    (
+                        offset(token.start),
+                        offset(tokens[end].end),
+                        "..." if empty_block else "",
+                    )
+                )
+                previous_type = tokenize.NEWLINE
+                index = end + 2
+                continue
+        previous_type = token.type
+        index += 1
+
+    pieces = []
+    kept_from = 0
+    for start, end, replacement in removals:
+        pieces.append(content[kept_from:start])
+        pieces.append(replacement)
+        kept_from = end
+    pieces.append(content[kept_from:])
+    return "".join(pieces)
+
+
+def _collapse_blank_lines(content: str) -> str:
+    lines = []
+    previous_blank = True
+    for line in content.split("\n"):
+        line = line.rstrip()
+        if not line and previous_blank:
+            continue
+        previous_blank = not line
+        lines.append(line)
+    return "\n".join(lines).rstrip("\n")
 
-        self.custom_ignore_debounce_timer = None
-        self.instructions_debounce_timer = None
 
-        self.config_dir = Path.home() / "Documents" / "PromptGenConfigs"
+def minify_content(content: str, language: str | None) -> str:
+    if language == "python":
         try:
-            self.config_dir.mkdir(parents=True, exist_ok=True)
-            logging.info(f"Configuration directory: {self.config_dir}")
-        except Exception as e:
-            logging.error(f"Could not create config directory {self.config_dir}: {e}")
-        self.config_toplevel = None
+            content = _strip_python_comments_and_docstrings(content)
+        except (tokenize.TokenError, SyntaxError):
+            content = "\n".join(
+                line
+                for line in content.split("\n")
+                if not line.lstrip().startswith("#")
+            )
+    elif language in C_STYLE_COMMENT_LANGUAGES:
+        pattern = (
+            _REGEX_LITERAL_COMMENT_RE
+            if language in REGEX_LITERAL_LANGUAGES
+            else _C_STYLE_COMMENT_RE
+        )
+        content = pattern.sub(lambda m: m.group(1) or "", content)
+    elif language in BLOCK_COMMENT_LANGUAGES:
+        content = _BLOCK_COMMENT_RE.sub(lambda m: m.group(1) or "", content)
+    elif language in HASH_COMMENT_LANGUAGES:
+        content = "\n".join(
+            line for line in content.split("\n") if not line.lstrip().startswith("#")
+        )
+    elif language == "sql":
+        content = "\n".join(
+            line for line in content.split("\n") if not line.lstrip().startswith("--")
+        )
+    elif language in MARKUP_COMMENT_LANGUAGES:
+        content = _MARKUP_COMMENT_RE.sub("", content)
+    return _collapse_blank_lines(content)
+
+
+_OUTLINE_LINE_RE = re.compile(
+    r"^\s*(?:(?:export|public|private|protected|internal|static|abstract|final"
+    r"|async|pub(?:\([^)]*\))?|default|override|virtual|extern|inline|unsafe)\s+)*"
+    r"(?:import|from|#include|using|use|require|package|module|namespace|class"
+    r"|interface|struct|enum|trait|impl|type|fn|func|function|def)\b"
+    r"|^\s*(?:export\s+)?(?:const|let|var)\s+\w+\s*=\s*(?:async\s*)?"
+    r"(?:\([^)]*\)|\w+)\s*=>"
+)
 
-        self.file_tree_expanded = False
-        self.prompt_expanded = False
-        self.default_row_weights = {
-            0: 0,
-            1: 0,
-            2: 3,
-            3: 1,
-            4: 0,
-            5: 2,
-        }
 
-        self._setup_ui()
+def _docstring_summary(node, indent):
+    docstring = ast.get_docstring(node)
+    if not docstring:
+        return []
+    return [f'{indent}"""{docstring.strip().splitlines()[0]}"""']
+
+
+def _outline_python(content: str) -> str:
+    module = ast.parse(content)
+    lines = _docstring_summary(module, "")
+
+    def visit(body, indent):
+        for node in body:
+            if isinstance(node, (ast.Import, ast.ImportFrom)) and not indent:
+                lines.append(ast.unparse(node))
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                lines.extend(f"{indent}@{ast.unparse(d)}" for d in node.decorator_list)
+                prefix = (
+                    "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+                )
+                returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+                lines.append(
+                    f"{indent}{prefix} {node.name}({ast.unparse(node.args)}){returns}:"
+                )
+                lines.extend(_docstring_summary(node, indent + "    "))
+            elif isinstance(node, ast.ClassDef):
+                lines.extend(f"{indent}@{ast.unparse(d)}" for d in node.decorator_list)
+                bases = [ast.unparse(b) for b in node.bases]
+                bases += [ast.unparse(k) for k in node.keywords]
+                lines.append(
+                    f"{indent}class {node.name}"
+                    f"{'(' + ', '.join(bases) + ')' if bases else ''}:"
+                )
+                lines.extend(_docstring_summary(node, indent + "    "))
+                visit(node.body, indent + "    ")
+
+    visit(module.body, "")
+    return "\n".join(lines)
+
+
+def outline_content(content: str, language: str | None) -> str:
+    if language == "python":
+        try:
+            return _outline_python(content)
+        except (SyntaxError, ValueError):
+            pass
+    if language == "markdown":
+        return "\n".join(
+            line.rstrip() for line in content.split("\n") if line.startswith("#")
+        )
+    return "\n".join(
+        line.rstrip().rstrip("{").rstrip()
+        for line in content.split("\n")
+        if _OUTLINE_LINE_RE.match(line)
+    )
+
+
+def _python_imports(content: str) -> list[tuple[int, str]]:
+    module = ast.parse(content)
+    imports = []
+    for node in ast.walk(module):
+        if isinstance(node, ast.Import):
+            imports.extend((0, alias.name) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            imports.append((node.level, base))
+            imports.extend(
+                (node.level, f"{base}.{alias.name}" if base else alias.name)
+                for alias in node.names
+                if alias.name != "*"
+            )
+    return imports
+
+
+def _resolve_python_import(level, module, file_path: Path, roots) -> Path | None:
+    parts = module.split(".") if module else []
+    if level:
+        base = file_path.parent
+        for _ in range(level - 1):
+            base = base.parent
+        roots = [base]
+    for root in roots:
+        target = root.joinpath(*parts)
+        if parts and target.with_name(parts[-1] + ".py").is_file():
+            return target.with_name(parts[-1] + ".py")
+        if (target / "__init__.py").is_file():
+            return target / "__init__.py"
+    return None
+
+
+IMPORT_PARSERS = {"python": _python_imports}
+IMPORT_RESOLVERS = {"python": _resolve_python_import}
+
+
+def extract_imports(content: str, language: str | None) -> str:
+    # One "level module" line per import, so results fit the transform cache.
+    parser = IMPORT_PARSERS.get(language)
+    if parser is None:
+        return ""
+    try:
+        imports = parser(content)
+    except (SyntaxError, ValueError):
+        return ""
+    return "\n".join(f"{level} {module}" for level, module in imports)
+
+
+CONTENT_TRANSFORMS = {
+    "minify": minify_content,
+    "outline": outline_content,
+    "imports": extract_imports,
+}
+
+
+def _run_transform_batch(batch):
+    return [
+        CONTENT_TRANSFORMS[kind](content, language) for kind, language, content in batch
+    ]
+
+
+class TransformPool:
+    # CPU-bound transforms hold the GIL, so large batches go to worker
+    # processes. Small batches, PROMPTGEN_PROCESS_POOL=0, single-core machines
+    # and any pool failure run in the calling (background) thread instead.
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.enabled = (
+            os.environ.get("PROMPTGEN_PROCESS_POOL", "1") != "0"
+            and self.max_workers > 1
+        )
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None and self.enabled:
+                try:
+                    self._executor = concurrent.futures.ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                except (OSError, ValueError, NotImplementedError) as e:
+                    logging.warning(f"Process pool unavailable, using threads: {e}")
+                    self.enabled = False
+            return self._executor
+
+    def _batches(self, jobs, total_chars):
+        batch_chars = max(
+            total_chars // (self.max_workers * 4), PROCESS_POOL_MIN_BATCH_CHARS
+        )
+        batch, size = [], 0
+        for job in jobs:
+            batch.append(job)
+            size += len(job[2])
+            if size >= batch_chars:
+                yield batch
+                batch, size = [], 0
+        if batch:
+            yield batch
+
+    def run(self, jobs: list[tuple[str, str | None, str]]) -> list[str]:
+        total_chars = sum(len(job[2]) for job in jobs)
+        executor = (
+            self._get_executor()
+            if total_chars >= PROCESS_POOL_MIN_CHARS and len(jobs) > 1
+            else None
+        )
+        if executor is not None:
+            batches = list(self._batches(jobs, total_chars))
+            try:
+                with PERF_STATS.span("transform.process_pool"):
+                    results = [
+                        result
+                        for batch_results in executor.map(_run_transform_batch, batches)
+                        for result in batch_results
+                    ]
+                PERF_STATS.add_counts(
+                    {
+                        "transform_process_jobs": len(jobs),
+                        "transform_process_batches": len(batches),
+                    }
+                )
+                return results
+            except Exception as e:
+                logging.warning(f"Process pool failed, using threads: {e}")
+                self.shutdown()
+                self.enabled = False
+        with PERF_STATS.span("transform.in_thread"):
+            return _run_transform_batch(jobs)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+TRANSFORM_POOL = TransformPool()
+
+
+def precompute_transforms(
+    file_paths, minify=False, outline_paths=None, changed_hunks=None
+):
+    jobs, keys, queued = [], [], set()
+    for file_path_str in file_paths:
+        if changed_hunks and changed_hunks.get(file_path_str):
+            continue
+        if outline_paths and file_path_str in outline_paths:
+            kind = "outline"
+        elif minify:
+            kind = "minify"
+        else:
+            continue
+        content, digest = FILE_CACHE.read_with_digest(file_path_str)
+        language = language_for_path(file_path_str)
+        key = (kind, language, digest)
+        if key not in queued and not TRANSFORM_CACHE.contains(key):
+            queued.add(key)
+            keys.append(key)
+            jobs.append((kind, language, content))
+    if jobs:
+        for key, result in zip(keys, TRANSFORM_POOL.run(jobs)):
+            TRANSFORM_CACHE.put(key, result)
+
+
+class ImportGraph:
+    # Local import edges, computed lazily per file and reused while its
+    # content digest is unchanged. Parsed imports live in TRANSFORM_CACHE,
+    # keyed by digest, so identical files are parsed once.
+    def __init__(self, project_root: Path):
+        self.project_root = project_root.resolve(strict=False)
+        self.source_roots = [self.project_root, self.project_root / "src"]
+        self._edges: dict[str, tuple[str, list[str]]] = {}
+        self._lock = threading.Lock()
+
+    def dependencies(self, file_path_str: str) -> list[str]:
+        language = language_for_path(file_path_str)
+        resolver = IMPORT_RESOLVERS.get(language)
+        if resolver is None:
+            return []
+        content, digest = FILE_CACHE.read_with_digest(file_path_str)
+        with self._lock:
+            cached = self._edges.get(file_path_str)
+        if cached is not None and cached[0] == digest:
+            PERF_STATS.add_counts({"import_graph_hits": 1})
+            return cached[1]
+
+        with TRACER.span("imports.parse", {"path": file_path_str}):
+            imports = TRANSFORM_CACHE.get(
+                ("imports", language, digest),
+                lambda: extract_imports(content, language),
+            )
+        file_path = Path(file_path_str)
+        roots = [*self.source_roots, file_path.parent]
+        dependencies = []
+        for line in imports.splitlines():
+            level, module = line.split(" ", 1)
+            resolved = resolver(int(level), module, file_path, roots)
+            if resolved is None:
+                continue
+            resolved_str = str(resolved.resolve(strict=False))
+            if (
+                resolved_str != file_path_str
+                and resolved_str not in dependencies
+                and Path(resolved_str).is_relative_to(self.project_root)
+            ):
+                dependencies.append(resolved_str)
+        with self._lock:
+            self._edges[file_path_str] = (digest, dependencies)
+        PERF_STATS.add_counts({"import_graph_misses": 1})
+        return dependencies
+
+    def expand(self, file_paths, depth: int) -> list[str]:
+        seen = set(file_paths)
+        frontier = list(file_paths)
+        added = []
+        for _ in range(depth):
+            next_frontier = []
+            for file_path_str in frontier:
+                for dependency in self.dependencies(file_path_str):
+                    if dependency not in seen:
+                        seen.add(dependency)
+                        added.append(dependency)
+                        next_frontier.append(dependency)
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        return added
+
+
+_QUANTIFIER_BRACES_RE = re.compile(r"\{\d*(?:,\d*)?\}")
+# A whole escape sequence, including the arguments of \x, \u, \U, \N and
+# octal or group-number escapes.
+_REGEX_ESCAPE_RE = re.compile(
+    r"\\(?:x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8}|N\{[^}]*\}"
+    r"|0[0-7]{0,2}|[0-7]{3}|[1-9][0-9]?|.)",
+    re.S,
+)
+
+
+def regex_required_literals(pattern: str) -> list[str]:
+    # Literal runs every match must contain, found conservatively: anything
+    # inside groups or classes, or made optional by a quantifier, is dropped,
+    # and alternation disables filtering altogether.
+    if "|" in pattern:
+        return []
+    runs, run = [], ""
+    depth = i = 0
+    while i < len(pattern):
+        char, literal = pattern[i], None
+        if char == "\\":
+            escape = _REGEX_ESCAPE_RE.match(pattern, i)
+            i = escape.end() if escape else len(pattern)
+            escaped = escape.group() if escape else ""
+            if len(escaped) == 2 and not escaped[1].isalnum():
+                literal = escaped[1]
+        elif char == "[":
+            i += 1
+            if pattern[i : i + 1] == "^":
+                i += 1
+            if pattern[i : i + 1] == "]":
+                i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            i += 1
+        elif char == "{" and _QUANTIFIER_BRACES_RE.match(pattern, i):
+            i = _QUANTIFIER_BRACES_RE.match(pattern, i).end()
+        elif char in "()":
+            depth += 1 if char == "(" else -1
+            i += 1
+        elif char in ".^$+?*":
+            i += 1
+        else:
+            literal = char
+            i += 1
+
+        optional = pattern[i : i + 1] in ("?", "*") or bool(
+            _QUANTIFIER_BRACES_RE.match(pattern, i)
+        )
+        if literal is not None and depth == 0 and not optional:
+            run += literal
+            if pattern[i : i + 1] != "+":
+                continue
+        runs.append(run)
+        run = ""
+    runs.append(run)
+    return [run for run in runs if len(run) >= 3]
+
+
+class TrigramIndex:
+    # Maps lowercased trigrams to the ids of the text files containing them.
+    # Changed files get a new id and their old one is tombstoned; postings
+    # are compacted once dead ids outnumber live ones.
+    def __init__(self, project_root: Path | None = None):
+        self.project_root = (
+            project_root.resolve(strict=False) if project_root is not None else None
+        )
+        self._lock = threading.Lock()
+        self._signatures: dict[str, tuple[int, int]] = {}
+        self._paths: list[str | None] = []
+        self._ids: dict[str, int] = {}
+        self._postings: dict[str, array.array] = {}
+        self._dead = 0
+
+    def file_count(self) -> int:
+        with self._lock:
+            return len(self._ids)
+
+    def update(self, file_paths, cancel_event=None) -> dict:
+        return update_content_indexes([self], file_paths, cancel_event)
+
+    def signature(self, path_str: str) -> tuple[int, int] | None:
+        return self._signatures.get(path_str)
+
+    def add_file(self, path_str: str, signature, content: str | None):
+        trigrams = None
+        if content:
+            content = content.lower()
+            trigrams = {content[i : i + 3] for i in range(len(content) - 2)}
+        with self._lock:
+            self._remove(path_str)
+            self._signatures[path_str] = signature
+            if trigrams:
+                file_id = len(self._paths)
+                self._paths.append(path_str)
+                self._ids[path_str] = file_id
+                for trigram in trigrams:
+                    posting = self._postings.get(trigram)
+                    if posting is None:
+                        self._postings[trigram] = array.array("I", (file_id,))
+                    else:
+                        posting.append(file_id)
+
+    def prune(self, seen_paths) -> int:
+        with self._lock:
+            removed = [p for p in self._signatures if p not in seen_paths]
+            for path_str in removed:
+                self._remove(path_str)
+                del self._signatures[path_str]
+            if self._dead > len(self._ids):
+                self._compact()
+            PERF_STATS.set_gauges(
+                {
+                    "content_index_files": len(self._ids),
+                    "content_index_trigrams": len(self._postings),
+                }
+            )
+        return len(removed)
+
+    def search(self, pattern: re.Pattern, literals) -> list[str]:
+        trigrams = {
+            literal[i : i + 3].lower()
+            for literal in literals
+            for i in range(len(literal) - 2)
+        }
+        with self._lock:
+            if trigrams:
+                postings = sorted(
+                    (self._postings.get(trigram, ()) for trigram in trigrams), key=len
+                )
+                candidate_ids = set(postings[0])
+                for posting in postings[1:]:
+                    if not candidate_ids:
+                        break
+                    candidate_ids.intersection_update(posting)
+                candidates = [self._paths[file_id] for file_id in candidate_ids]
+            else:
+                candidates = list(self._ids)
+        PERF_STATS.add_counts({"content_search_candidates": len(candidates)})
+        return sorted(
+            path_str
+            for path_str in candidates
+            if path_str is not None and pattern.search(FILE_CACHE.read(path_str))
+        )
+
+    def _remove(self, path_str):
+        file_id = self._ids.pop(path_str, None)
+        if file_id is not None:
+            self._paths[file_id] = None
+            self._dead += 1
+
+    def _compact(self):
+        new_ids = {}
+        for file_id, path_str in enumerate(self._paths):
+            if path_str is not None:
+                new_ids[file_id] = len(new_ids)
+        compacted = {}
+        for trigram, posting in self._postings.items():
+            kept = array.array("I", (new_ids[i] for i in posting if i in new_ids))
+            if kept:
+                compacted[trigram] = kept
+        self._postings = compacted
+        self._paths = [path_str for path_str in self._paths if path_str is not None]
+        self._ids = {path_str: file_id for file_id, path_str in enumerate(self._paths)}
+        self._dead = 0
+
+
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_SUBWORD_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+
+def ranking_terms(text: str) -> list[str]:
+    # Lowercased identifiers plus their snake_case/camelCase sub-words.
+    terms = []
+    for identifier in _IDENTIFIER_RE.findall(text):
+        subwords = _SUBWORD_RE.findall(identifier)
+        if len(subwords) > 1:
+            terms.append(identifier.lower())
+        terms.extend(word.lower() for word in subwords if len(word) > 1)
+    return terms
+
+
+class RelevanceIndex:
+    # Okapi BM25 over identifier terms and the file's project-relative path
+    # tokens, which are weighted up. A changed file's term counts replace
+    # its old ones.
+    def __init__(self, project_root: Path | None = None):
+        self.project_root = (
+            project_root.resolve(strict=False) if project_root is not None else None
+        )
+        self._lock = threading.Lock()
+        self._signatures: dict[str, tuple[int, int]] = {}
+        self._doc_terms: dict[str, tuple[str, ...]] = {}
+        self._doc_lengths: dict[str, int] = {}
+        self._postings: dict[str, dict[str, int]] = {}
+        self._total_length = 0
+
+    def file_count(self) -> int:
+        with self._lock:
+            return len(self._doc_lengths)
+
+    def update(self, file_paths, cancel_event=None) -> dict:
+        return update_content_indexes([self], file_paths, cancel_event)
+
+    def signature(self, path_str: str) -> tuple[int, int] | None:
+        return self._signatures.get(path_str)
+
+    def add_file(self, path_str: str, signature, content: str | None):
+        counts = Counter(ranking_terms(content)) if content else Counter()
+        for term in ranking_terms(" ".join(self._path_parts(path_str))):
+            counts[term] += RELEVANCE_PATH_TOKEN_WEIGHT
+        with self._lock:
+            self._remove(path_str)
+            self._signatures[path_str] = signature
+            self._doc_terms[path_str] = tuple(counts)
+            self._doc_lengths[path_str] = sum(counts.values())
+            self._total_length += self._doc_lengths[path_str]
+            for term, count in counts.items():
+                self._postings.setdefault(term, {})[path_str] = count
+
+    def prune(self, seen_paths) -> int:
+        with self._lock:
+            removed = [p for p in self._signatures if p not in seen_paths]
+            for path_str in removed:
+                self._remove(path_str)
+                del self._signatures[path_str]
+            PERF_STATS.set_gauges(
+                {
+                    "relevance_index_files": len(self._doc_lengths),
+                    "relevance_index_terms": len(self._postings),
+                }
+            )
+        return len(removed)
+
+    def _path_parts(self, path_str: str) -> tuple[str, ...]:
+        # Directories above the project root say nothing about the file.
+        file_path = Path(path_str)
+        if self.project_root is not None and file_path.is_relative_to(
+            self.project_root
+        ):
+            return file_path.relative_to(self.project_root).parts
+        return (file_path.name,)
+
+    def rank(self, query_text: str, top_n: int, exclude=()) -> list[tuple[str, float]]:
+        query_terms = set(ranking_terms(query_text)) - RELEVANCE_STOP_WORDS
+        scores: dict[str, float] = {}
+        with self._lock:
+            doc_count = len(self._doc_lengths)
+            if not doc_count or not query_terms:
+                return []
+            average_length = self._total_length / doc_count or 1
+            for term in query_terms:
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(
+                    1 + (doc_count - len(posting) + 0.5) / (len(posting) + 0.5)
+                )
+                for path_str, count in posting.items():
+                    length_norm = RELEVANCE_BM25_K1 * (
+                        1
+                        - RELEVANCE_BM25_B
+                        + RELEVANCE_BM25_B
+                        * self._doc_lengths[path_str]
+                        / average_length
+                    )
+                    scores[path_str] = scores.get(path_str, 0.0) + idf * count * (
+                        RELEVANCE_BM25_K1 + 1
+                    ) / (count + length_norm)
+        return [
+            (path_str, score)
+            for score, path_str in heapq.nlargest(
+                top_n,
+                ((s, p) for p, s in scores.items() if p not in exclude),
+            )
+        ]
+
+    def _remove(self, path_str):
+        terms = self._doc_terms.pop(path_str, None)
+        if terms is None:
+            return
+        self._total_length -= self._doc_lengths.pop(path_str)
+        for term in terms:
+            posting = self._postings[term]
+            del posting[path_str]
+            if not posting:
+                del self._postings[term]
+
+
+def update_content_indexes(indexes, file_paths, cancel_event=None) -> dict:
+    # One pass over the project for every content index: each changed text
+    # file is read once and handed to the indexes whose copy is stale.
+    seen = set()
+    changed = 0
+    for file_path in file_paths:
+        if cancel_event is not None and cancel_event.is_set():
+            return {"changed": changed, "cancelled": True}
+        path_str = str(file_path)
+        seen.add(path_str)
+        try:
+            stat_result = os.stat(path_str)
+        except OSError:
+            continue
+        signature = (stat_result.st_mtime_ns, stat_result.st_size)
+        stale = [index for index in indexes if index.signature(path_str) != signature]
+        if not stale:
+            continue
+        content = None
+        if stat_result.st_size <= MAX_FILE_SIZE_BYTES:
+            content, encoding, _ = read_file_text(path_str)
+            if encoding in (None, "binary"):
+                content = None
+        for index in stale:
+            index.add_file(path_str, signature, content)
+        changed += 1
+    for index in indexes:
+        changed += index.prune(seen)
+    PERF_STATS.add_counts({"content_index_files_updated": changed})
+    return {"changed": changed, "cancelled": False}
+
+
+_RAW_TEMPLATE_FIELDS = {"kind", "kind_lower", "fence", "sep", "note"}
+
+
+class PromptFormat:
+    # Templates are str.format strings bound once at import; a missing
+    # template skips its segment. Named fields are escaped for the format.
+    def __init__(self, label, extension, templates, escape=str, escape_body=str):
+        self.label = label
+        self.extension = extension
+        self.escape = escape
+        self.escape_body = escape_body
+        self.needs_fence = "{fence}" in templates["block_open"]
+        self._renderers = {
+            key: template.format
+            for key, template in templates.items()
+            if template is not None
+        }
+
+    def render(self, key, **fields) -> str | None:
+        renderer = self._renderers.get(key)
+        if renderer is None:
+            return None
+        return renderer(
+            **{
+                name: value if name in _RAW_TEMPLATE_FIELDS else self.escape(value)
+                for name, value in fields.items()
+            }
+        )
+
+    def note(self, notes) -> str:
+        return self.render("note", text="; ".join(notes)) if notes else ""
+
+    def block_open(self, fields, extra_note=None) -> str:
+        notes = [*fields["notes"], extra_note] if extra_note else fields["notes"]
+        return self.render(
+            "block_open",
+            kind=fields["kind"],
+            kind_lower=fields["kind"].lower(),
+            path=fields["path"],
+            language=fields["language"],
+            fence=fields["fence"],
+            sep=fields["sep"],
+            note=self.note(notes),
+        )
+
+    def block_close(self, fields) -> str:
+        return self.render("block_close", kind=fields["kind"], fence=fields["fence"])
+
+
+# Characters XML 1.0 does not allow at all, not even as references.
+_XML_INVALID_CHARS_RE = re.compile(
+    "[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]"
+)
+
+
+def _xml_text(text: str) -> str:
+    return escape_xml(_XML_INVALID_CHARS_RE.sub("\ufffd", text))
+
+
+def _xml_attribute(value: str) -> str:
+    return quoteattr(_XML_INVALID_CHARS_RE.sub("\ufffd", value))
+
+
+PROMPT_FORMATS = {
+    "plain": PromptFormat(
+        "Plain markers",
+        ".txt",
+        {
+            "instructions_open": "--- INSTRUCTIONS ---",
+            "instructions_close": "\n",
+            "project_open": "--- PROJECT CONTEXT: {name} ---",
+            "tree_open": "File Tree Structure (Filters: {filters}):",
+            "tree_empty": "File Tree Structure: (No files to display or all files "
+            "were ignored by filters (Filters: {filters}))",
+            "project_close": "\n",
+            "files_open": "--- MAIN FILE(S) CONTENT ---",
+            "files_close": "\n",
+            "files_empty": "--- MAIN FILE(S) CONTENT ---\n"
+            "(No main files added to the list.)\n",
+            "block_open": "--- {kind}: {path}{note} ---",
+            "block_close": "--- End {kind} ---",
+            "duplicate": "--- File: {path}{note} (identical to {first}) ---",
+            "note": " ({text})",
+        },
+    ),
+    "markdown": PromptFormat(
+        "Markdown fences",
+        ".md",
+        {
+            "instructions_open": "## Instructions",
+            "instructions_close": "",
+            "project_open": "## Project: {name}",
+            "tree_open": "File tree (filters: {filters}):\n```",
+            "tree_close": "```",
+            "tree_empty": "File tree: no files to display or all files were "
+            "ignored (filters: {filters}).",
+            "project_close": "",
+            "files_open": "## Files",
+            "files_close": "",
+            "files_empty": "## Files\n\n(No main files added to the list.)",
+            "block_open": "### {kind}: `{path}`{note}\n{fence}{language}",
+            "block_close": "{fence}",
+            "duplicate": "### File: `{path}`{note} (identical to `{first}`)",
+            "note": " ({text})",
+        },
+    ),
+    "xml": PromptFormat(
+        "XML tags",
+        ".xml",
+        {
+            "document_open": "<prompt>",
+            "instructions_open": "<instructions>",
+            "instructions_close": "</instructions>",
+            "project_open": "<project name={name}>",
+            "tree_open": "<file_tree filters={filters}>",
+            "tree_close": "</file_tree>",
+            "tree_empty": "<file_tree filters={filters} />",
+            "project_close": "</project>",
+            "files_open": "<documents>",
+            "files_close": "</documents>",
+            "files_empty": "<documents />",
+            "block_open": '<document kind="{kind_lower}" path={path} '
+            "language={language}{note}>",
+            "block_close": "</document>",
+            "duplicate": '<document kind="file" path={path}{note} identical_to={first} />',
+            "note": " note={text}",
+            "document_close": "</prompt>",
+        },
+        escape=_xml_attribute,
+        escape_body=_xml_text,
+    ),
+    "json": PromptFormat(
+        "JSON manifest",
+        ".json",
+        {
+            "document_open": "{{",
+            "instructions_open": '"instructions":',
+            "instructions_close": ",",
+            "project_open": '"project": {name},',
+            "tree_open": '"file_tree_filters": {filters},\n"file_tree":',
+            "tree_close": ",",
+            "tree_empty": '"file_tree_filters": {filters},\n"file_tree": null,',
+            "files_open": '"files": [',
+            "files_close": "]",
+            "files_empty": '"files": []',
+            "block_open": '{sep}{{"kind": "{kind_lower}", "path": {path}, '
+            '"language": {language}{note}, "content":',
+            "block_close": "}}",
+            "duplicate": '{sep}{{"kind": "file", "path": {path}{note}, '
+            '"identical_to": {first}}}',
+            "note": ', "note": {text}',
+            "document_close": "}}",
+        },
+        escape=functools.partial(json.dumps, ensure_ascii=False),
+        escape_body=functools.partial(json.dumps, ensure_ascii=False),
+    ),
+}
+
+
+class PromptBuffer:
+    def __init__(self, segments: list[str], file_starts=(), header_end=0):
+        segments = list(segments)
+        leading_blank = 0
+        while segments and not segments[0].strip():
+            segments.pop(0)
+            leading_blank += 1
+        while segments and not segments[-1].strip():
+            segments.pop()
+        if segments:
+            segments[0] = segments[0].lstrip()
+            segments[-1] = segments[-1].rstrip()
+        self.segments = segments
+        # Segment index where each file's block begins, mapped to the fields
+        # its header was rendered from; parts and chunks split only there.
+        self.file_starts = {
+            index - leading_blank: fields
+            for index, fields in dict(file_starts).items()
+            if 0 < index - leading_blank < len(segments)
+        }
+        self.header_end = min(max(0, header_end - leading_blank), len(segments))
+        self.output_format = PROMPT_FORMATS[DEFAULT_PROMPT_FORMAT]
+        self.char_count = sum(len(segment) for segment in segments) + max(
+            0, len(segments) - 1
+        )
+        self.stats: dict[str, int] = {}
+
+    def __bool__(self):
+        return self.char_count > 0
+
+    def iter_chunks(self):
+        for i, segment in enumerate(self.segments):
+            if i:
+                yield "\n"
+            yield segment
+
+    def text(self) -> str:
+        with PERF_STATS.span("prompt.join"):
+            return "\n".join(self.segments)
+
+    def preview(self, max_chars: int) -> str:
+        if self.char_count <= max_chars:
+            return self.text()
+        preview_chunks = []
+        remaining = max_chars
+        for chunk in self.iter_chunks():
+            if len(chunk) >= remaining:
+                preview_chunks.append(chunk[:remaining])
+                break
+            preview_chunks.append(chunk)
+            remaining -= len(chunk)
+        preview_chunks.append(
+            f"\n\n[... Preview truncated: {self.char_count - max_chars:,} more "
+            "characters. Copy and Export use the full prompt. ...]"
+        )
+        return "".join(preview_chunks)
+
+    def write_to(self, file_obj):
+        for chunk in self.iter_chunks():
+            file_obj.write(chunk)
+
+    def split_parts(self, max_chars: int) -> list["PromptBuffer"]:
+        if self.char_count <= max_chars:
+            return [self]
+        bounds = [0, *self.file_starts, len(self.segments)]
+        groups = []
+        group_start = group_chars = 0
+        for start, end in zip(bounds, bounds[1:]):
+            block_chars = sum(len(s) + 1 for s in self.segments[start:end])
+            if group_chars and group_chars + block_chars > max_chars:
+                groups.append((group_start, start))
+                group_start, group_chars = start, 0
+            group_chars += block_chars
+        groups.append((group_start, len(self.segments)))
+        return [
+            PromptBuffer(
+                [f"--- Part {number} of {len(groups)} ---", *self.segments[start:end]]
+            )
+            for number, (start, end) in enumerate(groups, 1)
+        ]
+
+
+class PromptChunks:
+    # Chunk boundaries are planned up front from segment sizes; the text of a
+    # chunk is only built when that chunk is requested.
+    def __init__(self, prompt_buffer: PromptBuffer, max_size: int, unit="tokens"):
+        self.source = prompt_buffer
+        self.unit = unit
+        self.header = prompt_buffer.segments[: prompt_buffer.header_end]
+        self.chunks: list[tuple[list[tuple], list[str]]] = []
+        fixed_size = self._measure_segments(self.header)
+        reserve = 0
+        # The manifest depends on the plan, so replan until its size settles.
+        for _ in range(5):
+            budget = max(max_size // 4, max_size - fixed_size - reserve)
+            self.chunks = self._plan(budget)
+            preface_size = max(
+                self._measure_segments(self._preface(index))
+                for index in range(len(self.chunks))
+            )
+            if preface_size <= reserve:
+                break
+            reserve = preface_size
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def __getitem__(self, index) -> PromptBuffer:
+        segments = self.source.segments
+        output_format = self.source.output_format
+        parts = [*self.header, *self._preface(index)]
+        for segment_index, start, end, wrap in self.chunks[index][0]:
+            text = segments[segment_index]
+            if start is not None:
+                text = text[start:end].removesuffix("\n")
+            if wrap:
+                fields, footer, first_line, last_line = wrap
+                header = output_format.block_open(
+                    fields, f"lines {first_line}-{last_line}"
+                )
+                parts.extend([header, text, footer])
+            else:
+                parts.append(text)
+        prompt_buffer = PromptBuffer(parts)
+        prompt_buffer.stats = self.source.stats
+        return prompt_buffer
+
+    def _measure(self, text: str) -> int:
+        if self.unit == "bytes":
+            return len(text.encode("utf-8", "surrogatepass"))
+        return estimate_tokens(text)
+
+    def _measure_segments(self, segments) -> int:
+        return sum(self._measure(segment) + 1 for segment in segments)
+
+    def _preface(self, index) -> list[str]:
+        lines = [f"--- CHUNK {index + 1} OF {len(self.chunks)} ---", "Chunk manifest:"]
+        first = max(
+            0,
+            min(
+                index - PROMPT_CHUNK_MANIFEST_LINES // 2,
+                len(self.chunks) - PROMPT_CHUNK_MANIFEST_LINES,
+            ),
+        )
+        last = min(len(self.chunks), first + PROMPT_CHUNK_MANIFEST_LINES)
+        if first:
+            lines.append(f"  (chunks 1-{first} not listed)")
+        for number, (_, labels) in enumerate(self.chunks[first:last], first + 1):
+            shown = ", ".join(labels[:PROMPT_CHUNK_MANIFEST_NAMES]) or "project context"
+            if len(labels) > PROMPT_CHUNK_MANIFEST_NAMES:
+                shown += f" (+{len(labels) - PROMPT_CHUNK_MANIFEST_NAMES} more)"
+            marker = " (this chunk)" if number == index + 1 else ""
+            lines.append(f"  Chunk {number}{marker}: {shown}")
+        if last < len(self.chunks):
+            lines.append(f"  (chunks {last + 1}-{len(self.chunks)} not listed)")
+        return ["\n".join(lines), "\n"]
+
+    def _plan(self, budget: int) -> list[tuple[list[tuple], list[str]]]:
+        segments = self.source.segments
+        file_starts = self.source.file_starts
+        bounds = [self.source.header_end, *file_starts, len(segments)]
+        chunks = []
+        pieces, labels, used = [], [], 0
+
+        def close_chunk():
+            nonlocal pieces, labels, used
+            if pieces:
+                chunks.append((pieces, labels))
+            pieces, labels, used = [], [], 0
+
+        def add(piece, size, label=None):
+            nonlocal used
+            if used and used + size > budget:
+                close_chunk()
+            pieces.append(piece)
+            used += size
+            if label and (not labels or labels[-1] != label):
+                labels.append(label)
+
+        for start, end in zip(bounds, bounds[1:]):
+            if start >= end:
+                continue
+            fields = file_starts.get(start)
+            label = fields["path"] if fields else None
+            sizes = [self._measure(segment) + 1 for segment in segments[start:end]]
+            if sum(sizes) <= budget:
+                if used + sum(sizes) > budget:
+                    close_chunk()
+                for segment_index, size in zip(range(start, end), sizes):
+                    add((segment_index, None, None, None), size, label)
+                continue
+
+            # Oversized block: split at line boundaries. File blocks keep their
+            # header and footer around every piece.
+            rest_start = start
+            if fields and "notes" in fields and end - start >= 3:
+                body_index, footer = start + 1, segments[start + 2]
+                line_count = segments[body_index].count("\n") + 1
+                overhead = (
+                    self._measure(
+                        self.source.output_format.block_open(
+                            fields, f"lines {line_count}-{line_count}"
+                        )
+                    )
+                    + 1
+                    + sizes[2]
+                )
+                for char_start, char_end, first, last, size in self._split_lines(
+                    segments[body_index], max(1, budget - overhead)
+                ):
+                    add(
+                        (
+                            body_index,
+                            char_start,
+                            char_end,
+                            (fields, footer, first, last),
+                        ),
+                        size + overhead,
+                        f"{label} (lines {first}-{last})",
+                    )
+                rest_start, label = start + 3, None
+            for segment_index in range(rest_start, end):
+                size = sizes[segment_index - start]
+                if size <= budget:
+                    add((segment_index, None, None, None), size, label)
+                    continue
+                for char_start, char_end, _, _, size in self._split_lines(
+                    segments[segment_index], budget
+                ):
+                    add((segment_index, char_start, char_end, None), size, label)
+        close_chunk()
+        return chunks
+
+    def _split_lines(self, text: str, budget: int):
+        # Yields (char_start, char_end, first_line, last_line, size) pieces;
+        # a single line over budget is cut into character slices.
+        piece_start = pos = size = 0
+        first_line = line_number = 1
+        while pos < len(text):
+            newline = text.find("\n", pos)
+            line_end = len(text) if newline == -1 else newline + 1
+            line_size = self._measure(text[pos:line_end])
+            if size and size + line_size > budget:
+                yield piece_start, pos, first_line, line_number - 1, size
+                piece_start, first_line, size = pos, line_number, 0
+            if line_size > budget:
+                step = max(
+                    1,
+                    (
+                        budget // 4
+                        if self.unit == "bytes"
+                        else budget * CHARS_PER_TOKEN_ESTIMATE
+                    ),
+                )
+                for slice_start in range(pos, line_end, step):
+                    slice_end = min(slice_start + step, line_end)
+                    yield slice_start, slice_end, line_number, line_number, self._measure(
+                        text[slice_start:slice_end]
+                    )
+                piece_start = line_end
+                first_line = line_number + 1
+            else:
+                size += line_size
+            pos = line_end
+            line_number += 1
+        if pos > piece_start:
+            yield piece_start, pos, first_line, line_number - 1, size
+
+
+def get_memory_usage() -> tuple[int | None, int | None]:
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        try:
+            if ctypes.windll.psapi.GetProcessMemoryInfo(
+                ctypes.windll.kernel32.GetCurrentProcess(),
+                ctypes.byref(counters),
+                counters.cb,
+            ):
+                return counters.WorkingSetSize, counters.PeakWorkingSetSize
+        except Exception as e:
+            logging.debug(f"GetProcessMemoryInfo failed: {e}")
+        return None, None
+
+    try:
+        rss = peak = None
+        with open("/proc/self/status", encoding="ascii") as status_file:
+            for line in status_file:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1]) * 1024
+                elif line.startswith("VmHWM:"):
+                    peak = int(line.split()[1]) * 1024
+        return rss, peak
+    except OSError:
+        pass
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return None, peak if sys.platform == "darwin" else peak * 1024
+    except Exception:
+        return None, None
+
+
+def reset_peak_memory() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as clear_refs:
+            clear_refs.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def format_byte_size(size: int | None) -> str:
+    if size is None:
+        return "n/a"
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.2f} GB"
+
+
+def assemble_prompt(
+    instructions,
+    file_tree_text,
+    main_file_paths_list,
+    project_folder_name,
+    project_root_path_obj,
+    gitignore_active,
+    custom_patterns_list,
+    dedupe_identical=False,
+    changed_hunks=None,
+    minify=False,
+    outline_paths=None,
+    output_format=DEFAULT_PROMPT_FORMAT,
+) -> "PromptBuffer":
+    prompt_parts = []
+    stats = {}
+    file_starts = {}
+    fmt = PROMPT_FORMATS.get(output_format) or PROMPT_FORMATS[DEFAULT_PROMPT_FORMAT]
+
+    def emit(key, **fields):
+        segment = fmt.render(key, **fields)
+        if segment is not None:
+            prompt_parts.append(segment)
+
+    def emit_block(kind, path, language, notes, body):
+        fields = {
+            "kind": kind,
+            "path": path,
+            "language": language,
+            "notes": notes,
+            "sep": "," if file_starts else "",
+            "fence": "",
+        }
+        if fmt.needs_fence:
+            longest_run = max(map(len, re.findall(r"`{3,}", body)), default=2)
+            fields["fence"] = "`" * (longest_run + 1)
+        file_starts[len(prompt_parts)] = fields
+        prompt_parts.append(fmt.block_open(fields))
+        prompt_parts.append(fmt.escape_body(body))
+        prompt_parts.append(fmt.block_close(fields))
+
+    emit("document_open")
+    if instructions:
+        emit("instructions_open")
+        prompt_parts.append(fmt.escape_body(instructions))
+        emit("instructions_close")
+    header_end = len(prompt_parts)
+
+    if project_folder_name:
+        emit("project_open", name=project_folder_name)
+        filter_status = []
+        if gitignore_active:
+            filter_status.append(".gitignore active")
+        if custom_patterns_list:
+            filter_status.append("custom ignores active")
+        if FALLBACK_IGNORE_DIRS or FALLBACK_IGNORE_FILES:
+            filter_status.append("default ignores active")
+        filters = ", ".join(filter_status) if filter_status else "none active"
+
+        if file_tree_text and file_tree_text != "(No files to display or all ignored)":
+            emit("tree_open", filters=filters)
+            prompt_parts.append(fmt.escape_body(file_tree_text))
+            emit("tree_close")
+        else:
+            emit("tree_empty", filters=filters)
+        emit("project_close")
+
+    if main_file_paths_list:
+        emit("files_open")
+        read_started = time.perf_counter()
+        abs_project_root = (
+            project_root_path_obj.resolve(strict=False)
+            if project_root_path_obj
+            else None
+        )
+        first_path_by_digest = {}
+        minify_bytes_saved = minify_tokens_saved = 0
+        outline_paths = outline_paths or set()
+        if minify or outline_paths:
+            precompute_transforms(
+                main_file_paths_list, minify, outline_paths, changed_hunks
+            )
+        for file_path_str in main_file_paths_list:
+            file_p = Path(file_path_str)
+            display_path_in_prompt = file_p.name
+            if abs_project_root:
+                try:
+                    abs_file_p = file_p.resolve(strict=False)
+                    if abs_file_p.is_relative_to(abs_project_root):
+                        display_path_in_prompt = str(
+                            abs_file_p.relative_to(abs_project_root)
+                        )
+                    else:
+                        display_path_in_prompt = str(abs_file_p)
+                except (ValueError, OSError):
+                    display_path_in_prompt = (
+                        str(file_p) if str(file_p) != "." else file_p.name
+                    )
+
+            display_path_in_prompt = display_path_in_prompt.replace(os.sep, "/")
+            hunks = changed_hunks.get(file_path_str) if changed_hunks else None
+            if hunks:
+                emit_block("Diff", display_path_in_prompt, "diff", [], hunks)
+                PERF_STATS.add_counts({"diff_files": 1})
+                continue
+            outlined = file_path_str in outline_paths
+            with TRACER.span("prompt.read_file", {"path": file_path_str}):
+                content, digest, decoding_note, is_text = FILE_CACHE.read_details(
+                    file_path_str, with_digest=dedupe_identical or minify or outlined
+                )
+                notes = [decoding_note] if decoding_note else []
+                # Placeholders like "[Binary file: icon.png]" say nothing
+                # about the bytes, so only real text is compared.
+                if dedupe_identical and is_text:
+                    first_path = first_path_by_digest.setdefault(
+                        digest, display_path_in_prompt
+                    )
+                    if first_path != display_path_in_prompt:
+                        file_starts[len(prompt_parts)] = {
+                            "kind": "File",
+                            "path": display_path_in_prompt,
+                        }
+                        emit(
+                            "duplicate",
+                            path=display_path_in_prompt,
+                            first=first_path,
+                            note=fmt.note(notes),
+                            sep="," if len(file_starts) > 1 else "",
+                        )
+                        PERF_STATS.add_counts(
+                            {
+                                "dedupe_files_skipped": 1,
+                                "dedupe_chars_saved": len(content),
+                            }
+                        )
+                        continue
+            language = language_for_path(file_path_str)
+            if outlined:
+                with TRACER.span("prompt.outline", {"path": file_path_str}):
+                    outline = TRANSFORM_CACHE.get(
+                        ("outline", language, digest),
+                        lambda: outline_content(content, language),
+                    )
+                emit_block(
+                    "Outline",
+                    display_path_in_prompt,
+                    "",
+                    notes,
+                    outline or "(No symbols found.)",
+                )
+                PERF_STATS.add_counts(
+                    {
+                        "outline_files": 1,
+                        "outline_chars_saved": len(content) - len(outline),
+                    }
+                )
+                continue
+            if minify:
+                with TRACER.span("prompt.minify", {"path": file_path_str}):
+                    minified = TRANSFORM_CACHE.get(
+                        ("minify", language, digest),
+                        lambda: minify_content(content, language),
+                    )
+                minify_bytes_saved += len(
+                    content.encode("utf-8", "surrogatepass")
+                ) - len(minified.encode("utf-8", "surrogatepass"))
+                minify_tokens_saved += estimate_tokens(content) - estimate_tokens(
+                    minified
+                )
+                content = minified
+            emit_block(
+                "File",
+                display_path_in_prompt,
+                language or "",
+                notes,
+                content.strip(),
+            )
+        PERF_STATS.record_span(
+            "prompt.read_files", (time.perf_counter() - read_started) * 1000
+        )
+        if minify:
+            stats["minify_bytes_saved"] = minify_bytes_saved
+            stats["minify_tokens_saved"] = minify_tokens_saved
+            PERF_STATS.set_gauges(
+                {
+                    "prompt_minify_bytes_saved": minify_bytes_saved,
+                    "prompt_minify_tokens_saved": minify_tokens_saved,
+                }
+            )
+        emit("files_close")
+    else:
+        emit("files_empty")
+    emit("document_close")
+    prompt_buffer = PromptBuffer(prompt_parts, file_starts, header_end)
+    prompt_buffer.stats = stats
+    prompt_buffer.output_format = fmt
+    PERF_STATS.add_counts({"prompt_chars": prompt_buffer.char_count})
+    return prompt_buffer
+
+
+def check_existing_files(paths: list[str]) -> tuple[list[str], list[str]]:
+    paths_by_dir: dict[str, list[tuple[int, str]]] = {}
+    for index, path_str in enumerate(paths):
+        parent, name = os.path.split(os.path.abspath(path_str))
+        paths_by_dir.setdefault(parent, []).append((index, name))
+
+    resolved: dict[int, str] = {}
+    for parent, entries in paths_by_dir.items():
+        try:
+            with os.scandir(parent) as scanned:
+                dir_entries = {entry.name: entry for entry in scanned}
+            real_parent = os.path.realpath(parent)
+        except OSError:
+            continue
+        for index, name in entries:
+            entry = dir_entries.get(name)
+            try:
+                if entry is None:
+                    file_path = Path(parent, name)
+                    if file_path.is_file():
+                        resolved[index] = str(file_path.resolve(strict=False))
+                    continue
+                if not entry.is_file():
+                    continue
+                if entry.is_symlink():
+                    resolved[index] = str(Path(entry.path).resolve(strict=False))
+                else:
+                    resolved[index] = os.path.join(real_parent, name)
+            except OSError:
+                continue
+
+    valid_paths = [resolved[i] for i in range(len(paths)) if i in resolved]
+    missing_paths = [paths[i] for i in range(len(paths)) if i not in resolved]
+    return valid_paths, missing_paths
+
+
+class ConfigStore:
+    SCHEMA_VERSION = 1
+
+    def __init__(self, db_path: Path):
+        import sqlite3
+
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self.created = self._migrate()
+
+    def _migrate(self) -> bool:
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= self.SCHEMA_VERSION:
+            return False
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS configs (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+                    instructions TEXT NOT NULL DEFAULT '',
+                    custom_ignores TEXT NOT NULL DEFAULT '',
+                    project_folder TEXT NOT NULL DEFAULT '',
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    last_used_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_configs_last_used
+                    ON configs(last_used_at DESC);
+                CREATE TABLE IF NOT EXISTS config_tags (
+                    config_id INTEGER NOT NULL
+                        REFERENCES configs(id) ON DELETE CASCADE,
+                    tag TEXT NOT NULL COLLATE NOCASE,
+                    PRIMARY KEY (config_id, tag)
+                );
+                CREATE INDEX IF NOT EXISTS idx_config_tags_tag ON config_tags(tag);
+                CREATE TABLE IF NOT EXISTS config_files (
+                    config_id INTEGER NOT NULL
+                        REFERENCES configs(id) ON DELETE CASCADE,
+                    position INTEGER NOT NULL,
+                    path TEXT NOT NULL,
+                    PRIMARY KEY (config_id, position)
+                );
+                """)
+            self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        return True
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def list_configs(self, query: str = "") -> list[dict]:
+        sql = """
+            SELECT c.name, c.last_used_at,
+                   (SELECT group_concat(tag, ', ') FROM config_tags
+                    WHERE config_id = c.id) AS tags
+            FROM configs c
+        """
+        params = []
+        if query:
+            like = f"%{query}%"
+            sql += """
+                WHERE c.name LIKE ?
+                   OR c.id IN (SELECT config_id FROM config_tags WHERE tag LIKE ?)
+            """
+            params = [like, like]
+        sql += " ORDER BY c.last_used_at IS NULL, c.last_used_at DESC, c.name"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {
+                "name": row["name"],
+                "tags": row["tags"] or "",
+                "last_used_at": row["last_used_at"],
+            }
+            for row in rows
+        ]
+
+    def get_tags(self, name: str) -> list[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT t.tag FROM config_tags t JOIN configs c ON c.id = t.config_id "
+                "WHERE c.name = ? ORDER BY t.tag",
+                (name,),
+            ).fetchall()
+        return [row["tag"] for row in rows]
+
+    def save_config(
+        self,
+        name: str,
+        instructions: str,
+        custom_ignores: str,
+        project_folder: str,
+        main_files: list[str],
+        tags: list[str] | None = None,
+    ):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO configs (name, instructions, custom_ignores,
+                                     project_folder, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    instructions = excluded.instructions,
+                    custom_ignores = excluded.custom_ignores,
+                    project_folder = excluded.project_folder,
+                    updated_at = excluded.updated_at
+                """,
+                (name, instructions, custom_ignores, project_folder, now, now),
+            )
+            config_id = self._conn.execute(
+                "SELECT id FROM configs WHERE name = ?", (name,)
+            ).fetchone()["id"]
+            self._conn.execute(
+                "DELETE FROM config_files WHERE config_id = ?", (config_id,)
+            )
+            self._conn.executemany(
+                "INSERT INTO config_files (config_id, position, path) VALUES (?, ?, ?)",
+                [(config_id, i, path) for i, path in enumerate(main_files)],
+            )
+            if tags is not None:
+                self._conn.execute(
+                    "DELETE FROM config_tags WHERE config_id = ?", (config_id,)
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO config_tags (config_id, tag) VALUES (?, ?)",
+                    [(config_id, tag) for tag in tags],
+                )
+
+    def load_config(self, name: str) -> dict | None:
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT * FROM configs WHERE name = ?", (name,)
+            ).fetchone()
+            if row is None:
+                return None
+            main_files = [
+                file_row["path"]
+                for file_row in self._conn.execute(
+                    "SELECT path FROM config_files WHERE config_id = ? "
+                    "ORDER BY position",
+                    (row["id"],),
+                )
+            ]
+            self._conn.execute(
+                "UPDATE configs SET last_used_at = ? WHERE id = ?",
+                (time.time(), row["id"]),
+            )
+        return {
+            "name": row["name"],
+            "instructions": row["instructions"],
+            "custom_ignores": row["custom_ignores"],
+            "project_folder": row["project_folder"],
+            "main_files": main_files,
+        }
+
+    def delete_config(self, name: str) -> bool:
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM configs WHERE name = ?", (name,))
+        return cursor.rowcount > 0
+
+    def import_ini_files(self, config_dir: Path) -> int:
+        import configparser
+
+        with self._lock:
+            existing = {
+                row["name"].lower()
+                for row in self._conn.execute("SELECT name FROM configs")
+            }
+        imported = 0
+        for ini_path in sorted(config_dir.glob("*.ini")):
+            if ini_path.stem.lower() in existing:
+                continue
+            config = configparser.ConfigParser()
+            try:
+                config.read(ini_path, encoding="utf-8")
+                main_files_str = config.get("Settings", "MainFiles", fallback="")
+                self.save_config(
+                    ini_path.stem,
+                    config.get("Settings", "Instructions", fallback=""),
+                    config.get("Settings", "CustomIgnores", fallback=""),
+                    config.get("Settings", "ProjectFolder", fallback=""),
+                    [p.strip() for p in main_files_str.splitlines() if p.strip()],
+                )
+                imported += 1
+            except Exception as e:
+                logging.error(f"Could not import config {ini_path}: {e}")
+        if imported:
+            logging.info(f"Imported {imported} .ini configuration(s) into the store.")
+        return imported
+
+
+class LLMPromptApp(ctk.CTk):
+    def __init__(self):
+        super().__init__()
+        logging.info("Application starting...")
+        self.title("LLM Prompt Generator")
+        window_width = 1200
+        window_height = 900
+
+        screen_width = self.winfo_screenwidth()
+        screen_height = self.winfo_screenheight()
+        x = (screen_width - window_width) // 2
+        y = (screen_height - window_height) // 2
+        self.geometry(f"{window_width}x{window_height}+{x}+{y}")
+
+        icon_path_str = resource_path("promptgen/assets/icon.ico")
+        if icon_path_str:
+            self.icon_path = icon_path_str
+            self.iconbitmap(self.icon_path, default=self.icon_path)
+        else:
+            self.icon_path = None
+
+        ctk.set_appearance_mode("System")
+        ctk.set_default_color_theme("blue")
+
+        self.project_folder_path: Path | None = None
+        self.main_file_paths: list[str] = []
+        self.gitignore_matcher = lambda path_to_check: False
+        self.listing_cache = DirectoryListingCache()
+        self.file_tree_text = ""
+        self.prompt_buffer = PromptBuffer([])
+        self.prompt_chunks: PromptChunks | None = None
+        self.prompt_chunk_index = 0
+        self.copy_parts: list[PromptBuffer] = []
+        self.copy_part_index = 0
+        self.file_tree_open_dirs: set[str] = set()
+        self.file_tree_file_items: set[str] = set()
+        self.main_file_paths_set: set[str] = set()
+        self.git_changes: dict[str, str] = {}
+        self.git_diff_settings = None
+        self.outline_file_paths: set[str] = set()
+        self.content_index = TrigramIndex()
+        self.relevance_index = RelevanceIndex()
+        self.relevance_suggestions: list[str] = []
+        self.import_graph: ImportGraph | None = None
+        self.content_index_running = False
+        self.content_index_stale = False
+        self.git_changed_dirs: set[str] = set()
+
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=os.cpu_count() or 1
+        )
+        self.ui_queue = queue.Queue()
+        self.active_background_tasks = 0
+        self._controls_to_disable_while_loading = []
+        self.progress_popup = None
+        self.textbox_lines = {}
+        self.cancel_events: set[threading.Event] = set()
+        self.walk_resume_cancel_event = threading.Event()
+        self.idle_callbacks = []
+
+        self.custom_ignore_debounce_timer = None
+        self.instructions_debounce_timer = None
+        self.relevance_debounce_timer = None
+
+        self.config_dir = Path.home() / "Documents" / "PromptGenConfigs"
+        try:
+            self.config_dir.mkdir(parents=True, exist_ok=True)
+            logging.info(f"Configuration directory: {self.config_dir}")
+        except Exception as e:
+            logging.error(f"Could not create config directory {self.config_dir}: {e}")
+        self.config_store = None
+        self.config_toplevel = None
+        self.diagnostics_toplevel = None
+        self.diagnostics_refresh_timer = None
+        self.diagnostics_report = None
+
+        self.file_tree_expanded = False
+        self.prompt_expanded = False
+        self.default_row_weights = {
+            0: 0,
+            1: 0,
+            2: 3,
+            3: 1,
+            4: 0,
+            5: 2,
+        }
+
+        self._setup_ui()
         self._store_original_grid_configs()
         self._setup_expand_buttons()
         self._apply_layout_changes()
@@ -285,12 +3103,49 @@ class LLMPromptApp(ctk.CTk):
             lambda: self._on_project_label_configure(None)
         )
 
+        self.trace_output_path = os.environ.get("PROMPTGEN_TRACE")
+        if self.trace_output_path:
+            TRACER.start()
+
+        self.first_paint_ms = None
+        self.exit_code = 0
+        self.after_idle(self._record_first_paint)
+
+    def _record_first_paint(self):
+        self.first_paint_ms = (time.perf_counter() - _STARTUP_T0) * 1000
+        log_fn = (
+            logging.info
+            if self.first_paint_ms <= STARTUP_FIRST_PAINT_TARGET_MS
+            else logging.warning
+        )
+        log_fn(
+            f"First paint after {self.first_paint_ms:.0f} ms "
+            f"(target {STARTUP_FIRST_PAINT_TARGET_MS} ms)."
+        )
+
+    def _report_startup_and_exit(self):
+        within_target = self.first_paint_ms <= STARTUP_FIRST_PAINT_TARGET_MS
+        print(
+            json.dumps(
+                {
+                    "first_paint_ms": round(self.first_paint_ms, 1),
+                    "target_ms": STARTUP_FIRST_PAINT_TARGET_MS,
+                    "within_target": within_target,
+                }
+            )
+        )
+        self.exit_code = 0 if within_target else 1
+        self._on_closing()
+
     def _on_closing(self):
         logging.info("Application closing...")
         if self.custom_ignore_debounce_timer:
             self.after_cancel(self.custom_ignore_debounce_timer)
         if self.instructions_debounce_timer:
             self.after_cancel(self.instructions_debounce_timer)
+        if self.relevance_debounce_timer:
+            self.after_cancel(self.relevance_debounce_timer)
+        self._cancel_background_walks()
         if self.progress_popup:
             try:
                 self.progress_popup.cancel_task()
@@ -299,10 +3154,20 @@ class LLMPromptApp(ctk.CTk):
             self.progress_popup = None
         if self.config_toplevel and self.config_toplevel.winfo_exists():
             self._close_config_manager()
+        self._close_diagnostics_panel()
+        if self.config_store:
+            self.config_store.close()
+        self.walk_resume_cancel_event.set()
         if self.executor:
             logging.debug("Shutting down thread pool executor...")
             self.executor.shutdown(wait=True, cancel_futures=True)
             logging.debug("Thread pool executor shut down.")
+        TRANSFORM_POOL.shutdown()
+        if self.trace_output_path and TRACER.enabled:
+            try:
+                TRACER.write(self.trace_output_path)
+            except Exception as e:
+                logging.error(f"Error writing trace file: {e}")
         self.destroy()
 
     def _setup_ui(self):
@@ -319,41 +3184,135 @@ class LLMPromptApp(ctk.CTk):
         self.top_controls_frame.grid(
             row=0, column=0, columnspan=2, padx=10, pady=(10, 5), sticky="ew"
         )
-        self.top_controls_frame.grid_columnconfigure(0, weight=1)
-        self.open_project_button = ctk.CTkButton(
+        self.top_controls_frame.grid_columnconfigure(0, weight=1)
+        self.open_project_button = ctk.CTkButton(
+            self.top_controls_frame,
+            text="Open Project Folder",
+            command=self.open_project_folder,
+        )
+        self.open_project_button.grid(
+            row=0, column=0, padx=(0, 10), pady=0, sticky="ew"
+        )
+        self.use_gitignore_var = ctk.BooleanVar(value=True)
+        self.use_gitignore_checkbox = ctk.CTkCheckBox(
+            self.top_controls_frame,
+            text="Use .gitignore",
+            variable=self.use_gitignore_var,
+            command=self._debounced_refresh_all_views_and_prompt,
+        )
+        self.use_gitignore_checkbox.grid(
+            row=0, column=1, padx=(0, 0), pady=0, sticky="e"
+        )
+        self.dedupe_files_var = ctk.BooleanVar(value=False)
+        self.dedupe_files_checkbox = ctk.CTkCheckBox(
+            self.top_controls_frame,
+            text="Deduplicate identical files",
+            variable=self.dedupe_files_var,
+            command=self.trigger_generate_prompt_stand_alone,
+        )
+        self.dedupe_files_checkbox.grid(
+            row=0, column=2, padx=(10, 0), pady=0, sticky="e"
+        )
+        self.use_git_index_var = ctk.BooleanVar(value=True)
+        self.use_git_index_checkbox = ctk.CTkCheckBox(
+            self.top_controls_frame,
+            text="Use git index",
+            variable=self.use_git_index_var,
+            command=self._debounced_refresh_all_views_and_prompt,
+        )
+        self.use_git_index_checkbox.grid(
+            row=0, column=3, padx=(10, 0), pady=0, sticky="e"
+        )
+        self.minify_content_var = ctk.BooleanVar(value=False)
+        self.minify_content_checkbox = ctk.CTkCheckBox(
+            self.top_controls_frame,
+            text="Minify content",
+            variable=self.minify_content_var,
+            command=self.trigger_generate_prompt_stand_alone,
+        )
+        self.minify_content_checkbox.grid(
+            row=0, column=4, padx=(10, 0), pady=0, sticky="e"
+        )
+        self.symlink_policy_menu = ctk.CTkOptionMenu(
             self.top_controls_frame,
-            text="Open Project Folder",
-            command=self.open_project_folder,
+            values=list(SYMLINK_POLICY_LABELS.values()),
+            command=lambda _: self._debounced_refresh_all_views_and_prompt(),
         )
-        self.open_project_button.grid(
-            row=0, column=0, padx=(0, 10), pady=0, sticky="ew"
+        self.symlink_policy_menu.set(SYMLINK_POLICY_LABELS[SYMLINKS_INSIDE_ROOT])
+        self.symlink_policy_menu.grid(
+            row=1, column=1, columnspan=2, padx=(0, 0), pady=(5, 0), sticky="e"
         )
-        self.use_gitignore_var = ctk.BooleanVar(value=True)
-        self.use_gitignore_checkbox = ctk.CTkCheckBox(
+        self.one_filesystem_var = ctk.BooleanVar(value=True)
+        self.one_filesystem_checkbox = ctk.CTkCheckBox(
             self.top_controls_frame,
-            text="Use .gitignore",
-            variable=self.use_gitignore_var,
+            text="Stay on one filesystem",
+            variable=self.one_filesystem_var,
             command=self._debounced_refresh_all_views_and_prompt,
         )
-        self.use_gitignore_checkbox.grid(
-            row=0, column=1, padx=(0, 0), pady=0, sticky="e"
+        self.one_filesystem_checkbox.grid(
+            row=1, column=3, padx=(10, 0), pady=(5, 0), sticky="e"
+        )
+        self.output_format_menu = ctk.CTkOptionMenu(
+            self.top_controls_frame,
+            values=[output_format.label for output_format in PROMPT_FORMATS.values()],
+            command=lambda _: self.trigger_generate_prompt_stand_alone(),
+        )
+        self.output_format_menu.set(PROMPT_FORMATS[DEFAULT_PROMPT_FORMAT].label)
+        self.output_format_menu.grid(
+            row=1, column=4, padx=(10, 0), pady=(5, 0), sticky="e"
         )
 
         self.file_tree_frame = ctk.CTkFrame(self)
         self.file_tree_frame.grid_rowconfigure(1, weight=1)
         self.file_tree_frame.grid_columnconfigure(0, weight=1)
         self.file_tree_frame.grid_columnconfigure(1, weight=0)
+        self.file_tree_frame.grid_columnconfigure(2, weight=0)
         ctk.CTkLabel(
             self.file_tree_frame,
             text="Project File Tree:",
             font=ctk.CTkFont(weight="bold"),
         ).grid(row=0, column=0, padx=5, pady=(5, 0), sticky="w")
+        self.file_tree_mode_button = ctk.CTkSegmentedButton(
+            self.file_tree_frame,
+            values=["Interactive", "Text"],
+            command=self._on_file_tree_mode_changed,
+        )
+        self.file_tree_mode_button.set("Interactive")
+        self.file_tree_mode_button.grid(
+            row=0, column=1, padx=5, pady=(5, 0), sticky="e"
+        )
+
+        self.file_tree_view_frame = ctk.CTkFrame(self.file_tree_frame)
+        self.file_tree_view_frame.grid_rowconfigure(0, weight=1)
+        self.file_tree_view_frame.grid_columnconfigure(0, weight=1)
+        self._style_file_tree_view()
+        self.file_tree_view = ttk.Treeview(
+            self.file_tree_view_frame,
+            show="tree",
+            selectmode="browse",
+            style="PromptGen.Treeview",
+        )
+        self.file_tree_view.grid(row=0, column=0, sticky="nsew")
+        file_tree_view_scrollbar = ctk.CTkScrollbar(
+            self.file_tree_view_frame, command=self.file_tree_view.yview
+        )
+        file_tree_view_scrollbar.grid(row=0, column=1, sticky="ns")
+        self.file_tree_view.configure(yscrollcommand=file_tree_view_scrollbar.set)
+        self.file_tree_view.bind("<<TreeviewOpen>>", self._on_file_tree_node_open)
+        self.file_tree_view.bind("<<TreeviewClose>>", self._on_file_tree_node_close)
+        self.file_tree_view.bind("<ButtonRelease-1>", self._on_file_tree_click)
+        self.file_tree_view.tag_configure("changed", foreground="#d29922")
+        self.file_tree_view_frame.grid(
+            row=1, column=0, columnspan=3, padx=5, pady=5, sticky="nsew"
+        )
+
         self.file_tree_textbox = ctk.CTkTextbox(
             self.file_tree_frame, wrap="none", state="disabled"
         )
         self.file_tree_textbox.grid(
-            row=1, column=0, columnspan=2, padx=5, pady=5, sticky="nsew"
+            row=1, column=0, columnspan=3, padx=5, pady=5, sticky="nsew"
         )
+        self.file_tree_textbox.grid_remove()
 
         self.custom_ignore_frame = ctk.CTkFrame(self)
         self.custom_ignore_frame.grid_rowconfigure(1, weight=1)
@@ -448,6 +3407,115 @@ class LLMPromptApp(ctk.CTk):
         self.unselect_files_button.grid(
             row=0, column=3, padx=(2, 0), pady=5, sticky="ew"
         )
+        self.add_changed_files_button = ctk.CTkButton(
+            self.main_files_action_buttons_frame,
+            text="Add Changed Files",
+            command=self.add_changed_files,
+        )
+        self.add_changed_files_button.grid(
+            row=1, column=0, padx=(0, 2), pady=(0, 5), sticky="ew"
+        )
+        self.git_base_ref_entry = ctk.CTkEntry(
+            self.main_files_action_buttons_frame,
+            placeholder_text="Base ref (blank: working tree)",
+        )
+        self.git_base_ref_entry.grid(row=1, column=1, padx=2, pady=(0, 5), sticky="ew")
+        self.diff_hunks_only_var = ctk.BooleanVar(value=False)
+        self.diff_hunks_only_checkbox = ctk.CTkCheckBox(
+            self.main_files_action_buttons_frame,
+            text="Changed hunks only",
+            variable=self.diff_hunks_only_var,
+            command=self.trigger_generate_prompt_stand_alone,
+        )
+        self.diff_hunks_only_checkbox.grid(
+            row=1, column=2, padx=2, pady=(0, 5), sticky="w"
+        )
+        self.diff_context_entry = ctk.CTkEntry(
+            self.main_files_action_buttons_frame,
+            placeholder_text="Context lines",
+        )
+        self.diff_context_entry.insert(0, str(GIT_DIFF_DEFAULT_CONTEXT_LINES))
+        self.diff_context_entry.grid(
+            row=1, column=3, padx=(2, 0), pady=(0, 5), sticky="ew"
+        )
+        self.toggle_outline_button = ctk.CTkButton(
+            self.main_files_action_buttons_frame,
+            text="Toggle Outline",
+            command=self.toggle_outline_for_selected_files,
+        )
+        self.toggle_outline_button.grid(
+            row=2, column=0, padx=(0, 2), pady=(0, 5), sticky="ew"
+        )
+        self.content_search_entry = ctk.CTkEntry(
+            self.main_files_action_buttons_frame,
+            placeholder_text="Search file contents",
+        )
+        self.content_search_entry.bind("<Return>", self.add_content_matches)
+        self.content_search_entry.grid(
+            row=2, column=1, padx=2, pady=(0, 5), sticky="ew"
+        )
+        self.content_search_regex_var = ctk.BooleanVar(value=False)
+        self.content_search_regex_checkbox = ctk.CTkCheckBox(
+            self.main_files_action_buttons_frame,
+            text="Regex",
+            variable=self.content_search_regex_var,
+        )
+        self.content_search_regex_checkbox.grid(
+            row=2, column=2, padx=2, pady=(0, 5), sticky="w"
+        )
+        self.add_content_matches_button = ctk.CTkButton(
+            self.main_files_action_buttons_frame,
+            text="Add Matches",
+            command=self.add_content_matches,
+        )
+        self.add_content_matches_button.grid(
+            row=2, column=3, padx=(2, 0), pady=(0, 5), sticky="ew"
+        )
+        self.expand_dependencies_button = ctk.CTkButton(
+            self.main_files_action_buttons_frame,
+            text="Expand Dependencies",
+            command=self.expand_dependencies_of_selected_files,
+        )
+        self.expand_dependencies_button.grid(
+            row=3, column=0, padx=(0, 2), pady=(0, 5), sticky="ew"
+        )
+        self.dependency_depth_entry = ctk.CTkEntry(
+            self.main_files_action_buttons_frame,
+            placeholder_text="Depth",
+        )
+        self.dependency_depth_entry.insert(0, str(IMPORT_EXPAND_DEFAULT_DEPTH))
+        self.dependency_depth_entry.grid(
+            row=3, column=1, padx=2, pady=(0, 5), sticky="ew"
+        )
+        self.add_suggested_files_button = ctk.CTkButton(
+            self.main_files_action_buttons_frame,
+            text="Add Suggested",
+            command=self.add_suggested_files,
+        )
+        self.add_suggested_files_button.grid(
+            row=4, column=0, padx=(0, 2), pady=(0, 5), sticky="ew"
+        )
+        self.suggestion_count_entry = ctk.CTkEntry(
+            self.main_files_action_buttons_frame,
+            placeholder_text="Top N",
+        )
+        self.suggestion_count_entry.insert(0, str(RELEVANCE_DEFAULT_TOP_N))
+        self.suggestion_count_entry.bind(
+            "<Return>", lambda _: self._update_relevance_suggestions()
+        )
+        self.suggestion_count_entry.grid(
+            row=4, column=1, padx=2, pady=(0, 5), sticky="ew"
+        )
+        self.relevance_suggestions_label = ctk.CTkLabel(
+            self.main_files_action_buttons_frame,
+            text="",
+            text_color="gray",
+            anchor="w",
+            justify="left",
+        )
+        self.relevance_suggestions_label.grid(
+            row=4, column=2, columnspan=2, padx=(2, 0), pady=(0, 5), sticky="ew"
+        )
 
         self.final_prompt_frame = ctk.CTkFrame(self)
         self.final_prompt_frame.grid_rowconfigure(1, weight=1)
@@ -458,6 +3526,53 @@ class LLMPromptApp(ctk.CTk):
             text="Final Prompt (auto-updates):",
             font=ctk.CTkFont(weight="bold"),
         ).grid(row=0, column=0, padx=5, pady=(5, 0), sticky="w")
+        self.chunk_controls_frame = ctk.CTkFrame(
+            self.final_prompt_frame, fg_color="transparent"
+        )
+        self.chunk_controls_frame.grid(row=0, column=1, padx=5, pady=(5, 0), sticky="e")
+        self.split_chunks_var = ctk.BooleanVar(value=False)
+        self.split_chunks_checkbox = ctk.CTkCheckBox(
+            self.chunk_controls_frame,
+            text="Split into chunks of",
+            variable=self.split_chunks_var,
+            command=self.trigger_generate_prompt_stand_alone,
+        )
+        self.split_chunks_checkbox.pack(side="left", padx=(0, 5))
+        self.chunk_limit_entry = ctk.CTkEntry(
+            self.chunk_controls_frame, width=80, placeholder_text="Limit"
+        )
+        self.chunk_limit_entry.insert(0, str(PROMPT_CHUNK_DEFAULT_LIMIT))
+        self.chunk_limit_entry.bind(
+            "<Return>", self.trigger_generate_prompt_stand_alone
+        )
+        self.chunk_limit_entry.pack(side="left", padx=(0, 5))
+        self.chunk_unit_menu = ctk.CTkOptionMenu(
+            self.chunk_controls_frame,
+            values=list(PROMPT_CHUNK_UNITS),
+            width=80,
+            command=lambda _: self.trigger_generate_prompt_stand_alone(),
+        )
+        self.chunk_unit_menu.pack(side="left", padx=(0, 10))
+        self.previous_chunk_button = ctk.CTkButton(
+            self.chunk_controls_frame,
+            text="<",
+            width=30,
+            state="disabled",
+            command=lambda: self.show_prompt_chunk(self.prompt_chunk_index - 1),
+        )
+        self.previous_chunk_button.pack(side="left")
+        self.chunk_position_label = ctk.CTkLabel(
+            self.chunk_controls_frame, text="", width=90, text_color="gray"
+        )
+        self.chunk_position_label.pack(side="left", padx=5)
+        self.next_chunk_button = ctk.CTkButton(
+            self.chunk_controls_frame,
+            text=">",
+            width=30,
+            state="disabled",
+            command=lambda: self.show_prompt_chunk(self.prompt_chunk_index + 1),
+        )
+        self.next_chunk_button.pack(side="left")
         self.final_prompt_textbox = ctk.CTkTextbox(
             self.final_prompt_frame, wrap="word", state="disabled"
         )
@@ -470,31 +3585,93 @@ class LLMPromptApp(ctk.CTk):
         self.final_prompt_buttons_frame.grid(
             row=2, column=0, columnspan=2, padx=5, pady=5, sticky="e"
         )
+        self.prompt_stats_label = ctk.CTkLabel(
+            self.final_prompt_buttons_frame, text="", text_color="gray"
+        )
+        self.prompt_stats_label.pack(side="left", padx=(0, 10), pady=(0, 5))
         self.manage_configs_button = ctk.CTkButton(
             self.final_prompt_buttons_frame,
             text="Manage Configs",
             command=self._open_config_manager,
         )
         self.manage_configs_button.pack(side="left", padx=(0, 10), pady=(0, 5))
+        self.diagnostics_button = ctk.CTkButton(
+            self.final_prompt_buttons_frame,
+            text="Diagnostics",
+            command=self._open_diagnostics_panel,
+        )
+        self.diagnostics_button.pack(side="left", padx=(0, 10), pady=(0, 5))
+        self.multi_part_copy_var = ctk.BooleanVar(value=False)
+        self.multi_part_copy_checkbox = ctk.CTkCheckBox(
+            self.final_prompt_buttons_frame,
+            text="Copy in parts",
+            variable=self.multi_part_copy_var,
+        )
+        self.multi_part_copy_checkbox.pack(side="left", padx=(0, 5), pady=(0, 5))
+        self.part_size_entry = ctk.CTkEntry(
+            self.final_prompt_buttons_frame,
+            width=90,
+            placeholder_text="Chars per part",
+        )
+        self.part_size_entry.insert(0, str(CLIPBOARD_PART_DEFAULT_CHARS))
+        self.part_size_entry.pack(side="left", padx=(0, 10), pady=(0, 5))
         self.copy_prompt_button = ctk.CTkButton(
             self.final_prompt_buttons_frame,
             text="Copy Prompt",
             command=self.copy_prompt,
         )
-        self.copy_prompt_button.pack(side="left", padx=(0, 5), pady=(0, 5))
+        self.copy_prompt_button.pack(side="left", padx=(0, 10), pady=(0, 5))
+        self.copy_next_part_button = ctk.CTkButton(
+            self.final_prompt_buttons_frame,
+            text="Next Part",
+            width=90,
+            state="disabled",
+            command=self.copy_next_part,
+        )
+        self.copy_next_part_button.pack(side="left", padx=(0, 10), pady=(0, 5))
+        self.export_prompt_button = ctk.CTkButton(
+            self.final_prompt_buttons_frame,
+            text="Export Prompt",
+            command=self.export_prompt,
+        )
+        self.export_prompt_button.pack(side="left", padx=(0, 5), pady=(0, 5))
 
         self._controls_to_disable_while_loading = [
             self.open_project_button,
             self.use_gitignore_checkbox,
+            self.dedupe_files_checkbox,
+            self.use_git_index_checkbox,
+            self.minify_content_checkbox,
+            self.symlink_policy_menu,
+            self.one_filesystem_checkbox,
+            self.output_format_menu,
             self.custom_ignore_textbox,
             self.instructions_textbox,
             self.add_folder_files_button,
             self.add_folder_recursively_button,
             self.add_individual_files_button,
             self.unselect_files_button,
+            self.add_changed_files_button,
+            self.git_base_ref_entry,
+            self.diff_hunks_only_checkbox,
+            self.diff_context_entry,
+            self.toggle_outline_button,
+            self.content_search_entry,
+            self.content_search_regex_checkbox,
+            self.add_content_matches_button,
+            self.expand_dependencies_button,
+            self.dependency_depth_entry,
+            self.add_suggested_files_button,
+            self.suggestion_count_entry,
             self.main_files_listbox,
             self.manage_configs_button,
+            self.split_chunks_checkbox,
+            self.chunk_limit_entry,
+            self.chunk_unit_menu,
+            self.multi_part_copy_checkbox,
+            self.part_size_entry,
             self.copy_prompt_button,
+            self.export_prompt_button,
         ]
         if hasattr(self, "expand_file_tree_button"):
             self._controls_to_disable_while_loading.append(self.expand_file_tree_button)
@@ -548,7 +3725,7 @@ class LLMPromptApp(ctk.CTk):
             command=self._toggle_expand_file_tree,
         )
         self.expand_file_tree_button.grid(
-            row=0, column=1, padx=5, pady=(5, 0), sticky="ne"
+            row=0, column=2, padx=5, pady=(5, 0), sticky="ne"
         )
 
         self.expand_prompt_button = ctk.CTkButton(
@@ -630,12 +3807,47 @@ class LLMPromptApp(ctk.CTk):
     def _set_textbox_content(self, textbox, content):
         if not textbox.winfo_exists():
             return
-        current_pos = textbox.yview()
+        with PERF_STATS.span("ui.set_textbox_content"):
+            current_pos = textbox.yview()
+            textbox.configure(state="normal")
+            textbox.delete("1.0", "end")
+            textbox.insert("1.0", content)
+            textbox.configure(state="disabled")
+            textbox.yview_moveto(current_pos[0])
+        PERF_STATS.add_counts({"ui_chars_inserted": len(content)})
+
+    def _set_textbox_lines(self, textbox, new_lines: list[str]):
+        if not textbox.winfo_exists():
+            return
+        old_lines = self.textbox_lines.get(textbox)
+        if old_lines is None:
+            self._set_textbox_content(
+                textbox, "".join(f"{line}\n" for line in new_lines)
+            )
+            self.textbox_lines[textbox] = new_lines
+            return
+
+        with PERF_STATS.span("ui.diff_textbox_lines"):
+            edits = diff_line_edits(old_lines, new_lines)
+        if not edits:
+            return
+        PERF_STATS.add_counts({"ui_line_edits": len(edits)})
         textbox.configure(state="normal")
-        textbox.delete("1.0", "end")
-        textbox.insert("1.0", content)
+        textbox.mark_set("view_top", "@0,0")
+        textbox.mark_gravity("view_top", "left")
+        for old_start, old_end, replacement in edits:
+            if old_end > old_start:
+                textbox.delete(f"{old_start + 1}.0", f"{old_end + 1}.0")
+            if replacement:
+                textbox.insert(
+                    f"{old_start + 1}.0",
+                    "".join(f"{line}\n" for line in replacement),
+                )
         textbox.configure(state="disabled")
-        textbox.yview_moveto(current_pos[0])
+        textbox.yview(textbox.index("view_top"))
+        textbox.mark_unset("view_top")
+        self.textbox_lines[textbox] = new_lines
+        logging.debug(f"Applied {len(edits)} line edit(s) to textbox.")
 
     def _update_ui_busy_state(self):
         is_busy = self.active_background_tasks > 0
@@ -645,6 +3857,8 @@ class LLMPromptApp(ctk.CTk):
             if not self.progress_popup or not self.progress_popup.winfo_exists():
                 logging.debug("Creating Progress Popup")
                 try:
+                    from ctkcomponents.ctk_components import CTkProgressPopup
+
                     self.progress_popup = CTkProgressPopup(
                         master=self,
                         title="Processing...",
@@ -682,7 +3896,7 @@ class LLMPromptApp(ctk.CTk):
                     self.final_prompt_frame,
                 ]
 
-                if isinstance(control, CTkListbox):
+                if control is self.main_files_listbox:
                     pass
                 elif (
                     control == self.expand_file_tree_button
@@ -700,20 +3914,24 @@ class LLMPromptApp(ctk.CTk):
                     except Exception as e:
                         logging.warning(f"Could not set state for {control}: {e}")
 
-        if not is_busy and self.use_gitignore_checkbox.winfo_exists():
-            try:
-                from gitignore_parser import (
-                    parse_gitignore,
-                )
-            except ImportError:
-                self.use_gitignore_checkbox.configure(state="disabled")
+        if (
+            not is_busy
+            and not gitignore_parser_available()
+            and self.use_gitignore_checkbox.winfo_exists()
+        ):
+            self.use_gitignore_checkbox.configure(state="disabled")
 
     def _submit_task(self, task_fn, on_done_fn, *args, **kwargs):
         self.active_background_tasks += 1
         self._update_ui_busy_state()
         logging.debug(f"Submitting task: {task_fn.__name__}")
         try:
-            future = self.executor.submit(task_fn, *args, **kwargs)
+            if TRACER.enabled:
+                future = self.executor.submit(
+                    self._run_traced_task, task_fn, TRACER.now_us(), *args, **kwargs
+                )
+            else:
+                future = self.executor.submit(task_fn, *args, **kwargs)
             future.add_done_callback(
                 lambda f: self._generic_task_done_handler(f, on_done_fn)
             )
@@ -722,7 +3940,56 @@ class LLMPromptApp(ctk.CTk):
             self.active_background_tasks = max(0, self.active_background_tasks - 1)
             self._update_ui_busy_state()
 
+    def _submit_quiet_task(self, task_fn, on_done_fn, *args):
+        # Background work that only refines results the UI already shows; it
+        # does not mark the app busy, and errors are logged, not shown.
+        logging.debug(f"Submitting quiet task: {task_fn.__name__}")
+
+        def done_handler(future):
+            try:
+                self.ui_queue.put((on_done_fn, future.result(), None))
+            except Exception as e:
+                logging.error(f"Exception in quiet task: {e}", exc_info=True)
+
+        try:
+            self.executor.submit(task_fn, *args).add_done_callback(done_handler)
+        except RuntimeError as e:
+            logging.error(f"Failed to submit quiet task {task_fn.__name__}: {e}")
+
+    def _run_traced_task(self, task_fn, submitted_us, *args, **kwargs):
+        started_us = TRACER.now_us()
+        TRACER.add_complete(
+            f"{task_fn.__name__} (queued)", "queue", submitted_us, started_us
+        )
+        try:
+            return task_fn(*args, **kwargs)
+        finally:
+            TRACER.add_complete(task_fn.__name__, "task", started_us, TRACER.now_us())
+
+    def _traced_ui_callback(self, on_done_fn):
+        finished_us = TRACER.now_us()
+
+        @functools.wraps(on_done_fn)
+        def traced_callback(data):
+            callback_started_us = TRACER.now_us()
+            TRACER.add_complete(
+                f"{on_done_fn.__name__} (ui delay)",
+                "ui_queue",
+                finished_us,
+                callback_started_us,
+            )
+            try:
+                return on_done_fn(data)
+            finally:
+                TRACER.add_complete(
+                    on_done_fn.__name__, "ui", callback_started_us, TRACER.now_us()
+                )
+
+        return traced_callback
+
     def _generic_task_done_handler(self, future, on_done_fn):
+        if TRACER.enabled:
+            on_done_fn = self._traced_ui_callback(on_done_fn)
         try:
             result = future.result()
             self.ui_queue.put((on_done_fn, result, None))
@@ -741,6 +4008,16 @@ class LLMPromptApp(ctk.CTk):
                         0, self.active_background_tasks - 1
                     )
                     self._update_ui_busy_state()
+                    if self.active_background_tasks == 0 and self.idle_callbacks:
+                        idle_callbacks = self.idle_callbacks
+                        self.idle_callbacks = []
+                        for idle_callback in idle_callbacks:
+                            idle_callback()
+                elif callback_fn_or_cmd_key == "task_progress":
+                    label, msg = data
+                    if self.progress_popup and self.progress_popup.winfo_exists():
+                        self.progress_popup.update_label(label)
+                        self.progress_popup.update_message(msg)
                 elif callback_fn_or_cmd_key == "task_error_message":
                     title, msg = data
                     CTkMessagebox(master=self, title=title, message=msg, icon="cancel")
@@ -764,8 +4041,20 @@ class LLMPromptApp(ctk.CTk):
         except queue.Empty:
             pass
         finally:
+            if self.progress_popup and self.progress_popup.cancelled:
+                self._cancel_background_walks()
             self.after(100, self._process_ui_queue)
 
+    def _run_when_idle(self, callback):
+        if self.active_background_tasks > 0:
+            self.idle_callbacks.append(callback)
+        else:
+            callback()
+
+    def _cancel_background_walks(self):
+        for cancel_event in list(self.cancel_events):
+            cancel_event.set()
+
     def _on_custom_ignore_typed(self, event=None):
         if self.custom_ignore_debounce_timer:
             self.after_cancel(self.custom_ignore_debounce_timer)
@@ -779,6 +4068,11 @@ class LLMPromptApp(ctk.CTk):
         self.instructions_debounce_timer = self.after(
             750, self.trigger_generate_prompt_stand_alone
         )
+        if self.relevance_debounce_timer:
+            self.after_cancel(self.relevance_debounce_timer)
+        self.relevance_debounce_timer = self.after(
+            RELEVANCE_DEBOUNCE_MS, self._update_relevance_suggestions
+        )
 
     def _debounced_refresh_all_views_and_prompt(self):
         logging.debug("Debounced action: Refreshing all views and prompt.")
@@ -791,15 +4085,27 @@ class LLMPromptApp(ctk.CTk):
         use_gitignore,
         custom_patterns,
         project_root_path,
+        listing_cache=None,
+        cancel_event=None,
     ):
         logging.debug(f"Task: Building file tree for {folder_path}")
-        return build_file_tree_string(
-            folder_path,
-            gitignore_matcher=gitignore_matcher,
-            use_gitignore_flag=use_gitignore,
-            custom_ignore_patterns=custom_patterns,
-            project_root_path_for_custom=project_root_path,
-        )
+        unvisited_dirs = []
+        if cancel_event is not None and cancel_event.is_set():
+            return None, listing_cache, unvisited_dirs
+        with PERF_STATS.span("file_tree.build"):
+            tree_string = build_file_tree_string(
+                folder_path,
+                gitignore_matcher=gitignore_matcher,
+                use_gitignore_flag=use_gitignore,
+                custom_ignore_patterns=custom_patterns,
+                project_root_path_for_custom=project_root_path,
+                listing_cache=listing_cache,
+                budget=WalkBudget(cancel_event=cancel_event),
+                unvisited_dirs=unvisited_dirs,
+            )
+        if unvisited_dirs:
+            PERF_STATS.add_counts({"walk_budget_partial_trees": 1})
+        return tree_string, listing_cache, unvisited_dirs
 
     def _generate_prompt_task(
         self,
@@ -810,88 +4116,166 @@ class LLMPromptApp(ctk.CTk):
         project_root_path_obj,
         use_gitignore_val,
         custom_patterns_list,
+        prompt_options=None,
+        chunk_options=None,
     ):
         logging.debug("Task: Generating prompt content.")
-        prompt_parts = []
-        if instructions:
-            prompt_parts.extend(["--- INSTRUCTIONS ---", instructions, "\n"])
-
-        if project_folder_name:
-            prompt_parts.append(f"--- PROJECT CONTEXT: {project_folder_name} ---")
-            filter_status = []
-            if (
-                use_gitignore_val
-                and self.use_gitignore_checkbox.winfo_exists()
-                and not self.use_gitignore_checkbox.cget("state") == "disabled"
-            ):
-                filter_status.append(".gitignore active")
-            if custom_patterns_list:
-                filter_status.append("custom ignores active")
-            if FALLBACK_IGNORE_DIRS or FALLBACK_IGNORE_FILES:
-                filter_status.append("default ignores active")
-            status_str = f" (Filters: {', '.join(filter_status) if filter_status else 'none active'})"
-
-            if (
-                file_tree_text
-                and file_tree_text != "(No files to display or all ignored)"
-            ):
-                prompt_parts.extend(
-                    [f"File Tree Structure{status_str}:", file_tree_text]
-                )
-            else:
-                prompt_parts.append(
-                    f"File Tree Structure: (No files to display or all files were ignored by filters{status_str})"
-                )
-            prompt_parts.append("\n")
-
-        if main_file_paths_list:
-            prompt_parts.append("--- MAIN FILE(S) CONTENT ---")
-            for file_path_str in main_file_paths_list:
-                file_p = Path(file_path_str)
-                display_path_in_prompt = file_p.name
-                if project_root_path_obj:
-                    try:
-                        abs_file_p = file_p.resolve(strict=False)
-                        abs_project_root = project_root_path_obj.resolve(strict=False)
-                        if abs_file_p.is_relative_to(abs_project_root):
-                            display_path_in_prompt = str(
-                                abs_file_p.relative_to(abs_project_root)
-                            )
-                        else:
-                            display_path_in_prompt = str(abs_file_p)
-                    except (ValueError, OSError):
-                        display_path_in_prompt = (
-                            str(file_p) if str(file_p) != "." else file_p.name
-                        )
-
-                prompt_parts.append(
-                    f"--- File: {display_path_in_prompt.replace(os.sep, '/')} ---"
-                )
-                prompt_parts.append(read_file_content(file_path_str).strip())
-                prompt_parts.append("--- End File ---")
-            prompt_parts.append("\n")
-        else:
-            prompt_parts.extend(
-                ["--- MAIN FILE(S) CONTENT ---", "(No main files added to the list.)\n"]
+        # Memory baselines travel with the result so overlapping
+        # generations each report against their own.
+        memory_baseline = (reset_peak_memory(), get_memory_usage()[0])
+        prompt_options = dict(prompt_options or {})
+        git_diff = prompt_options.pop("git_diff", None)
+        git_changes = None
+        if git_diff is not None:
+            git_changes = self._collect_git_changes_task(
+                project_root_path_obj, *git_diff
+            )["changes"]
+            if git_changes is not None:
+                prompt_options["changed_hunks"] = git_changes
+        gitignore_active = bool(
+            use_gitignore_val
+            and self.use_gitignore_checkbox.winfo_exists()
+            and not self.use_gitignore_checkbox.cget("state") == "disabled"
+        )
+        with PERF_STATS.span("prompt.generate"):
+            prompt_buffer = assemble_prompt(
+                instructions,
+                file_tree_text,
+                main_file_paths_list,
+                project_folder_name,
+                project_root_path_obj,
+                gitignore_active,
+                custom_patterns_list,
+                **prompt_options,
             )
-        return "\n".join(prompt_parts).strip()
-
-    def _update_file_tree_ui(self, tree_string):
+        if not chunk_options:
+            return prompt_buffer, memory_baseline, git_changes
+        with PERF_STATS.span("prompt.plan_chunks"):
+            prompt_chunks = PromptChunks(prompt_buffer, **chunk_options)
+        if len(prompt_chunks) > 1:
+            return prompt_chunks, memory_baseline, git_changes
+        return prompt_buffer, memory_baseline, git_changes
+
+    def _update_file_tree_ui(self, result, resumed=False):
         logging.debug("UI Update: Setting file tree content.")
-        self._set_textbox_content(
-            self.file_tree_textbox,
-            tree_string if tree_string else "(No files to display or all ignored)",
+        tree_string, listing_cache, unvisited_dirs = result
+        self.file_tree_text = (
+            tree_string if tree_string else "(No files to display or all ignored)"
         )
+        self._set_textbox_lines(self.file_tree_textbox, self.file_tree_text.split("\n"))
+        if not resumed:
+            # Nodes are filled from listings the build has just cached.
+            self._reset_file_tree_view()
+        if not unvisited_dirs:
+            self._schedule_content_index_update()
+        if unvisited_dirs and listing_cache is self.listing_cache:
+            logging.info(
+                f"Walk budget reached with {len(unvisited_dirs)} directories "
+                "unvisited; continuing in the background."
+            )
+            self._submit_quiet_task(
+                self._build_file_tree_task,
+                self._apply_resumed_file_tree,
+                self.project_folder_path,
+                listing_cache.gitignore_matcher,
+                listing_cache.use_gitignore_flag,
+                listing_cache.custom_ignore_patterns,
+                self.project_folder_path,
+                listing_cache,
+                self.walk_resume_cancel_event,
+            )
         if hasattr(self, "_chain_step") and self._chain_step == "file_tree_done":
             self._orchestrate_full_refresh_step_prompt_gen()
 
-    def _update_final_prompt_ui(self, prompt_string):
+    def _apply_resumed_file_tree(self, result):
+        tree_string, listing_cache, unvisited_dirs = result
+        if tree_string is None or listing_cache is not self.listing_cache:
+            return
+        self._update_file_tree_ui(result, resumed=True)
+        if not unvisited_dirs:
+            logging.info("Background walk finished; file tree complete.")
+            self._run_when_idle(self.trigger_generate_prompt_stand_alone)
+
+    def _update_final_prompt_ui(self, task_result):
         logging.debug("UI Update: Setting final prompt content.")
-        self._set_textbox_content(self.final_prompt_textbox, prompt_string)
+        result, memory_baseline, git_changes = task_result
+        if (
+            git_changes is not None
+            and self.git_diff_settings
+            and git_changes != self.git_changes
+        ):
+            self._set_git_changes(git_changes)
+            self._reset_file_tree_view()
+        if isinstance(result, PromptChunks):
+            self.prompt_chunks = result
+            self.show_prompt_chunk(0)
+        else:
+            self.prompt_chunks = None
+            self._show_prompt_buffer(result)
+            self._update_chunk_controls()
+        self._report_prompt_memory(*memory_baseline)
         if hasattr(self, "_chain_step") and self._chain_step == "prompt_done":
             logging.debug("Chain step 'prompt_done' complete.")
             del self._chain_step
 
+    def _show_prompt_buffer(self, prompt_buffer):
+        self.prompt_buffer = prompt_buffer
+        self._reset_copy_parts()
+        self._set_textbox_content(
+            self.final_prompt_textbox, prompt_buffer.preview(PROMPT_VIEWER_MAX_CHARS)
+        )
+
+    def show_prompt_chunk(self, index):
+        if not self.prompt_chunks or not 0 <= index < len(self.prompt_chunks):
+            return
+        self.prompt_chunk_index = index
+        with PERF_STATS.span("prompt.build_chunk"):
+            self._show_prompt_buffer(self.prompt_chunks[index])
+        self._update_chunk_controls()
+
+    def _update_chunk_controls(self):
+        if not self.chunk_position_label.winfo_exists():
+            return
+        chunk_count = len(self.prompt_chunks) if self.prompt_chunks else 0
+        index = self.prompt_chunk_index
+        self.chunk_position_label.configure(
+            text=f"Chunk {index + 1} of {chunk_count}" if chunk_count else ""
+        )
+        self.previous_chunk_button.configure(
+            state="normal" if chunk_count and index > 0 else "disabled"
+        )
+        self.next_chunk_button.configure(
+            state="normal" if index + 1 < chunk_count else "disabled"
+        )
+
+    def _report_prompt_memory(self, peak_reset, rss_before):
+        rss, peak = get_memory_usage()
+        full_prompt = (
+            self.prompt_chunks.source if self.prompt_chunks else self.prompt_buffer
+        )
+        gauges = {"prompt_chars": full_prompt.char_count}
+        if rss is not None:
+            gauges["rss_bytes"] = rss
+        if peak is not None and (peak_reset or rss_before is None or peak > rss_before):
+            gauges["prompt_peak_rss_bytes"] = peak
+        PERF_STATS.set_gauges(gauges)
+
+        peak_text = format_byte_size(gauges.get("prompt_peak_rss_bytes", peak))
+        if not peak_reset:
+            peak_text += " (process)"
+        stats_text = f"{full_prompt.char_count:,} chars | Peak RSS: {peak_text}"
+        if self.prompt_chunks:
+            stats_text += f" | {len(self.prompt_chunks)} chunks"
+        if "minify_bytes_saved" in full_prompt.stats:
+            stats_text += (
+                " | Minify saved "
+                f"{format_byte_size(full_prompt.stats['minify_bytes_saved'])} "
+                f"(~{full_prompt.stats['minify_tokens_saved']:,} tokens)"
+            )
+        logging.info(f"Prompt generated: {stats_text}.")
+        if self.prompt_stats_label.winfo_exists():
+            self.prompt_stats_label.configure(text=stats_text)
+
     def _on_project_label_configure(self, event):
         label = self.project_location_label
         if not label.winfo_exists():
@@ -924,11 +4308,16 @@ class LLMPromptApp(ctk.CTk):
         if self.active_background_tasks > 0:
             logging.warning("Orchestrator: App busy, full refresh deferred.")
             return
+        self.walk_resume_cancel_event.set()
+        self.walk_resume_cancel_event = threading.Event()
 
         self._update_project_location_label()
 
         if not self.project_folder_path:
-            self._set_textbox_content(self.file_tree_textbox, "")
+            self.file_tree_text = ""
+            self.listing_cache = DirectoryListingCache()
+            self._reset_file_tree_view()
+            self._set_textbox_lines(self.file_tree_textbox, [])
             self.trigger_generate_prompt_stand_alone()
             return
 
@@ -939,6 +4328,24 @@ class LLMPromptApp(ctk.CTk):
         self._chain_step = "file_tree_done"
         self._load_gitignore()
         custom_patterns = self._get_custom_ignore_patterns()
+        # Both tree views are filled from the listings the background task
+        # caches; the tree view is rebuilt in _update_file_tree_ui.
+        if self.use_git_index_var.get() and self.use_gitignore_var.get():
+            self.listing_cache = GitIndexListingCache(
+                self.gitignore_matcher,
+                True,
+                custom_patterns,
+                self.project_folder_path,
+                **self._get_walk_options(),
+            )
+        else:
+            self.listing_cache = DirectoryListingCache(
+                self.gitignore_matcher,
+                self.use_gitignore_var.get(),
+                custom_patterns,
+                self.project_folder_path,
+                **self._get_walk_options(),
+            )
         self._submit_task(
             self._build_file_tree_task,
             self._update_file_tree_ui,
@@ -947,6 +4354,7 @@ class LLMPromptApp(ctk.CTk):
             self.use_gitignore_var.get(),
             custom_patterns,
             self.project_folder_path,
+            self.listing_cache,
         )
 
     def _orchestrate_full_refresh_step_prompt_gen(self):
@@ -981,7 +4389,7 @@ class LLMPromptApp(ctk.CTk):
             f"Triggering prompt generation (is_part_of_chain={is_part_of_chain})."
         )
         instructions = self.instructions_textbox.get("1.0", "end-1c").strip()
-        file_tree = self.file_tree_textbox.get("1.0", "end-1c").strip()
+        file_tree = self.file_tree_text.strip()
         project_name = (
             self.project_folder_path.name if self.project_folder_path else None
         )
@@ -995,29 +4403,93 @@ class LLMPromptApp(ctk.CTk):
             self.project_folder_path,
             self.use_gitignore_var.get(),
             self._get_custom_ignore_patterns(),
+            self._get_prompt_options(),
+            self._get_chunk_options(),
+        )
+
+    def _get_chunk_options(self):
+        if not self.split_chunks_var.get():
+            return None
+        limit_text = self.chunk_limit_entry.get().strip()
+        try:
+            max_size = int(limit_text) if limit_text else PROMPT_CHUNK_DEFAULT_LIMIT
+        except ValueError:
+            logging.warning(f"Invalid chunk limit '{limit_text}'; using default.")
+            max_size = PROMPT_CHUNK_DEFAULT_LIMIT
+        return {
+            "max_size": max(max_size, PROMPT_CHUNK_MIN_LIMIT),
+            "unit": self.chunk_unit_menu.get(),
+        }
+
+    def _get_prompt_options(self):
+        hunks_only = self.diff_hunks_only_var.get()
+        return {
+            "dedupe_identical": self.dedupe_files_var.get(),
+            "changed_hunks": self.git_changes if hunks_only else None,
+            # Re-diffed in the task so edits since "Add Changed Files" show up.
+            "git_diff": (
+                (*self.git_diff_settings, self._get_custom_ignore_patterns())
+                if hunks_only and self.git_diff_settings
+                else None
+            ),
+            "minify": self.minify_content_var.get(),
+            "outline_paths": set(self.outline_file_paths),
+            "output_format": self._get_output_format(),
+        }
+
+    def _get_output_format(self):
+        selected_label = self.output_format_menu.get()
+        return next(
+            (
+                name
+                for name, output_format in PROMPT_FORMATS.items()
+                if output_format.label == selected_label
+            ),
+            DEFAULT_PROMPT_FORMAT,
         )
 
+    def _get_walk_options(self):
+        selected_label = self.symlink_policy_menu.get()
+        follow_symlinks = next(
+            (
+                policy
+                for policy, label in SYMLINK_POLICY_LABELS.items()
+                if label == selected_label
+            ),
+            SYMLINKS_INSIDE_ROOT,
+        )
+        return {
+            "follow_symlinks": follow_symlinks,
+            "one_filesystem": self.one_filesystem_var.get(),
+        }
+
     def _get_custom_ignore_patterns(self):
         patterns_str = self.custom_ignore_textbox.get("1.0", "end-1c")
         return [p.strip() for p in patterns_str.splitlines() if p.strip()]
 
     def _load_gitignore(self):
         self.gitignore_matcher = lambda path_to_check: False
+        if not gitignore_parser_available():
+            if self.use_gitignore_checkbox.winfo_exists():
+                self.use_gitignore_checkbox.configure(state="disabled")
+            self.use_gitignore_var.set(False)
+            return
         if self.use_gitignore_checkbox.winfo_exists():
             self.use_gitignore_checkbox.configure(state="normal")
         try:
-            from gitignore_parser import (
-                parse_gitignore,
-            )
-
             if self.project_folder_path and self.use_gitignore_var.get():
                 gitignore_file_path = self.project_folder_path / ".gitignore"
                 if gitignore_file_path.is_file():
+                    from gitignore_parser import (
+                        parse_gitignore,
+                    )
+
                     try:
-                        self.gitignore_matcher = parse_gitignore(
-                            str(gitignore_file_path),
-                            base_dir=str(self.project_folder_path),
-                        )
+                        with PERF_STATS.span("gitignore.parse"):
+                            self.gitignore_matcher = parse_gitignore(
+                                str(gitignore_file_path),
+                                base_dir=str(self.project_folder_path),
+                            )
                         logging.info(f".gitignore loaded from {gitignore_file_path}")
                     except Exception as e:
                         logging.error(f"Error parsing .gitignore: {e}")
@@ -1025,11 +4497,6 @@ class LLMPromptApp(ctk.CTk):
                     logging.info(
                         f".gitignore not found or not a file in {self.project_folder_path}"
                     )
-        except ImportError:
-            logging.warning("gitignore_parser not found. .gitignore disabled.")
-            if self.use_gitignore_checkbox.winfo_exists():
-                self.use_gitignore_checkbox.configure(state="disabled")
-            self.use_gitignore_var.set(False)
         except Exception as e:
             logging.error(f"Error in _load_gitignore: {e}")
 
@@ -1037,46 +4504,262 @@ class LLMPromptApp(ctk.CTk):
         logging.info("Attempting to open project folder...")
         folder_path_str = filedialog.askdirectory(title="Select Project Folder")
         if folder_path_str:
-            new_project_path = Path(folder_path_str)
+            new_project_path = Path(folder_path_str).resolve()
             if self.project_folder_path != new_project_path:
                 self.project_folder_path = new_project_path
                 self.title(f"LLM Prompt Generator - {self.project_folder_path.name}")
                 logging.info(f"Project folder selected: {self.project_folder_path}")
 
                 self.main_file_paths = []
+                self.git_changes, self.git_changed_dirs = {}, set()
+                self.git_diff_settings = None
+                self.outline_file_paths = set()
                 self._rebuild_listbox_from_main_file_paths()
                 self._orchestrate_full_refresh()
             else:
-                logging.info("Same project folder selected again. No change.")
-        else:
-            logging.info("Project folder selection cancelled.")
-            if not self.project_folder_path:
-                self._update_project_location_label()
-                self._orchestrate_full_refresh()
+                logging.info("Same project folder selected again. No change.")
+        else:
+            logging.info("Project folder selection cancelled.")
+            if not self.project_folder_path:
+                self._update_project_location_label()
+                self._orchestrate_full_refresh()
+
+    def _get_display_path(self, full_path_str: str) -> str:
+        full_path_obj = Path(full_path_str)
+        if self.project_folder_path:
+            try:
+                abs_full_path = full_path_obj.resolve(strict=True)
+                abs_project_path = self.project_folder_path.resolve(strict=True)
+
+                if abs_full_path.is_relative_to(abs_project_path):
+                    return str(abs_full_path.relative_to(abs_project_path))
+            except (FileNotFoundError, RuntimeError, ValueError):
+                pass
+        return full_path_str
+
+    def _rebuild_listbox_from_main_file_paths(self):
+        if not self.main_files_listbox.winfo_exists():
+            return
+        self.main_files_listbox.delete("all")
+        for full_path_str in self.main_file_paths:
+            display_path = self._get_display_path(full_path_str)
+            if full_path_str in self.outline_file_paths:
+                display_path = f"[outline] {display_path}"
+            self.main_files_listbox.insert("END", display_path)
+        logging.debug(
+            f"Rebuilt main_files_listbox with {len(self.main_file_paths)} items."
+        )
+        self._sync_file_tree_checks()
+
+    def _style_file_tree_view(self):
+        style = ttk.Style(self)
+        bg_color = self._apply_appearance_mode(
+            ctk.ThemeManager.theme["CTkTextbox"]["fg_color"]
+        )
+        text_color = self._apply_appearance_mode(
+            ctk.ThemeManager.theme["CTkTextbox"]["text_color"]
+        )
+        selected_color = self._apply_appearance_mode(
+            ctk.ThemeManager.theme["CTkButton"]["fg_color"]
+        )
+        style.configure(
+            "PromptGen.Treeview",
+            background=bg_color,
+            foreground=text_color,
+            fieldbackground=bg_color,
+            borderwidth=0,
+        )
+        style.map("PromptGen.Treeview", background=[("selected", selected_color)])
+
+    def _on_file_tree_mode_changed(self, value):
+        if value == "Text":
+            self.file_tree_view_frame.grid_remove()
+            self.file_tree_textbox.grid()
+        else:
+            self.file_tree_textbox.grid_remove()
+            self.file_tree_view_frame.grid()
+
+    def _file_tree_item_text(self, item_name, is_dir, item_id):
+        if is_dir:
+            return f"{item_name}/"
+        checked = item_id in self.main_file_paths_set
+        return f"{FILE_TREE_CHECKED if checked else FILE_TREE_UNCHECKED} {item_name}"
+
+    def _reset_file_tree_view(self):
+        tree = self.file_tree_view
+        if not tree.winfo_exists():
+            return
+        tree.delete(*tree.get_children())
+        self.file_tree_file_items = set()
+        if not self.project_folder_path:
+            self.file_tree_open_dirs = set()
+            return
+
+        self.main_file_paths_set = set(self.main_file_paths)
+        dir_paths = [self.project_folder_path] + [
+            Path(dir_id) for dir_id in sorted(self.file_tree_open_dirs, key=len)
+        ]
+        if all(self.listing_cache.has_listing(p) for p in dir_paths):
+            self._fill_file_tree_view()
+            return
+        tree.insert("", "end", text=FILE_TREE_LOADING_TEXT)
+        self._submit_quiet_task(
+            self._list_file_tree_dirs_task,
+            self._file_tree_dirs_listed,
+            self.listing_cache,
+            dir_paths,
+            self.walk_resume_cancel_event,
+            None,
+        )
+
+    def _fill_file_tree_view(self):
+        tree = self.file_tree_view
+        tree.delete(*tree.get_children())
+        self.file_tree_file_items = set()
+        self._populate_file_tree_node("", self.project_folder_path)
+        for dir_id in sorted(self.file_tree_open_dirs, key=len):
+            if tree.exists(dir_id):
+                self._populate_file_tree_node(dir_id, Path(dir_id))
+                tree.item(dir_id, open=True)
+            else:
+                self.file_tree_open_dirs.discard(dir_id)
+
+    def _list_file_tree_dirs_task(
+        self, listing_cache, dir_paths, cancel_event, node_id
+    ):
+        # Lists directories for the tree view off the UI thread, together
+        # with the skip checks their subdirectories need when shown.
+        budget = WalkBudget(cancel_event=cancel_event)
+        for index, dir_path in enumerate(dir_paths):
+            if index and budget.exhausted():
+                break
+            try:
+                entries = listing_cache.list_dir(dir_path)
+            except OSError:
+                continue
+            budget.charge(len(entries) + 1)
+            for item_name, item_path_obj, is_dir in entries:
+                if is_dir:
+                    listing_cache.skip_reason(item_path_obj)
+        return listing_cache, cancel_event.is_set(), node_id, dir_paths[0]
+
+    def _file_tree_dirs_listed(self, result):
+        listing_cache, cancelled, node_id, dir_path = result
+        tree = self.file_tree_view
+        if cancelled or listing_cache is not self.listing_cache:
+            return
+        if not tree.winfo_exists() or not self.project_folder_path:
+            return
+        self.main_file_paths_set = set(self.main_file_paths)
+        if not node_id:
+            self._fill_file_tree_view()
+        elif tree.exists(node_id):
+            self._populate_file_tree_node(node_id, dir_path)
+
+    def _populate_file_tree_node(self, parent_id, dir_path: Path):
+        tree = self.file_tree_view
+        placeholder_id = f"{parent_id}{FILE_TREE_PLACEHOLDER_SUFFIX}"
+        if parent_id and not tree.exists(placeholder_id):
+            if tree.get_children(parent_id):
+                return
+        if not self.listing_cache.has_listing(dir_path):
+            self._submit_quiet_task(
+                self._list_file_tree_dirs_task,
+                self._file_tree_dirs_listed,
+                self.listing_cache,
+                [dir_path],
+                self.walk_resume_cancel_event,
+                parent_id,
+            )
+            return
+        if parent_id and tree.exists(placeholder_id):
+            tree.delete(placeholder_id)
+
+        try:
+            entries = self.listing_cache.list_dir(dir_path)
+        except OSError as e:
+            tree.insert(
+                parent_id, "end", text=f"[ERROR ITERATING] {dir_path.name}: {e}"
+            )
+            return
+
+        for item_name, item_path_obj, is_dir in entries:
+            item_id = str(dir_path / item_name)
+            skip_reason = (
+                self.listing_cache.skip_reason(item_path_obj) if is_dir else None
+            )
+            if skip_reason:
+                tree.insert(
+                    parent_id,
+                    "end",
+                    iid=item_id,
+                    text=f"{item_name}/ [{skip_reason}]",
+                    tags=("skipped",),
+                )
+                continue
+            tree.insert(
+                parent_id,
+                "end",
+                iid=item_id,
+                text=self._file_tree_item_text(item_name, is_dir, item_id),
+                tags=(
+                    ("dir" if is_dir else "file",)
+                    + (
+                        ("changed",)
+                        if item_id in self.git_changes
+                        or item_id in self.git_changed_dirs
+                        else ()
+                    )
+                ),
+            )
+            if is_dir:
+                tree.insert(
+                    item_id,
+                    "end",
+                    iid=f"{item_id}{FILE_TREE_PLACEHOLDER_SUFFIX}",
+                    text=FILE_TREE_LOADING_TEXT,
+                )
+            else:
+                self.file_tree_file_items.add(item_id)
 
-    def _get_display_path(self, full_path_str: str) -> str:
-        full_path_obj = Path(full_path_str)
-        if self.project_folder_path:
-            try:
-                abs_full_path = full_path_obj.resolve(strict=True)
-                abs_project_path = self.project_folder_path.resolve(strict=True)
+    def _on_file_tree_node_open(self, event=None):
+        dir_id = self.file_tree_view.focus()
+        if not dir_id or not self.file_tree_view.tag_has("dir", dir_id):
+            return
+        self.main_file_paths_set = set(self.main_file_paths)
+        self._populate_file_tree_node(dir_id, Path(dir_id))
+        self.file_tree_open_dirs.add(dir_id)
 
-                if abs_full_path.is_relative_to(abs_project_path):
-                    return str(abs_full_path.relative_to(abs_project_path))
-            except (FileNotFoundError, RuntimeError, ValueError):
-                pass
-        return full_path_str
+    def _on_file_tree_node_close(self, event=None):
+        self.file_tree_open_dirs.discard(self.file_tree_view.focus())
 
-    def _rebuild_listbox_from_main_file_paths(self):
-        if not self.main_files_listbox.winfo_exists():
+    def _on_file_tree_click(self, event):
+        item_id = self.file_tree_view.identify_row(event.y)
+        if not item_id or item_id not in self.file_tree_file_items:
+            return
+        if self.active_background_tasks > 0:
+            logging.debug("File tree click ignored: App busy.")
             return
-        self.main_files_listbox.delete("all")
-        for full_path_str in self.main_file_paths:
-            display_path = self._get_display_path(full_path_str)
-            self.main_files_listbox.insert("END", display_path)
-        logging.debug(
-            f"Rebuilt main_files_listbox with {len(self.main_file_paths)} items."
-        )
+
+        file_path = str(Path(item_id).resolve(strict=False))
+        if file_path in self.main_file_paths:
+            self.main_file_paths.remove(file_path)
+            self.outline_file_paths.discard(file_path)
+        else:
+            self.main_file_paths.append(file_path)
+        self._rebuild_listbox_from_main_file_paths()
+        self.trigger_generate_prompt_stand_alone()
+
+    def _sync_file_tree_checks(self):
+        if not self.file_tree_view.winfo_exists():
+            return
+        self.main_file_paths_set = set(self.main_file_paths)
+        for item_id in self.file_tree_file_items:
+            if self.file_tree_view.exists(item_id):
+                item_name = Path(item_id).name
+                new_text = self._file_tree_item_text(item_name, False, item_id)
+                if self.file_tree_view.item(item_id, "text") != new_text:
+                    self.file_tree_view.item(item_id, text=new_text)
 
     def add_files_from_folder(self):
         logging.debug("Adding files from folder (non-recursive)...")
@@ -1099,98 +4782,7 @@ class LLMPromptApp(ctk.CTk):
             logging.info(
                 f"Folder selected for file addition: {selected_folder_path_obj}"
             )
-
-            custom_patterns = self._get_custom_ignore_patterns()
-            use_gitignore = self.use_gitignore_var.get()
-
-            added_count = 0
-            try:
-                for item_path_obj in selected_folder_path_obj.iterdir():
-                    try:
-                        if not item_path_obj.is_file():
-                            continue
-                    except OSError:
-                        logging.warning(
-                            f"OSError checking if {item_path_obj} is a file. Skipping."
-                        )
-                        continue
-
-                    item_name = item_path_obj.name
-                    is_ignored_by_project_gitignore = False
-                    if (
-                        use_gitignore
-                        and self.gitignore_matcher
-                        and self.project_folder_path
-                    ):
-                        try:
-                            resolved_item_path = item_path_obj.resolve(strict=False)
-                            resolved_project_root = self.project_folder_path.resolve(
-                                strict=False
-                            )
-
-                            if resolved_item_path.is_relative_to(resolved_project_root):
-                                if self.gitignore_matcher(item_path_obj):
-                                    is_ignored_by_project_gitignore = True
-                        except (ValueError, OSError) as e:
-                            logging.warning(
-                                f"Could not determine if {item_path_obj} is relative to project {self.project_folder_path} "
-                                f"for .gitignore check: {e}. Assuming not ignored by project .gitignore."
-                            )
-                            pass
-
-                    if is_ignored_by_project_gitignore:
-                        continue
-                    if _is_custom_ignored(
-                        item_path_obj, self.project_folder_path, custom_patterns
-                    ):
-                        continue
-                    if (
-                        item_name in FALLBACK_IGNORE_FILES
-                        or any(
-                            fnmatch.fnmatch(item_name, pat)
-                            for pat in FALLBACK_IGNORE_FILES
-                            if "*" in pat
-                        )
-                        or (
-                            item_name.startswith(".")
-                            and item_name
-                            not in {".gitignore", ".gitattributes", ".gitmodules"}
-                        )
-                    ):
-                        continue
-
-                    full_path_str = str(item_path_obj.resolve(strict=False))
-                    if full_path_str not in self.main_file_paths:
-                        self.main_file_paths.append(full_path_str)
-                        added_count += 1
-
-                if added_count > 0:
-                    self._rebuild_listbox_from_main_file_paths()
-                    self.trigger_generate_prompt_stand_alone()
-                logging.info(
-                    f"Added {added_count} files from {selected_folder_path_obj.name}"
-                )
-            except PermissionError as e:
-                logging.error(
-                    f"Permission error when trying to iterate/access files in {selected_folder_path_obj}: {e}",
-                )
-                CTkMessagebox(
-                    master=self,
-                    title="Permission Error",
-                    message=f"Cannot access files in the selected folder due to permission issues:\n{selected_folder_path_obj}",
-                    icon="cancel",
-                )
-            except Exception as e:
-                logging.error(
-                    f"Error adding files from folder {selected_folder_path_obj}: {e}",
-                    exc_info=True,
-                )
-                CTkMessagebox(
-                    master=self,
-                    title="Error",
-                    message=f"Could not read folder contents: {e}",
-                    icon="cancel",
-                )
+            self._start_folder_files_task(selected_folder_path_obj, recursive=False)
 
     def add_files_from_folder_recursively(self):
         logging.debug("Adding files from folder (recursive)...")
@@ -1215,56 +4807,254 @@ class LLMPromptApp(ctk.CTk):
         logging.info(
             f"Folder selected for recursive file addition: {selected_folder_path_obj}"
         )
+        self._start_folder_files_task(selected_folder_path_obj, recursive=True)
 
-        custom_patterns = self._get_custom_ignore_patterns()
-        use_gitignore = self.use_gitignore_var.get()
-        added_count = 0
+    def _start_folder_files_task(self, folder_path: Path, recursive: bool):
+        if self.active_background_tasks > 0:
+            logging.warning("Add files: App busy, request ignored.")
+            return
 
-        try:
-            for root, dirs, files in os.walk(str(selected_folder_path_obj)):
-                root_path = Path(root)
-
-                dirs[:] = [
-                    d
-                    for d in dirs
-                    if not self._is_dir_ignored(
-                        root_path / d, use_gitignore, custom_patterns
-                    )
-                ]
+        cancel_event = threading.Event()
+        self.cancel_events.add(cancel_event)
+        self._submit_task(
+            self._collect_folder_files_task,
+            self._apply_collected_files,
+            folder_path,
+            recursive,
+            self.use_gitignore_var.get(),
+            self._get_custom_ignore_patterns(),
+            set(self.main_file_paths),
+            cancel_event,
+            self.listing_cache,
+        )
+        if self.progress_popup and self.progress_popup.winfo_exists():
+            self.progress_popup.update_label(f"Scanning {folder_path.name}...")
 
-                for filename in files:
-                    file_path = root_path / filename
-                    if not self._is_file_ignored(
-                        file_path, use_gitignore, custom_patterns
-                    ):
-                        full_path_str = str(file_path.resolve(strict=False))
-                        if full_path_str not in self.main_file_paths:
-                            self.main_file_paths.append(full_path_str)
-                            added_count += 1
+    def _is_ignored_by_project_gitignore(self, item_path_obj: Path, use_gitignore):
+        if not (use_gitignore and self.gitignore_matcher and self.project_folder_path):
+            return False
+        try:
+            resolved_item_path = item_path_obj.resolve(strict=False)
+            resolved_project_root = self.project_folder_path.resolve(strict=False)
+
+            if resolved_item_path.is_relative_to(resolved_project_root):
+                return bool(self.gitignore_matcher(item_path_obj))
+        except (ValueError, OSError) as e:
+            logging.warning(
+                f"Could not determine if {item_path_obj} is relative to project {self.project_folder_path} "
+                f"for .gitignore check: {e}. Assuming not ignored by project .gitignore."
+            )
+        return False
 
-            if added_count > 0:
-                self._rebuild_listbox_from_main_file_paths()
-                self.trigger_generate_prompt_stand_alone()
-            logging.info(
-                f"Added {added_count} files recursively from {selected_folder_path_obj.name}"
+    def _collect_folder_files_task(
+        self,
+        folder_path: Path,
+        recursive,
+        use_gitignore,
+        custom_patterns,
+        existing_paths,
+        cancel_event,
+        listing_cache=None,
+        start_dirs=None,
+    ):
+        logging.debug(
+            f"Task: Collecting files from {folder_path} (recursive={recursive})"
+        )
+        result = {
+            "folder": folder_path,
+            "recursive": recursive,
+            "paths": [],
+            "visited": 0,
+            "cancelled": False,
+            "error": None,
+            "unvisited": [],
+            "resumed": start_dirs is not None,
+            "listing_cache": listing_cache,
+            "use_gitignore": use_gitignore,
+            "custom_patterns": custom_patterns,
+        }
+        seen = set(existing_paths)
+
+        def add_if_new(file_path: Path):
+            full_path_str = str(file_path.resolve(strict=False))
+            if full_path_str not in seen:
+                seen.add(full_path_str)
+                result["paths"].append(full_path_str)
+
+        def report_progress():
+            self.ui_queue.put(
+                (
+                    "task_progress",
+                    (
+                        f"Scanning {folder_path.name}...",
+                        f"{result['visited']} entries scanned, "
+                        f"{len(result['paths'])} files found.",
+                    ),
+                    None,
+                )
             )
-            CTkMessagebox(
-                master=self,
-                title="Success",
-                message=f"Added {added_count} files.",
-                icon="check",
+
+        indexed_files = None
+        if (
+            use_gitignore
+            and isinstance(listing_cache, GitIndexListingCache)
+            and listing_cache.custom_ignore_patterns == custom_patterns
+        ):
+            indexed_files = listing_cache.visible_files(
+                folder_path, recursive, cancel_event
             )
 
+        try:
+            if indexed_files is not None:
+                result["visited"] = len(indexed_files)
+                for file_path in indexed_files:
+                    add_if_new(file_path)
+            elif cancel_event.is_set():
+                result["cancelled"] = True
+            elif recursive:
+                walk_cache = listing_cache or DirectoryListingCache(
+                    project_root_path=self.project_folder_path
+                )
+                budget = WalkBudget()
+                pending = list(reversed(start_dirs or [folder_path]))
+                while pending:
+                    if cancel_event.is_set():
+                        result["cancelled"] = True
+                        break
+                    if budget.exhausted():
+                        result["unvisited"] = pending[::-1]
+                        break
+                    dir_path = pending.pop()
+                    try:
+                        with os.scandir(dir_path) as scanned:
+                            entries = list(scanned)
+                    except OSError as e:
+                        logging.warning(f"Skipping unreadable folder {dir_path}: {e}")
+                        continue
+                    budget.charge(len(entries) + 1)
+
+                    subdirs = []
+                    for entry in entries:
+                        entry_path = dir_path / entry.name
+                        try:
+                            is_dir = entry.is_dir()
+                        except OSError:
+                            is_dir = False
+                        if is_dir:
+                            if not self._is_dir_ignored(
+                                entry_path, use_gitignore, custom_patterns
+                            ) and not walk_cache.skip_reason(entry_path):
+                                subdirs.append(entry_path)
+                            continue
+                        result["visited"] += 1
+                        if result["visited"] % FOLDER_SCAN_PROGRESS_INTERVAL == 0:
+                            report_progress()
+                        if not self._is_file_ignored(
+                            entry_path, use_gitignore, custom_patterns
+                        ):
+                            add_if_new(entry_path)
+                    pending.extend(reversed(subdirs))
+            else:
+                for item_path_obj in folder_path.iterdir():
+                    if cancel_event.is_set():
+                        result["cancelled"] = True
+                        break
+                    result["visited"] += 1
+                    if result["visited"] % FOLDER_SCAN_PROGRESS_INTERVAL == 0:
+                        report_progress()
+                    try:
+                        if not item_path_obj.is_file():
+                            continue
+                    except OSError:
+                        logging.warning(
+                            f"OSError checking if {item_path_obj} is a file. Skipping."
+                        )
+                        continue
+
+                    item_name = item_path_obj.name
+                    if self._is_ignored_by_project_gitignore(
+                        item_path_obj, use_gitignore
+                    ):
+                        continue
+                    if _is_custom_ignored(
+                        item_path_obj, self.project_folder_path, custom_patterns
+                    ):
+                        continue
+                    if _is_default_ignored(item_name, False):
+                        continue
+                    add_if_new(item_path_obj)
+        except PermissionError as e:
+            logging.error(
+                f"Permission error when trying to iterate/access files in {folder_path}: {e}",
+            )
+            result["error"] = (
+                "Permission Error",
+                f"Cannot access files in the selected folder due to permission issues:\n{folder_path}",
+            )
         except Exception as e:
             logging.error(
-                f"Error during recursive file addition from {selected_folder_path_obj}: {e}",
+                f"Error adding files from folder {folder_path}: {e}",
                 exc_info=True,
             )
+            result["error"] = ("Error", f"An unexpected error occurred: {e}")
+        finally:
+            self.cancel_events.discard(cancel_event)
+        return result
+
+    def _apply_collected_files(self, result):
+        folder_path = result["folder"]
+        if result["error"]:
+            title, msg = result["error"]
+            CTkMessagebox(master=self, title=title, message=msg, icon="cancel")
+            return
+        if result["cancelled"]:
+            logging.info(
+                f"File addition from {folder_path.name} cancelled after "
+                f"{result['visited']} entries."
+            )
+            return
+
+        new_paths = result["paths"]
+        if new_paths:
+            existing = set(self.main_file_paths)
+            self.main_file_paths.extend(p for p in new_paths if p not in existing)
+            self._rebuild_listbox_from_main_file_paths()
+            if result["resumed"]:
+                self._run_when_idle(self.trigger_generate_prompt_stand_alone)
+            else:
+                self.trigger_generate_prompt_stand_alone(is_part_of_chain=True)
+        logging.info(f"Added {len(new_paths)} files from {folder_path.name}")
+
+        unvisited = result["unvisited"]
+        if unvisited:
+            logging.info(
+                f"Walk budget reached in {folder_path.name}; scanning "
+                f"{len(unvisited)} remaining folders in the background."
+            )
+            self._submit_quiet_task(
+                self._collect_folder_files_task,
+                self._apply_collected_files,
+                folder_path,
+                True,
+                result["use_gitignore"],
+                result["custom_patterns"],
+                set(self.main_file_paths),
+                self.walk_resume_cancel_event,
+                result["listing_cache"],
+                unvisited,
+            )
+        if result["recursive"] and not result["resumed"]:
+            message = f"Added {len(new_paths)} files."
+            if unvisited:
+                message += (
+                    f"\nThe walk budget was reached; {len(unvisited)} folders "
+                    "are still being scanned in the background."
+                )
             CTkMessagebox(
                 master=self,
-                title="Error",
-                message=f"An unexpected error occurred: {e}",
-                icon="cancel",
+                title="Success",
+                message=message,
+                icon="check",
             )
 
     def _is_dir_ignored(self, dir_path, use_gitignore, custom_patterns):
@@ -1277,17 +5067,7 @@ class LLMPromptApp(ctk.CTk):
             return True
         if _is_custom_ignored(dir_path, self.project_folder_path, custom_patterns):
             return True
-        if (
-            dir_name in FALLBACK_IGNORE_DIRS
-            or any(
-                fnmatch.fnmatch(dir_name, pat)
-                for pat in FALLBACK_IGNORE_DIRS
-                if "*" in pat
-            )
-            or (dir_name.startswith(".") and dir_name not in {".well-known"})
-        ):
-            return True
-        return False
+        return _is_default_ignored(dir_name, True)
 
     def _is_file_ignored(self, file_path, use_gitignore, custom_patterns):
         file_name = file_path.name
@@ -1299,20 +5079,298 @@ class LLMPromptApp(ctk.CTk):
             return True
         if _is_custom_ignored(file_path, self.project_folder_path, custom_patterns):
             return True
-        if (
-            file_name in FALLBACK_IGNORE_FILES
-            or any(
-                fnmatch.fnmatch(file_name, pat)
-                for pat in FALLBACK_IGNORE_FILES
-                if "*" in pat
+        return _is_default_ignored(file_name, False)
+
+    def add_changed_files(self):
+        logging.debug("Adding changed files from git diff...")
+        if not self.project_folder_path:
+            CTkMessagebox(
+                master=self,
+                title="No Project",
+                message="Please open a project folder first.",
+                icon="warning",
+            )
+            return
+        if self.active_background_tasks > 0:
+            logging.warning("Add changed files: App busy, request ignored.")
+            return
+        context_text = self.diff_context_entry.get().strip()
+        try:
+            context_lines = (
+                int(context_text) if context_text else GIT_DIFF_DEFAULT_CONTEXT_LINES
+            )
+            if context_lines < 0:
+                raise ValueError(context_text)
+        except ValueError:
+            CTkMessagebox(
+                master=self,
+                title="Invalid Context",
+                message="Context lines must be a non-negative whole number.",
+                icon="warning",
+            )
+            return
+
+        self._submit_task(
+            self._collect_git_changes_task,
+            self._apply_git_changes,
+            self.project_folder_path,
+            self.git_base_ref_entry.get().strip() or None,
+            context_lines,
+            self._get_custom_ignore_patterns(),
+        )
+
+    def _collect_git_changes_task(
+        self, project_root: Path, base_ref, context_lines, custom_patterns
+    ):
+        logging.debug(f"Task: Collecting git changes (base={base_ref or 'HEAD'})")
+        changes = git_changed_files(project_root, base_ref, context_lines)
+        result = {
+            "base_ref": base_ref,
+            "context_lines": context_lines,
+            "changes": None,
+        }
+        if changes is None:
+            return result
+
+        resolved_root = project_root.resolve(strict=False)
+        result["changes"] = {}
+        for rel_path, hunks in changes.items():
+            file_path = resolved_root / rel_path
+            if not file_path.is_file() or _is_custom_ignored(
+                file_path, project_root, custom_patterns
+            ):
+                continue
+            result["changes"][str(file_path)] = hunks
+        return result
+
+    def _set_git_changes(self, changes):
+        self.git_changes = changes
+        self.git_changed_dirs = set()
+        root_id = str(self.project_folder_path)
+        for path_str in changes:
+            parent = Path(path_str).parent
+            while str(parent) != root_id and str(parent) not in self.git_changed_dirs:
+                if parent == parent.parent:
+                    break
+                self.git_changed_dirs.add(str(parent))
+                parent = parent.parent
+
+    def _apply_git_changes(self, result):
+        base_label = f"{result['base_ref']}...HEAD" if result["base_ref"] else "HEAD"
+        changes = result["changes"]
+        if changes is None:
+            CTkMessagebox(
+                master=self,
+                title="Git Diff Failed",
+                message=f"Could not read the git diff against {base_label}.\n"
+                "Check that the project is a git repository and the base ref exists.",
+                icon="cancel",
+            )
+            return
+
+        self.git_diff_settings = (result["base_ref"], result["context_lines"])
+        self._set_git_changes(changes)
+        existing = set(self.main_file_paths)
+        new_paths = [p for p in changes if p not in existing]
+        self.main_file_paths.extend(new_paths)
+        self._rebuild_listbox_from_main_file_paths()
+        self._reset_file_tree_view()
+        self.trigger_generate_prompt_stand_alone(is_part_of_chain=True)
+        logging.info(
+            f"{len(changes)} changed files against {base_label}, "
+            f"{len(new_paths)} newly added."
+        )
+        if not changes:
+            CTkMessagebox(
+                master=self,
+                title="No Changes",
+                message=f"No changed files found against {base_label}.",
+                icon="info",
+            )
+
+    def add_content_matches(self, event=None):
+        if not self.project_folder_path:
+            CTkMessagebox(
+                master=self,
+                title="No Project",
+                message="Please open a project folder first.",
+                icon="warning",
+            )
+            return
+        if self.active_background_tasks > 0:
+            logging.warning("Add content matches: App busy, request ignored.")
+            return
+        query = self.content_search_entry.get()
+        if not query.strip():
+            return
+        is_regex = self.content_search_regex_var.get()
+        try:
+            pattern = re.compile(query if is_regex else re.escape(query), re.IGNORECASE)
+        except re.error as e:
+            CTkMessagebox(
+                master=self,
+                title="Invalid Regex",
+                message=f"Could not compile the search pattern: {e}",
+                icon="warning",
+            )
+            return
+        literals = regex_required_literals(query) if is_regex else [query]
+        self._ensure_content_indexes_for_project()
+        self._submit_task(
+            self._search_content_task,
+            self._apply_content_matches,
+            [self.content_index, self.relevance_index],
+            self.listing_cache,
+            self.project_folder_path,
+            self.walk_resume_cancel_event,
+            pattern,
+            literals,
+        )
+
+    def _search_content_task(
+        self,
+        content_indexes,
+        listing_cache,
+        project_root,
+        cancel_event,
+        pattern,
+        literals,
+    ):
+        # Catch up on edits first; only changed mtimes or sizes are re-read,
+        # and the match check can drop false positives but not find misses.
+        with PERF_STATS.span("content_index.update"):
+            update_content_indexes(
+                content_indexes,
+                listing_cache.walk_files(project_root, cancel_event),
+                cancel_event,
+            )
+        content_index = content_indexes[0]
+        with PERF_STATS.span("content_index.search"):
+            matches = content_index.search(pattern, literals)
+        resolved_root = project_root.resolve(strict=False)
+        paths = [str(Path(p).resolve(strict=False)) for p in matches]
+        return {
+            "query": pattern.pattern,
+            "paths": [p for p in paths if Path(p).is_relative_to(resolved_root)],
+            "indexed": content_index.file_count(),
+        }
+
+    def _apply_content_matches(self, result):
+        existing = set(self.main_file_paths)
+        new_paths = [p for p in result["paths"] if p not in existing]
+        self.main_file_paths.extend(new_paths)
+        logging.info(
+            f"{len(result['paths'])} of {result['indexed']} indexed files match "
+            f"'{result['query']}', {len(new_paths)} newly added."
+        )
+        if new_paths:
+            self._rebuild_listbox_from_main_file_paths()
+            self.trigger_generate_prompt_stand_alone(is_part_of_chain=True)
+        elif not result["paths"]:
+            message = f"No indexed files match '{self.content_search_entry.get()}'."
+            if self.content_index_running:
+                message += "\nThe content index is still being built."
+            CTkMessagebox(master=self, title="No Matches", message=message, icon="info")
+
+    def _schedule_content_index_update(self):
+        if not self.project_folder_path:
+            return
+        if self.content_index_running:
+            self.content_index_stale = True
+            return
+        self._ensure_content_indexes_for_project()
+        self.content_index_running = True
+        self._submit_quiet_task(
+            self._update_content_index_task,
+            self._content_index_updated,
+            self.listing_cache,
+            self.project_folder_path,
+            self.walk_resume_cancel_event,
+        )
+
+    def _ensure_content_indexes_for_project(self):
+        # Both indexes only hold files from the project they were built for.
+        resolved_root = self.project_folder_path.resolve(strict=False)
+        if self.content_index.project_root != resolved_root:
+            self.content_index = TrigramIndex(self.project_folder_path)
+        if self.relevance_index.project_root != resolved_root:
+            self.relevance_index = RelevanceIndex(self.project_folder_path)
+
+    def _update_content_index_task(self, listing_cache, folder_path, cancel_event):
+        try:
+            with PERF_STATS.span("content_index.update"):
+                return update_content_indexes(
+                    [self.content_index, self.relevance_index],
+                    listing_cache.walk_files(folder_path, cancel_event),
+                    cancel_event,
+                )
+        except Exception as e:
+            logging.error(f"Content index update failed: {e}", exc_info=True)
+            return {"changed": 0, "cancelled": True}
+
+    def _content_index_updated(self, result):
+        self.content_index_running = False
+        logging.debug(
+            f"Content index updated: {result['changed']} files changed, "
+            f"{self.content_index.file_count()} indexed."
+        )
+        if self.content_index_stale:
+            self.content_index_stale = False
+            self._schedule_content_index_update()
+        elif not result["cancelled"]:
+            self._update_relevance_suggestions()
+
+    def _get_suggestion_count(self):
+        count_text = self.suggestion_count_entry.get().strip()
+        try:
+            return max(1, int(count_text)) if count_text else RELEVANCE_DEFAULT_TOP_N
+        except ValueError:
+            logging.warning(f"Invalid suggestion count '{count_text}'; using default.")
+            return RELEVANCE_DEFAULT_TOP_N
+
+    def _update_relevance_suggestions(self):
+        self.relevance_debounce_timer = None
+        instructions = self.instructions_textbox.get("1.0", "end-1c")
+        with PERF_STATS.span("relevance.rank"):
+            ranked = self.relevance_index.rank(
+                instructions,
+                self._get_suggestion_count(),
+                exclude=set(self.main_file_paths),
             )
-            or (
-                file_name.startswith(".")
-                and file_name not in {".gitignore", ".gitattributes", ".gitmodules"}
+        self.relevance_suggestions = [path_str for path_str, _ in ranked]
+        if not self.relevance_suggestions_label.winfo_exists():
+            return
+        if ranked:
+            text = "Suggested: " + ", ".join(
+                Path(p).name for p in self.relevance_suggestions
             )
-        ):
-            return True
-        return False
+        else:
+            text = ""
+        self.relevance_suggestions_label.configure(text=text)
+
+    def add_suggested_files(self):
+        if self.active_background_tasks > 0:
+            logging.warning("Add suggested files: App busy, request ignored.")
+            return
+        self._update_relevance_suggestions()
+        existing = set(self.main_file_paths)
+        new_paths = [p for p in self.relevance_suggestions if p not in existing]
+        if not new_paths:
+            message = (
+                "Type instructions that mention identifiers or file names "
+                "to get suggestions."
+                if self.relevance_index.file_count()
+                else "The relevance index is still being built."
+            )
+            CTkMessagebox(
+                master=self, title="No Suggestions", message=message, icon="info"
+            )
+            return
+        self.main_file_paths.extend(new_paths)
+        logging.info(f"Added {len(new_paths)} suggested files.")
+        self._rebuild_listbox_from_main_file_paths()
+        self._update_relevance_suggestions()
+        self.trigger_generate_prompt_stand_alone()
 
     def add_individual_files(self):
         logging.debug("Adding individual main files...")
@@ -1357,12 +5415,116 @@ class LLMPromptApp(ctk.CTk):
                     f"Attempted to delete out-of-bounds index {index} from main_file_paths"
                 )
 
+        self.outline_file_paths.intersection_update(self.main_file_paths)
+        self._rebuild_listbox_from_main_file_paths()
+        self.trigger_generate_prompt_stand_alone()
+
+    def toggle_outline_for_selected_files(self):
+        if not self.main_files_listbox.winfo_exists():
+            return
+        selected_indices = self.main_files_listbox.curselection()
+        if not selected_indices:
+            CTkMessagebox(
+                master=self,
+                title="Info",
+                message="No files selected in the list to outline.",
+                icon="info",
+            )
+            return
+
+        selected_paths = [
+            self.main_file_paths[index]
+            for index in selected_indices
+            if 0 <= index < len(self.main_file_paths)
+        ]
+        if all(path in self.outline_file_paths for path in selected_paths):
+            self.outline_file_paths.difference_update(selected_paths)
+        else:
+            self.outline_file_paths.update(selected_paths)
         self._rebuild_listbox_from_main_file_paths()
         self.trigger_generate_prompt_stand_alone()
 
+    def expand_dependencies_of_selected_files(self):
+        if not self.project_folder_path:
+            CTkMessagebox(
+                master=self,
+                title="No Project",
+                message="Please open a project folder first.",
+                icon="warning",
+            )
+            return
+        if self.active_background_tasks > 0:
+            logging.warning("Expand dependencies: App busy, request ignored.")
+            return
+        selected_paths = [
+            self.main_file_paths[index]
+            for index in self.main_files_listbox.curselection()
+            if 0 <= index < len(self.main_file_paths)
+        ]
+        if not selected_paths:
+            CTkMessagebox(
+                master=self,
+                title="Info",
+                message="No files selected in the list to expand.",
+                icon="info",
+            )
+            return
+        depth_text = self.dependency_depth_entry.get().strip()
+        try:
+            depth = int(depth_text) if depth_text else IMPORT_EXPAND_DEFAULT_DEPTH
+            if depth <= 0:
+                raise ValueError(depth_text)
+        except ValueError:
+            CTkMessagebox(
+                master=self,
+                title="Invalid Depth",
+                message="Depth must be a positive whole number.",
+                icon="warning",
+            )
+            return
+        if (
+            self.import_graph is None
+            or self.import_graph.project_root
+            != self.project_folder_path.resolve(strict=False)
+        ):
+            self.import_graph = ImportGraph(self.project_folder_path)
+        self._submit_task(
+            self._expand_dependencies_task,
+            self._apply_expanded_dependencies,
+            self.import_graph,
+            selected_paths,
+            depth,
+        )
+
+    def _expand_dependencies_task(self, import_graph, file_paths, depth):
+        with PERF_STATS.span("imports.expand"):
+            return {
+                "paths": import_graph.expand(file_paths, depth),
+                "sources": len(file_paths),
+                "depth": depth,
+            }
+
+    def _apply_expanded_dependencies(self, result):
+        existing = set(self.main_file_paths)
+        new_paths = [p for p in result["paths"] if p not in existing]
+        logging.info(
+            f"Expanded {result['sources']} files to depth {result['depth']}: "
+            f"{len(new_paths)} local imports added."
+        )
+        if not new_paths:
+            CTkMessagebox(
+                master=self,
+                title="No Dependencies",
+                message="No further local imports found for the selected files.",
+                icon="info",
+            )
+            return
+        self.main_file_paths.extend(new_paths)
+        self._rebuild_listbox_from_main_file_paths()
+        self.trigger_generate_prompt_stand_alone(is_part_of_chain=True)
+
     def copy_prompt(self):
-        prompt_text = self.final_prompt_textbox.get("1.0", "end-1c")
-        if not prompt_text:
+        if not self.prompt_buffer:
             CTkMessagebox(
                 master=self,
                 title="Copy Prompt",
@@ -1370,20 +5532,291 @@ class LLMPromptApp(ctk.CTk):
                 icon="info",
             )
             return
+        if self.active_background_tasks > 0:
+            logging.warning("Copy prompt: App busy, request ignored.")
+            return
+        self._reset_copy_parts()
+        if self.multi_part_copy_var.get():
+            size_text = self.part_size_entry.get().strip()
+            try:
+                max_part_chars = (
+                    int(size_text) if size_text else CLIPBOARD_PART_DEFAULT_CHARS
+                )
+                if max_part_chars <= 0:
+                    raise ValueError(size_text)
+            except ValueError:
+                CTkMessagebox(
+                    master=self,
+                    title="Invalid Part Size",
+                    message="Characters per part must be a positive whole number.",
+                    icon="warning",
+                )
+                return
+            parts = self.prompt_buffer.split_parts(max_part_chars)
+            if len(parts) > 1:
+                self.copy_parts = parts
+                self._start_clipboard_copy(parts[0], 0)
+                return
+        self._start_clipboard_copy(self.prompt_buffer, None)
+
+    def copy_next_part(self):
+        if self.active_background_tasks > 0:
+            logging.warning("Copy next part: App busy, request ignored.")
+            return
+        if self.copy_part_index + 1 >= len(self.copy_parts):
+            self._reset_copy_parts()
+            return
+        self.copy_part_index += 1
+        self._start_clipboard_copy(
+            self.copy_parts[self.copy_part_index], self.copy_part_index
+        )
+
+    def _reset_copy_parts(self):
+        self.copy_parts = []
+        self.copy_part_index = 0
+        if self.copy_next_part_button.winfo_exists():
+            self.copy_next_part_button.configure(state="disabled", text="Next Part")
+
+    def _start_clipboard_copy(self, prompt_buffer, part_index):
+        if prompt_buffer.char_count <= CLIPBOARD_SYNC_MAX_CHARS:
+            self._clipboard_copy_done(
+                self._copy_to_clipboard_task(prompt_buffer, part_index)
+            )
+        else:
+            self._submit_task(
+                self._copy_to_clipboard_task,
+                self._clipboard_copy_done,
+                prompt_buffer,
+                part_index,
+            )
+
+    def _copy_to_clipboard_task(self, prompt_buffer, part_index):
+        label = (
+            "Copying prompt..."
+            if part_index is None
+            else f"Copying part {part_index + 1} of {len(self.copy_parts)}..."
+        )
+        size_text = format_byte_size(prompt_buffer.char_count)
+        self.ui_queue.put(
+            ("task_progress", (label, f"Preparing {size_text} of text."), None)
+        )
+        result = {"part_index": part_index, "chars": prompt_buffer.char_count}
         try:
-            pyperclip.copy(prompt_text)
+            import pyperclip
+
+            text = prompt_buffer.text()
+            self.ui_queue.put(
+                ("task_progress", (label, f"Sending {size_text} to clipboard."), None)
+            )
+            with PERF_STATS.span("clipboard.copy"):
+                pyperclip.copy(text)
+        except Exception as e:
+            logging.error(f"Copy prompt error: {e}")
+            result["error"] = str(e)
+        return result
+
+    def _clipboard_copy_done(self, result):
+        if result.get("error"):
+            self._reset_copy_parts()
+            CTkMessagebox(
+                master=self,
+                title="Copy Error",
+                message=f"Could not copy to clipboard: {result['error']}",
+                icon="cancel",
+            )
+            return
+        part_index = result["part_index"]
+        if part_index is None:
             CTkMessagebox(
                 master=self,
                 title="Copy Prompt",
                 message="Prompt copied to clipboard!",
                 icon="check",
             )
+            return
+        part_count = len(self.copy_parts)
+        message = f"Part {part_index + 1} of {part_count} ({result['chars']:,} chars) copied to clipboard."
+        if part_index + 1 < part_count:
+            message += " Paste it, then click Next Part."
+            self.copy_next_part_button.configure(
+                state="normal", text=f"Next Part ({part_index + 2}/{part_count})"
+            )
+        else:
+            message += " That was the last part."
+            self._reset_copy_parts()
+        CTkMessagebox(master=self, title="Copy Prompt", message=message, icon="check")
+
+    def export_prompt(self):
+        if not self.prompt_buffer:
+            CTkMessagebox(
+                master=self,
+                title="Export Prompt",
+                message="Nothing to export.",
+                icon="info",
+            )
+            return
+        full_prompt = (
+            self.prompt_chunks.source if self.prompt_chunks else self.prompt_buffer
+        )
+        extension = full_prompt.output_format.extension
+        file_path_str = filedialog.asksaveasfilename(
+            title="Export Prompt",
+            defaultextension=extension,
+            filetypes=[
+                (f"{full_prompt.output_format.label} files", f"*{extension}"),
+                ("All files", "*.*"),
+            ],
+            initialfile=f"prompt{extension}",
+        )
+        if not file_path_str:
+            return
+        try:
+            with open(file_path_str, "w", encoding="utf-8", newline="") as f:
+                self.prompt_buffer.write_to(f)
+            logging.info(f"Prompt exported to {file_path_str}")
         except Exception as e:
-            logging.error(f"Copy prompt error: {e}")
+            logging.error(f"Export prompt error: {e}")
             CTkMessagebox(
                 master=self,
-                title="Copy Error",
-                message=f"Could not copy to clipboard: {e}",
+                title="Export Error",
+                message=f"Could not export prompt: {e}",
+                icon="cancel",
+            )
+
+    def _close_diagnostics_panel(self):
+        if self.diagnostics_refresh_timer:
+            self.after_cancel(self.diagnostics_refresh_timer)
+            self.diagnostics_refresh_timer = None
+        if self.diagnostics_toplevel and self.diagnostics_toplevel.winfo_exists():
+            self.diagnostics_toplevel.destroy()
+        self.diagnostics_toplevel = None
+
+    def _open_diagnostics_panel(self):
+        if self.diagnostics_toplevel and self.diagnostics_toplevel.winfo_exists():
+            self.diagnostics_toplevel.focus()
+            return
+
+        self.diagnostics_toplevel = ctk.CTkToplevel(self)
+        self.diagnostics_toplevel.title("Performance Diagnostics")
+        self.diagnostics_toplevel.geometry("720x420")
+        if self.icon_path:
+            self.diagnostics_toplevel.after(
+                200, lambda: self.diagnostics_toplevel.iconbitmap(self.icon_path)
+            )
+        self.diagnostics_toplevel.protocol(
+            "WM_DELETE_WINDOW", self._close_diagnostics_panel
+        )
+        self.diagnostics_toplevel.grid_rowconfigure(0, weight=1)
+        self.diagnostics_toplevel.grid_columnconfigure(0, weight=1)
+
+        self.diagnostics_textbox = ctk.CTkTextbox(
+            self.diagnostics_toplevel,
+            wrap="none",
+            state="disabled",
+            font=ctk.CTkFont(family="Courier New", size=12),
+        )
+        self.diagnostics_textbox.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
+        self.diagnostics_report = None
+
+        button_frame = ctk.CTkFrame(self.diagnostics_toplevel, fg_color="transparent")
+        button_frame.grid(row=1, column=0, padx=10, pady=(0, 10), sticky="e")
+        ctk.CTkButton(button_frame, text="Reset", command=self._reset_perf_stats).pack(
+            side="left", padx=(0, 10)
+        )
+        ctk.CTkButton(
+            button_frame, text="Export JSON", command=self._export_perf_stats
+        ).pack(side="left", padx=(0, 10))
+        self.trace_toggle_button = ctk.CTkButton(
+            button_frame,
+            text="Stop Trace" if TRACER.enabled else "Start Trace",
+            command=self._toggle_trace_recording,
+        )
+        self.trace_toggle_button.pack(side="left", padx=(0, 10))
+        ctk.CTkButton(
+            button_frame, text="Export Trace", command=self._export_trace
+        ).pack(side="left")
+        self._refresh_diagnostics_panel()
+
+    def _refresh_diagnostics_panel(self):
+        self.diagnostics_refresh_timer = None
+        if (
+            not self.diagnostics_toplevel
+            or not self.diagnostics_toplevel.winfo_exists()
+        ):
+            return
+        report = PERF_STATS.format_report()
+        if report != self.diagnostics_report:
+            # Written directly: _set_textbox_content is instrumented and would
+            # count the panel's own redraws in the figures it shows.
+            self.diagnostics_report = report
+            textbox = self.diagnostics_textbox
+            y_position, x_position = textbox.yview()[0], textbox.xview()[0]
+            textbox.configure(state="normal")
+            textbox.delete("1.0", "end")
+            textbox.insert("1.0", report)
+            textbox.configure(state="disabled")
+            textbox.yview_moveto(y_position)
+            textbox.xview_moveto(x_position)
+        self.diagnostics_refresh_timer = self.after(
+            1000, self._refresh_diagnostics_panel
+        )
+
+    def _reset_perf_stats(self):
+        PERF_STATS.reset()
+        if self.diagnostics_refresh_timer:
+            self.after_cancel(self.diagnostics_refresh_timer)
+        self._refresh_diagnostics_panel()
+
+    def _export_perf_stats(self):
+        file_path_str = filedialog.asksaveasfilename(
+            parent=self.diagnostics_toplevel,
+            title="Export Performance Data",
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json")],
+            initialfile="promptgen_perf.json",
+        )
+        if not file_path_str:
+            return
+        try:
+            Path(file_path_str).write_text(PERF_STATS.to_json(), encoding="utf-8")
+            logging.info(f"Performance data exported to {file_path_str}")
+        except Exception as e:
+            logging.error(f"Error exporting performance data: {e}")
+            CTkMessagebox(
+                master=self.diagnostics_toplevel,
+                title="Error",
+                message=f"Failed to export performance data: {e}",
+                icon="cancel",
+            )
+
+    def _toggle_trace_recording(self):
+        if TRACER.enabled:
+            TRACER.stop()
+        else:
+            TRACER.start()
+        if self.trace_toggle_button.winfo_exists():
+            self.trace_toggle_button.configure(
+                text="Stop Trace" if TRACER.enabled else "Start Trace"
+            )
+
+    def _export_trace(self):
+        file_path_str = filedialog.asksaveasfilename(
+            parent=self.diagnostics_toplevel,
+            title="Export Chrome Trace",
+            defaultextension=".json",
+            filetypes=[("Trace event JSON", "*.json")],
+            initialfile="promptgen_trace.json",
+        )
+        if not file_path_str:
+            return
+        try:
+            TRACER.write(file_path_str)
+        except Exception as e:
+            logging.error(f"Error exporting trace: {e}")
+            CTkMessagebox(
+                master=self.diagnostics_toplevel,
+                title="Error",
+                message=f"Failed to export trace: {e}",
                 icon="cancel",
             )
 
@@ -1405,7 +5838,7 @@ class LLMPromptApp(ctk.CTk):
         self.config_toplevel.title("Configuration Manager")
         ws = self.winfo_screenwidth()
         hs = self.winfo_screenheight()
-        w, h = 600, 450
+        w, h = 600, 520
         x = (ws / 2) - (w / 2)
         y = (hs / 2) - (h / 2)
         self.config_toplevel.geometry("%dx%d+%d+%d" % (w, h, x, y))
@@ -1420,6 +5853,13 @@ class LLMPromptApp(ctk.CTk):
         left_frame = ctk.CTkFrame(self.config_toplevel)
         left_frame.pack(side="left", fill="y", padx=10, pady=10)
         ctk.CTkLabel(left_frame, text="Saved Configurations:").pack(pady=(0, 5))
+        self.config_search_entry = ctk.CTkEntry(
+            left_frame, placeholder_text="Search names or tags..."
+        )
+        self.config_search_entry.pack(fill="x", pady=(0, 5))
+        self.config_search_entry.bind(
+            "<KeyRelease>", lambda event: self._populate_config_listbox()
+        )
         self.config_listbox = CTkListbox(left_frame, command=self._on_config_select)
         self.config_listbox.pack(expand=True, fill="both")
 
@@ -1428,6 +5868,11 @@ class LLMPromptApp(ctk.CTk):
         ctk.CTkLabel(right_frame, text="Configuration Name:").pack(anchor="w", padx=10)
         self.config_name_entry = ctk.CTkEntry(right_frame)
         self.config_name_entry.pack(fill="x", pady=(0, 10), padx=10)
+        ctk.CTkLabel(right_frame, text="Tags (comma-separated):").pack(
+            anchor="w", padx=10
+        )
+        self.config_tags_entry = ctk.CTkEntry(right_frame)
+        self.config_tags_entry.pack(fill="x", pady=(0, 10), padx=10)
         button_frame = ctk.CTkFrame(right_frame, fg_color="transparent")
         button_frame.pack(fill="x", pady=5, padx=5)
         ctk.CTkButton(
@@ -1446,12 +5891,65 @@ class LLMPromptApp(ctk.CTk):
         ctk.CTkButton(
             right_frame, text="Refresh List", command=self._populate_config_listbox
         ).pack(fill="x", pady=(10, 0), padx=10)
+        ctk.CTkButton(
+            right_frame, text="Import .ini Files", command=self._import_ini_configs
+        ).pack(fill="x", pady=(10, 0), padx=10)
+        self._populate_config_listbox()
+
+    def _get_config_store(self) -> ConfigStore:
+        if self.config_store is None:
+            self.config_store = ConfigStore(self.config_dir / CONFIG_STORE_FILENAME)
+            if self.config_store.created:
+                self._submit_task(
+                    self._import_ini_configs_task,
+                    self._ini_configs_migrated,
+                    self.config_store,
+                    self.config_dir,
+                )
+        return self.config_store
+
+    def _import_ini_configs(self):
+        if self.active_background_tasks > 0:
+            logging.warning("Import .ini configs: App busy, request ignored.")
+            return
+        self._submit_task(
+            self._import_ini_configs_task,
+            self._ini_configs_imported,
+            self._get_config_store(),
+            self.config_dir,
+        )
+
+    def _import_ini_configs_task(self, config_store, config_dir):
+        logging.debug(f"Task: Importing .ini configs from {config_dir}")
+        with PERF_STATS.span("config.import_ini"):
+            return config_store.import_ini_files(config_dir)
+
+    def _ini_configs_migrated(self, imported):
+        if imported:
+            self._populate_config_listbox()
+
+    def _ini_configs_imported(self, imported):
+        msg_master = (
+            self.config_toplevel
+            if self.config_toplevel and self.config_toplevel.winfo_exists()
+            else self
+        )
+        CTkMessagebox(
+            master=msg_master,
+            title="Import",
+            message=f"Imported {imported} configuration(s).",
+            icon="check",
+        )
         self._populate_config_listbox()
 
     def _on_config_select(self, selected_value):
         if selected_value:
             self.config_name_entry.delete(0, "end")
             self.config_name_entry.insert(0, selected_value)
+            self.config_tags_entry.delete(0, "end")
+            self.config_tags_entry.insert(
+                0, ", ".join(self._get_config_store().get_tags(selected_value))
+            )
 
     def _populate_config_listbox(self):
         if (
@@ -1461,11 +5959,15 @@ class LLMPromptApp(ctk.CTk):
             return
         current_selection_value = self.config_listbox.get()
         self.config_listbox.delete("all")
-        if not self.config_dir.exists():
+        try:
+            configs = self._get_config_store().list_configs(
+                self.config_search_entry.get().strip()
+            )
+        except Exception as e:
+            logging.error(f"Could not list configurations: {e}")
             return
-        config_files = sorted(self.config_dir.glob("*.ini"))
-        for i, f_path in enumerate(config_files):
-            self.config_listbox.insert(i, f_path.stem)
+        for i, config_row in enumerate(configs):
+            self.config_listbox.insert(i, config_row["name"])
         if current_selection_value:
             try:
                 all_items = [
@@ -1499,19 +6001,20 @@ class LLMPromptApp(ctk.CTk):
             )
             return
 
-        config = configparser.ConfigParser()
-        config["Settings"] = {
-            "Instructions": self.instructions_textbox.get("1.0", "end-1c"),
-            "CustomIgnores": self.custom_ignore_textbox.get("1.0", "end-1c"),
-            "ProjectFolder": (
-                str(self.project_folder_path) if self.project_folder_path else ""
-            ),
-            "MainFiles": "\n".join(self.main_file_paths),
-        }
-        file_path = self.config_dir / f"{name}.ini"
+        tags = [
+            tag.strip()
+            for tag in self.config_tags_entry.get().split(",")
+            if tag.strip()
+        ]
         try:
-            with open(file_path, "w", encoding="utf-8") as configfile:
-                config.write(configfile)
+            self._get_config_store().save_config(
+                name,
+                self.instructions_textbox.get("1.0", "end-1c"),
+                self.custom_ignore_textbox.get("1.0", "end-1c"),
+                str(self.project_folder_path) if self.project_folder_path else "",
+                self.main_file_paths,
+                tags,
+            )
             logging.info(f"Saved configuration: {name}")
             CTkMessagebox(
                 master=self.config_toplevel,
@@ -1545,96 +6048,33 @@ class LLMPromptApp(ctk.CTk):
                 icon="warning",
             )
             return
-
-        file_path = self.config_dir / f"{selected_name}.ini"
-        if not file_path.is_file():
-            CTkMessagebox(
-                master=self.config_toplevel,
-                title="Error",
-                message=f"Config file for '{selected_name}' not found.",
-                icon="cancel",
-            )
+        if self.active_background_tasks > 0:
+            logging.warning("Load config: App busy, request ignored.")
             return
 
-        config = configparser.ConfigParser()
         try:
-            config.read(file_path, encoding="utf-8")
-            instructions = config.get("Settings", "Instructions", fallback="")
-            custom_ignores = config.get("Settings", "CustomIgnores", fallback="")
-            project_folder_str = config.get("Settings", "ProjectFolder", fallback="")
-            main_files_str = config.get("Settings", "MainFiles", fallback="")
+            config_data = self._get_config_store().load_config(selected_name)
+            if config_data is None:
+                CTkMessagebox(
+                    master=self.config_toplevel,
+                    title="Error",
+                    message=f"Config '{selected_name}' not found.",
+                    icon="cancel",
+                )
+                return
 
-            self._set_textbox_content(self.instructions_textbox, instructions)
-            self._set_textbox_content(self.custom_ignore_textbox, custom_ignores)
+            self._set_textbox_content(
+                self.instructions_textbox, config_data["instructions"]
+            )
+            self._set_textbox_content(
+                self.custom_ignore_textbox, config_data["custom_ignores"]
+            )
 
             self._close_config_manager()
-
-            project_changed_or_set = False
-            new_project_path = None
-            if project_folder_str:
-                loaded_project_path = Path(project_folder_str)
-                if loaded_project_path.is_dir():
-                    new_project_path = loaded_project_path
-                    logging.info(
-                        f"Project folder loaded from config: {new_project_path}"
-                    )
-                else:
-                    logging.warning(
-                        f"Project folder from config not found: {project_folder_str}"
-                    )
-                    CTkMessagebox(
-                        master=self,
-                        title="Warning",
-                        message=f"Project folder from config not found:\n{project_folder_str}",
-                        icon="warning",
-                    )
-
-            if self.project_folder_path != new_project_path:
-                self.project_folder_path = new_project_path
-                project_changed_or_set = True
-                if self.project_folder_path:
-                    self.title(
-                        f"LLM Prompt Generator - {self.project_folder_path.name}"
-                    )
-                else:
-                    self.title("LLM Prompt Generator")
-
-            self._update_project_location_label()
-
-            self.main_file_paths = []
-            loaded_any_main_files = False
-            if main_files_str:
-                potential_paths = [
-                    p.strip() for p in main_files_str.splitlines() if p.strip()
-                ]
-                for p_str in potential_paths:
-                    file_path_obj = Path(p_str)
-                    if file_path_obj.is_file():
-                        resolved_path = str(file_path_obj.resolve(strict=False))
-                        self.main_file_paths.append(resolved_path)
-                        loaded_any_main_files = True
-                    else:
-                        logging.warning(f"Main file from config not found: {p_str}")
-                        CTkMessagebox(
-                            master=self,
-                            title="Warning",
-                            message=f"Main file from config not found (skipped):\n{p_str}",
-                            icon="warning",
-                        )
-
-            self._rebuild_listbox_from_main_file_paths()
-
-            if project_changed_or_set:
-                self._orchestrate_full_refresh()
-            elif loaded_any_main_files or not main_files_str:
-                self.trigger_generate_prompt_stand_alone()
-
-            logging.info(f"Loaded configuration: {selected_name}")
-            CTkMessagebox(
-                master=self,
-                title="Success",
-                message=f"Configuration '{selected_name}' loaded.",
-                icon="check",
+            self._submit_task(
+                self._validate_config_paths_task,
+                self._apply_loaded_config,
+                config_data,
             )
 
         except Exception as e:
@@ -1653,6 +6093,90 @@ class LLMPromptApp(ctk.CTk):
                 icon="cancel",
             )
 
+    def _validate_config_paths_task(self, config_data):
+        logging.debug(f"Task: Validating paths of config '{config_data['name']}'")
+        project_folder_str = config_data["project_folder"]
+        project_path = None
+        if project_folder_str and Path(project_folder_str).is_dir():
+            project_path = Path(project_folder_str).resolve()
+
+        with PERF_STATS.span("config.validate_paths"):
+            valid_paths, missing_paths = check_existing_files(config_data["main_files"])
+        return {
+            "config_data": config_data,
+            "project_path": project_path,
+            "valid_paths": valid_paths,
+            "missing_paths": missing_paths,
+        }
+
+    def _apply_loaded_config(self, result):
+        config_data = result["config_data"]
+        selected_name = config_data["name"]
+        project_folder_str = config_data["project_folder"]
+        new_project_path = result["project_path"]
+        warnings = []
+
+        if new_project_path:
+            logging.info(f"Project folder loaded from config: {new_project_path}")
+        elif project_folder_str:
+            logging.warning(
+                f"Project folder from config not found: {project_folder_str}"
+            )
+            warnings.append(f"Project folder not found:\n{project_folder_str}")
+
+        project_changed_or_set = False
+        if self.project_folder_path != new_project_path:
+            self.project_folder_path = new_project_path
+            self.git_changes, self.git_changed_dirs = {}, set()
+            self.git_diff_settings = None
+            project_changed_or_set = True
+            if self.project_folder_path:
+                self.title(f"LLM Prompt Generator - {self.project_folder_path.name}")
+            else:
+                self.title("LLM Prompt Generator")
+
+        self._update_project_location_label()
+
+        self.main_file_paths = list(dict.fromkeys(result["valid_paths"]))
+        self.outline_file_paths.intersection_update(self.main_file_paths)
+        self._rebuild_listbox_from_main_file_paths()
+
+        missing_paths = result["missing_paths"]
+        if missing_paths:
+            logging.warning(
+                f"{len(missing_paths)} main file(s) from config not found and skipped."
+            )
+            shown = "\n".join(missing_paths[:CONFIG_MISSING_FILES_SHOWN])
+            if len(missing_paths) > CONFIG_MISSING_FILES_SHOWN:
+                shown += (
+                    f"\n... and {len(missing_paths) - CONFIG_MISSING_FILES_SHOWN} more"
+                )
+            warnings.append(
+                f"{len(missing_paths)} main file(s) not found (skipped):\n{shown}"
+            )
+
+        if project_changed_or_set:
+            self._run_when_idle(self._orchestrate_full_refresh)
+        elif self.main_file_paths or not config_data["main_files"]:
+            self._run_when_idle(self.trigger_generate_prompt_stand_alone)
+
+        logging.info(f"Loaded configuration: {selected_name}")
+        if warnings:
+            CTkMessagebox(
+                master=self,
+                title="Configuration Loaded With Warnings",
+                message=f"Configuration '{selected_name}' loaded.\n\n"
+                + "\n\n".join(warnings),
+                icon="warning",
+            )
+        else:
+            CTkMessagebox(
+                master=self,
+                title="Success",
+                message=f"Configuration '{selected_name}' loaded.",
+                icon="check",
+            )
+
     def _delete_selected_config(self):
         selected_name = (
             self.config_listbox.get()
@@ -1679,9 +6203,8 @@ class LLMPromptApp(ctk.CTk):
             option_2="Yes",
         )
         if msg.get() == "Yes":
-            file_path = self.config_dir / f"{selected_name}.ini"
             try:
-                file_path.unlink(missing_ok=True)
+                self._get_config_store().delete_config(selected_name)
                 logging.info(f"Deleted configuration: {selected_name}")
                 CTkMessagebox(
                     master=self.config_toplevel,
@@ -1703,5 +6226,9 @@ class LLMPromptApp(ctk.CTk):
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     app = LLMPromptApp()
+    if "--measure-startup" in sys.argv[1:]:
+        app.after_idle(app._report_startup_and_exit)
     app.mainloop()
+    sys.exit(app.exit_code)
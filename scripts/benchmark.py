@@ -0,0 +1,381 @@
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, PROJECT_ROOT)
+
+import PromptGen  # noqa: E402
+
+BENCHMARK_SCHEMA_VERSION = 1
+WORDS = [
+    "alpha",
+    "beta",
+    "config",
+    "handler",
+    "parse",
+    "render",
+    "request",
+    "response",
+    "service",
+    "util",
+    "value",
+    "widget",
+]
+EXTENSIONS = [".py", ".js", ".ts", ".md", ".txt", ".json", ".cfg"]
+
+
+def generate_synthetic_repo(
+    root: Path,
+    file_count=1000,
+    depth=4,
+    fanout=4,
+    gitignore_lines=20,
+    custom_pattern_count=5,
+    min_file_size=256,
+    max_file_size=4096,
+    seed=1234,
+):
+    rng = random.Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+
+    directories = [root]
+    frontier = [root]
+    for level in range(depth):
+        next_frontier = []
+        for parent in frontier:
+            for i in range(fanout):
+                child = parent / f"{rng.choice(WORDS)}_{level}_{i}"
+                child.mkdir(exist_ok=True)
+                next_frontier.append(child)
+        directories.extend(next_frontier)
+        frontier = next_frontier
+
+    gitignore_patterns = []
+    for i in range(gitignore_lines):
+        if i % 3 == 0:
+            gitignore_patterns.append(f"ignored_dir_{i}/")
+        elif i % 3 == 1:
+            gitignore_patterns.append(f"*.gen{i}")
+        else:
+            gitignore_patterns.append(f"**/tmp_{i}_*")
+    (root / ".gitignore").write_text("\n".join(gitignore_patterns) + "\n")
+
+    custom_patterns = [f"*.skip{i}" for i in range(custom_pattern_count)]
+
+    line = "".join(rng.choice(WORDS) + " " for _ in range(12)) + "\n"
+    file_paths = []
+    for i in range(file_count):
+        directory = directories[i % len(directories)]
+        roll = rng.random()
+        if gitignore_lines and roll < 0.05:
+            name = f"generated_{i}.gen{1 + 3 * rng.randrange(max(1, gitignore_lines // 3))}"
+        elif custom_pattern_count and roll < 0.1:
+            name = f"skipped_{i}.skip{rng.randrange(custom_pattern_count)}"
+        else:
+            name = f"{rng.choice(WORDS)}_{i}{rng.choice(EXTENSIONS)}"
+        size = rng.randint(min_file_size, max_file_size)
+        file_path = directory / name
+        file_path.write_text((line * (size // len(line) + 1))[:size])
+        file_paths.append(file_path)
+
+    return file_paths, custom_patterns
+
+
+def _load_gitignore_matcher(root: Path):
+    if not PromptGen.gitignore_parser_available():
+        return None
+    from gitignore_parser import parse_gitignore
+
+    return parse_gitignore(str(root / ".gitignore"), base_dir=str(root))
+
+
+def _time_stage(fn, repeat):
+    durations = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        durations.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, durations, peak
+
+
+def _stage_report(durations, peak, items, item_bytes=None):
+    best = min(durations)
+    report = {
+        "seconds_min": round(best, 6),
+        "seconds_median": round(statistics.median(durations), 6),
+        "items": items,
+        "items_per_second": round(items / best, 1) if best else None,
+        "peak_alloc_bytes": peak,
+    }
+    if item_bytes is not None:
+        report["bytes"] = item_bytes
+        report["mb_per_second"] = round(item_bytes / best / 1e6, 2) if best else None
+    return report
+
+
+def _transform_scaling(jobs, total_bytes, repeat):
+    report = {}
+    worker_counts = sorted(
+        {1, 2, 4, os.cpu_count() or 1} & set(range(1, (os.cpu_count() or 1) + 1))
+    )
+    _, durations, _ = _time_stage(lambda: PromptGen._run_transform_batch(jobs), repeat)
+    baseline = min(durations)
+    report["in_thread"] = {"seconds_min": round(baseline, 6), "speedup": 1.0}
+    previous_min_chars = PromptGen.PROCESS_POOL_MIN_CHARS
+    PromptGen.PROCESS_POOL_MIN_CHARS = 0
+    try:
+        for workers in worker_counts:
+            pool = PromptGen.TransformPool(max_workers=workers)
+            pool.enabled = True
+            try:
+                pool.run(jobs)
+                durations = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    pool.run(jobs)
+                    durations.append(time.perf_counter() - started)
+            finally:
+                pool.shutdown()
+            best = min(durations)
+            report[f"processes_{workers}"] = {
+                "seconds_min": round(best, 6),
+                "speedup": round(baseline / best, 2) if best else None,
+                "mb_per_second": round(total_bytes / best / 1e6, 2) if best else None,
+            }
+    finally:
+        PromptGen.PROCESS_POOL_MIN_CHARS = previous_min_chars
+    return report
+
+
+def run_benchmarks(root: Path, file_paths, custom_patterns, repeat, read_limit):
+    stages = {}
+    gitignore_matcher = _load_gitignore_matcher(root)
+
+    tree_string, durations, peak = _time_stage(
+        lambda: PromptGen.build_file_tree_string(
+            root,
+            gitignore_matcher=gitignore_matcher,
+            use_gitignore_flag=gitignore_matcher is not None,
+            custom_ignore_patterns=custom_patterns,
+            project_root_path_for_custom=root,
+        ),
+        repeat,
+    )
+    stages["build_file_tree_string"] = _stage_report(durations, peak, len(file_paths))
+
+    if shutil.which("git"):
+        subprocess.run(["git", "init", "-q"], cwd=str(root), check=True)
+        _, durations, peak = _time_stage(
+            lambda: PromptGen.build_file_tree_string(
+                root,
+                listing_cache=PromptGen.GitIndexListingCache(
+                    gitignore_matcher, True, custom_patterns, root
+                ),
+            ),
+            repeat,
+        )
+        stages["build_file_tree_string_git_index"] = _stage_report(
+            durations, peak, len(file_paths)
+        )
+
+    _, durations, peak = _time_stage(
+        lambda: sum(
+            PromptGen._is_custom_ignored(p, root, custom_patterns) for p in file_paths
+        ),
+        repeat,
+    )
+    stages["_is_custom_ignored"] = _stage_report(durations, peak, len(file_paths))
+
+    read_paths = [str(p) for p in file_paths[:read_limit]]
+    total_bytes = sum(os.path.getsize(p) for p in read_paths)
+    _, durations, peak = _time_stage(
+        lambda: [PromptGen.read_file_content(p) for p in read_paths], repeat
+    )
+    stages["read_file_content"] = _stage_report(
+        durations, peak, len(read_paths), total_bytes
+    )
+
+    _, durations, peak = _time_stage(
+        lambda: PromptGen.TrigramIndex().update(read_paths), repeat
+    )
+    stages["trigram_index_build"] = _stage_report(
+        durations, peak, len(read_paths), total_bytes
+    )
+    content_index = PromptGen.TrigramIndex()
+    content_index.update(read_paths)
+    query = " ".join(PromptGen.read_file_content(read_paths[0]).split()[:2])
+    pattern = re.compile(re.escape(query), re.IGNORECASE)
+    matches, durations, peak = _time_stage(
+        lambda: content_index.search(pattern, [query]), repeat
+    )
+    stages["trigram_index_search"] = _stage_report(durations, peak, len(read_paths))
+    stages["trigram_index_search"]["matches"] = len(matches)
+
+    _, durations, peak = _time_stage(
+        lambda: PromptGen.RelevanceIndex(root).update(read_paths), repeat
+    )
+    stages["relevance_index_build"] = _stage_report(
+        durations, peak, len(read_paths), total_bytes
+    )
+    relevance_index = PromptGen.RelevanceIndex(root)
+    relevance_index.update(read_paths)
+    ranked, durations, peak = _time_stage(
+        lambda: relevance_index.rank(f"Refactor the {query} handling.", 10), repeat
+    )
+    stages["relevance_rank"] = _stage_report(durations, peak, len(read_paths))
+    stages["relevance_rank"]["matches"] = len(ranked)
+
+    contents = [
+        (PromptGen.read_file_content(p), PromptGen.language_for_path(p))
+        for p in read_paths
+    ]
+    minified, durations, peak = _time_stage(
+        lambda: [PromptGen.minify_content(c, lang) for c, lang in contents], repeat
+    )
+    stages["minify_content"] = _stage_report(
+        durations, peak, len(read_paths), total_bytes
+    )
+    stages["minify_content"]["bytes_saved"] = total_bytes - sum(
+        len(m.encode("utf-8")) for m in minified
+    )
+
+    stages["transform_scaling"] = _transform_scaling(
+        [("minify", lang, c) for c, lang in contents], total_bytes, repeat
+    )
+
+    def assemble_cold():
+        PromptGen.FILE_CACHE.clear()
+        return PromptGen.assemble_prompt(
+            "Benchmark instructions.",
+            tree_string,
+            read_paths,
+            root.name,
+            root,
+            gitignore_matcher is not None,
+            custom_patterns,
+        )
+
+    prompt_buffer, durations, peak = _time_stage(assemble_cold, repeat)
+    stages["assemble_prompt"] = _stage_report(
+        durations,
+        peak,
+        len(read_paths),
+        sum(len(chunk.encode("utf-8")) for chunk in prompt_buffer.iter_chunks()),
+    )
+    return stages
+
+
+def compare_results(current, baseline_path):
+    baseline = json.loads(Path(baseline_path).read_text())
+    comparison = {}
+    for stage, report in current["stages"].items():
+        base_report = baseline.get("stages", {}).get(stage)
+        if base_report and base_report.get("seconds_min"):
+            comparison[stage] = round(
+                report["seconds_min"] / base_report["seconds_min"], 3
+            )
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Headless PromptGen benchmarks on a synthetic repository."
+    )
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--gitignore-lines", type=int, default=20)
+    parser.add_argument("--custom-patterns", type=int, default=5)
+    parser.add_argument("--min-file-size", type=int, default=256)
+    parser.add_argument("--max-file-size", type=int, default=4096)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--read-limit",
+        type=int,
+        default=500,
+        help="Number of files read and assembled into the prompt.",
+    )
+    parser.add_argument("--output", help="Write JSON results to this file.")
+    parser.add_argument("--compare", help="Baseline JSON results to compare against.")
+    parser.add_argument(
+        "--keep", action="store_true", help="Keep the generated repository."
+    )
+    args = parser.parse_args()
+
+    params = {
+        "files": args.files,
+        "depth": args.depth,
+        "fanout": args.fanout,
+        "gitignore_lines": args.gitignore_lines,
+        "custom_patterns": args.custom_patterns,
+        "min_file_size": args.min_file_size,
+        "max_file_size": args.max_file_size,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "read_limit": args.read_limit,
+    }
+
+    temp_dir = Path(tempfile.mkdtemp(prefix="promptgen_bench_"))
+    root = temp_dir / "synthetic_repo"
+    try:
+        generate_started = time.perf_counter()
+        file_paths, custom_patterns = generate_synthetic_repo(
+            root,
+            file_count=args.files,
+            depth=args.depth,
+            fanout=args.fanout,
+            gitignore_lines=args.gitignore_lines,
+            custom_pattern_count=args.custom_patterns,
+            min_file_size=args.min_file_size,
+            max_file_size=args.max_file_size,
+            seed=args.seed,
+        )
+        generate_seconds = time.perf_counter() - generate_started
+
+        results = {
+            "schema": BENCHMARK_SCHEMA_VERSION,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "gitignore_parser": PromptGen.gitignore_parser_available(),
+            "params": params,
+            "generate_seconds": round(generate_seconds, 3),
+            "stages": run_benchmarks(
+                root, file_paths, custom_patterns, args.repeat, args.read_limit
+            ),
+        }
+        if args.compare:
+            results["relative_to_baseline"] = compare_results(results, args.compare)
+    finally:
+        if args.keep:
+            print(f"Synthetic repository kept at {root}", file=sys.stderr)
+        else:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()